@@ -5,12 +5,9 @@ import subprocess
 import sys
 import tkinter as tk
 import tomllib
-import webbrowser
 from datetime import datetime, timedelta
 from tkinter import filedialog, ttk
 
-import ttkthemes
-
 from . import (
     config_toml,
     file_loader,
@@ -19,10 +16,15 @@ from . import (
     icon_data,
     svg_writer,
     time_format,
+    timeline_model,
+    timer_handoff,
+    timetable_to_csv,
 )
 from .gui_parts import Combobox
 
 IS_DARWIN = sys.platform.startswith("darwin")
+# how long the UI waits for background CSV writes before giving up
+CSV_FLUSH_TIMEOUT_SEC = 10
 
 
 class App(ttk.Frame):
@@ -46,15 +48,13 @@ class App(ttk.Frame):
         help_menu = tk.Menu(menubar, tearoff=0)
         help_menu.add_command(
             label="Readme (online)",
-            command=lambda: webbrowser.open(
+            command=lambda: open_url(
                 "https://www.design.kyushu-u.ac.jp/~eigo/timeline_kun.html"
             ),
         )
         help_menu.add_command(
             label="GitHub repository",
-            command=lambda: webbrowser.open(
-                "https://github.com/nishimura5/timeline_kun"
-            ),
+            command=lambda: open_url("https://github.com/nishimura5/timeline_kun"),
         )
         menubar.add_cascade(label="Help", menu=help_menu)
 
@@ -88,7 +88,7 @@ class App(ttk.Frame):
         )
         self.send_excel_btn.pack(padx=5, side=tk.LEFT)
         self.reload_btn = ttk.Button(
-            send_timer_frame, text="Reload", command=self.load_file
+            send_timer_frame, text="Reload", command=self.reload_file
         )
         self.reload_btn.pack(padx=5, side=tk.LEFT)
 
@@ -144,7 +144,7 @@ class App(ttk.Frame):
         ]
         self.tree = gui_tree.Tree(tree_frame, columns=cols)
         self.tree.pack(fill=tk.BOTH, expand=True)
-        self.tree.tree.bind("<<TreeviewSelect>>", lambda e: self.select_row())
+        self.tree.tree.bind("<<TreeviewSelect>>", lambda e: self.select_row(), add="+")
         self.tree.tree.bind("<Double-1>", lambda e: self.edit_row())
         self.tree.add_menu("Set start point", self.draw_start_line)
         self.tree.add_menu("Insert", self.insert_row)
@@ -155,6 +155,7 @@ class App(ttk.Frame):
         canvas_frame.pack(fill=tk.BOTH, expand=True)
         self.canvas = gui_canvas.Canvas(canvas_frame, bg="white")
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.on_view_change = self._on_view_change
 
         # ctrl+z shortcut control
         master.bind("<Control-z>", self.undo)
@@ -165,8 +166,19 @@ class App(ttk.Frame):
         self.export_svg_btn["state"] = "disabled"
 
         self.fallback_encoding = toml_dict.get("read_extra_encoding", "utf-8-sig")
+        # keep a warmed-up timer process for "Send to timer" (see timer_handoff)
+        self.use_timer_handoff = toml_dict.get("handoff", True)
+        self.timer_handoff = None
 
         self.csv_path = None
+        self.model = None
+        self.stage_list = []
+        self.stage_index = None
+        self.drawn_plan = []
+        self.captions = {}
+        self.end_caption = ()
+        # edits are saved in the background
+        self.csv_writer = timetable_to_csv.AsyncCsvWriter()
         self.start_index = 0
         self.prev_end_time_sec = None
         self.next_start_time_sec = None
@@ -175,25 +187,30 @@ class App(ttk.Frame):
         if self._check_csv_file_locked(self.csv_path) is True:
             return
 
-        is_ok = self.tree.edit(self.prev_end_time_sec)
-        if is_ok:
-            self.tree.tree_to_csv_file(self.csv_path)
-            self.load_file()
+        idx = self.tree.get_selected_index()
+        values = self.tree.edit(self.prev_end_time_sec)
+        if values is not None:
+            self._apply_edit(
+                lambda: self.model.edit_row(idx, values),
+                lambda: self.tree.update_row(idx),
+            )
 
     def insert_row(self):
         if self._check_csv_file_locked(self.csv_path) is True:
             return
-        is_ok = self.tree.insert()
-        if is_ok:
-            self.tree.tree_to_csv_file(self.csv_path)
-            self.load_file()
+        idx = self.tree.insert()
+        if idx is not None:
+            self._apply_edit(
+                lambda: self.model.insert_row(idx, gui_tree.NEW_ROW_VALUES),
+                lambda: self.tree.row_inserted(idx),
+            )
 
     def remove_row(self):
         if self._check_csv_file_locked(self.csv_path) is True:
             return
         # confirm remove
         current_row = self.tree.get_selected_index()
-        if current_row is None:
+        if current_row == -1:
             return
         current_title = self.stage_list[current_row]["title"]
         is_ok = tk.messagebox.askyesno(
@@ -202,11 +219,55 @@ class App(ttk.Frame):
         )
         if is_ok is False:
             return
-        is_ok = self.tree.remove()
+        removed_tag = self._row_tag(current_row)
+        idx = self.tree.remove()
+
+        if idx is not None:
+            self.canvas.delete(removed_tag)
+            self._apply_edit(
+                lambda: self.model.remove_row(idx) + [idx],
+                lambda: self.tree.row_removed(idx),
+            )
 
-        if is_ok:
-            self.tree.tree_to_csv_file(self.csv_path)
+    def _apply_edit(self, edit, update_tree):
+        """
+        Apply an edit to the timeline model, update the tree, redraw the rows
+        it changed and save the CSV in the background.
+        """
+        try:
+            changed = edit()
+        except ValueError:
+            # same as loading the broken file: save it and show the error
+            self._save_file()
             self.load_file()
+            return
+        self._save_file()
+        update_tree()
+        self.update_stages(changed)
+        self._show_warn_msg(self.model.get_warn_msg())
+        self.select_row()
+
+    def _save_file(self):
+        self._show_csv_error()
+        header, rows = self.model.to_csv_rows()
+        self.csv_writer.submit(
+            self.csv_path, header, rows, encoding=self.tree.write_encoding
+        )
+
+    def _show_csv_error(self):
+        error = self.csv_writer.pop_error()
+        if error is not None:
+            tk.messagebox.showerror("Error", f"Failed to save the CSV file.\n{error}")
+
+    def _flush_csv(self):
+        """Wait for the background CSV writes. False if they did not finish."""
+        if self.csv_writer.flush(timeout=CSV_FLUSH_TIMEOUT_SEC) is False:
+            tk.messagebox.showerror(
+                "Error", f"Saving the CSV file is taking too long.\n{self.csv_path}"
+            )
+            return False
+        self._show_csv_error()
+        return True
 
     def _check_csv_file_locked(self, file_path):
         if self.tree.check_csv_file_locked(self.csv_path) is True:
@@ -219,7 +280,7 @@ class App(ttk.Frame):
 
     def select_row(self):
         idx = self.tree.get_selected_index()
-        if idx is None:
+        if idx == -1:
             return
         prev_fixed_code, next_fixed_code = self._get_prev_next_fixed_code(idx)
 
@@ -249,28 +310,31 @@ class App(ttk.Frame):
 
     def draw_start_line(self):
         self.start_index = self.tree.get_selected_index()
-        if self.start_index is None:
+        if self.start_index == -1:
             self.start_index = 0
+        self._draw_start_line()
 
+    def _draw_start_line(self):
         stage = self.stage_list[self.start_index]
         total_duration = self.stage_list[-1]["end_dt"].total_seconds()
         self.canvas.draw_start_line(stage["start_dt"], total_duration)
 
-        for s in self.stage_list:
+        # captions of the stages drawn in the view, changed in place
+        for index, item_ids in self.captions.items():
+            s = self.stage_list[index]
             caption = self._minus_timedelta(s["start_dt"], stage["start_dt"])
-            self.canvas.create_time(s["start_dt"], text=caption)
+            self.canvas.set_time(item_ids, caption)
         total_end_dt = self.stage_list[-1]["end_dt"]
         time_caption = self._minus_timedelta(total_end_dt, stage["start_dt"])
-        self.canvas.create_time(total_end_dt, text=time_caption)
+        self.canvas.set_time(self.end_caption, time_caption)
 
     def highlight_selected_row(self):
         idx = self.tree.get_selected_index()
-        if idx is None:
+        if idx == -1:
             return
         start = self.stage_list[idx]["start_dt"]
         duration = self.stage_list[idx]["duration"]
-        self.canvas.delete("highlight")
-        self.canvas.create_rect(start, duration, "#dd7777", tag="highlight")
+        self.canvas.set_highlight(start, duration, "#dd7777")
 
     def _get_prev_next_fixed_code(self, index):
         if index == 0:
@@ -318,39 +382,129 @@ class App(ttk.Frame):
 
     def draw_stages(self):
         self.canvas.delete("all")
+        self.drawn_end_sec = None
+        self.drawn_plan = []
+        # caption item ids of the drawn stages, updated in place
+        self.captions = {}
+        self.end_caption = ()
+        if len(self.stage_list) == 0:
+            return
         self.canvas.set_font(self.font_size_combobox.get())
         self.canvas.set_direction(self.direction_combobox.get())
         total_duration = self.stage_list[-1]["end_dt"].total_seconds()
         self.canvas.set_scale(total_duration)
 
-        past_rect_height = 10000
-        include_hour = self.time_format_combobox.get() == "h:mm:ss"
-
-        past_start_dt = timedelta(seconds=0)
-        for stage in self.stage_list:
-            if stage["start_dt"].total_seconds() == 0:
-                start_dt = past_start_dt
-            else:
-                start_dt = stage["start_dt"]
-            rect_height = self.canvas.create_rect(
-                start_dt, stage["duration"], stage["color"]
-            )
-            label_title = f"{stage['title']}"
-            label_time = (
-                f"{time_format.timedelta_to_str(stage['duration'], include_hour)}"
+        # only what is in the view; sub-pixel stages are merged
+        if self.stage_index is None:
+            self.stage_index = gui_canvas.StageIndex(
+                self.stage_list.start, self.stage_list.end
             )
-            self.canvas.create_label(
-                start_dt, stage["duration"], label_title, label_time, stage["has_error"]
-            )
-            if past_rect_height > 10:
-                time_caption = time_format.timedelta_to_str(start_dt, include_hour)
-                self.canvas.create_time(stage["start_dt"], text=time_caption)
-            past_start_dt = stage["start_dt"]
-            past_rect_height = rect_height
+        t0, t1 = self.canvas.view_range()
+        self.drawn_plan = self.stage_index.plan(t0, t1, self.canvas.scale)
+        for item in self.drawn_plan:
+            if item[0] == "stage":
+                self._draw_stage(item[1])
+            else:
+                _, _, _, start, end = item
+                self.canvas.create_group(start, end)
+        include_hour = self.time_format_combobox.get() == "h:mm:ss"
         time_caption = time_format.timedelta_to_str(
             self.stage_list[-1]["end_dt"], include_hour
         )
-        self.canvas.create_time(self.stage_list[-1]["end_dt"], text=time_caption)
+        self.end_caption = self.canvas.create_time(
+            self.stage_list[-1]["end_dt"], text=time_caption
+        )
+        self.drawn_end_sec = self.stage_list.end[-1]
+
+    def _on_view_change(self):
+        # zoom/pan: redraw the view with the start line and the highlight
+        if len(self.stage_list) == 0:
+            return
+        self.draw_stages()
+        if self.start_index != 0:
+            self._draw_start_line()
+        self.highlight_selected_row()
+
+    def _row_tag(self, index):
+        return f"row{self.model.row_id(index)}"
+
+    def _draw_stage(self, index):
+        """Rect, label and start time of one stage, tagged with its row id"""
+        include_hour = self.time_format_combobox.get() == "h:mm:ss"
+        tags = (self._row_tag(index),)
+        stage = self.stage_list[index]
+        if index == 0:
+            past_start_dt = timedelta(seconds=0)
+            past_rect_height = 10000
+        else:
+            past_start_dt = self.stage_list[index - 1]["start_dt"]
+            past_rect_height = self.stage_list.duration[index - 1] * self.canvas.scale
+
+        if stage["start_dt"].total_seconds() == 0:
+            start_dt = past_start_dt
+        else:
+            start_dt = stage["start_dt"]
+        self.canvas.create_rect(
+            start_dt,
+            stage["duration"],
+            self.rect_color_dict[stage["title"]],
+            tag=("rect", *tags),
+        )
+        label_title = f"{stage['title']}"
+        label_time = f"{time_format.timedelta_to_str(stage['duration'], include_hour)}"
+        self.canvas.create_label(
+            start_dt,
+            stage["duration"],
+            label_title,
+            label_time,
+            stage["has_error"],
+            tags=tags,
+        )
+        # created hidden if the previous stage is too short; the start line
+        # shows every caption
+        time_caption = time_format.timedelta_to_str(start_dt, include_hour)
+        self.captions[index] = self.canvas.create_time(
+            stage["start_dt"],
+            text=time_caption,
+            tags=tags,
+            state="normal" if past_rect_height > 10 else "hidden",
+        )
+
+    def update_stages(self, changed):
+        """
+        Redraw only the changed rows (and the start time of the row after
+        each, which depends on its predecessor). Everything is redrawn if the
+        scale, the colors, the start point or the merged stages change.
+        """
+        self.stage_index = None
+        titles = self.stage_list.get_titles()
+        if (
+            len(self.stage_list) == 0
+            or self.drawn_end_sec != self.stage_list.end[-1]
+            or sorted(titles) != sorted(self.rect_color_dict)
+            or self.start_index != 0
+        ):
+            self.start_index = 0
+            self.asign_rect_color()
+            self.draw_stages()
+            return
+
+        self.stage_index = gui_canvas.StageIndex(
+            self.stage_list.start, self.stage_list.end
+        )
+        t0, t1 = self.canvas.view_range()
+        plan = self.stage_index.plan(t0, t1, self.canvas.scale)
+        if plan != self.drawn_plan:
+            self.draw_stages()
+            return
+
+        drawn = set(item[1] for item in plan if item[0] == "stage")
+        rows = set(changed)
+        rows.update(i + 1 for i in changed)
+        for i in sorted(rows & drawn):
+            self.canvas.delete(self._row_tag(i))
+            self._draw_stage(i)
+        self.canvas.tag_raise("highlight")
 
     def create_file(self):
         desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
@@ -381,7 +535,16 @@ class App(ttk.Frame):
         self.csv_path = csv_path
         self.load_file()
 
+    def reload_file(self):
+        if self._flush_csv() is False:
+            return
+        # force re-parsing even if the file looks unchanged
+        file_loader.FileLoader().invalidate_cache(self.csv_path)
+        self.load_file()
+
     def load_file(self):
+        if self._flush_csv() is False:
+            return
         self.start_index = 0
         self.clear_tree_and_canvas()
         self.file_path_label.config(text=self.csv_path)
@@ -397,27 +560,26 @@ class App(ttk.Frame):
             self.msg_label.config(text=f"[ERROR]{e}")
             return
 
-        self.stage_list = []
-        for row in timetable.get_timetable():
-            self.stage_list.append(
-                {
-                    "title": row["title"],
-                    "member": row["member"],
-                    "start_dt": row["start"],
-                    "end_dt": row["end"],
-                    "duration": row["end"] - row["start"],
-                    "start_sec": row["start_sec"],
-                    "end_sec": row["end_sec"],
-                    "duration_sec": row["duration_sec"],
-                    "fixed": row["fixed"],
-                    "instruction": row["instruction"],
-                    "has_error": row["has_error"],
-                }
-            )
+        # edits go to the model (a copy of the parsed timetable)
+        self.model = timeline_model.TimelineModel(timetable.get_timetable())
+        self.stage_list = self.model.get_timetable()
+        self.stage_index = None
+        self.canvas.reset_view()
         self.asign_rect_color()
         self.tree.set_stages(self.stage_list)
         self.draw_stages()
+        self._show_warn_msg(warn_msg)
+
+        self.csv_encoding = fl.get_encoding()
+        detection = fl.get_encoding_detection()
+        if detection is not None:
+            print(f"Encoding detection: {detection.summary()}")
+        if self.csv_encoding is not None:
+            self.tree.set_write_encoding(self.csv_encoding)
+        if warn_msg == "":
+            self._start_standby_timer()
 
+    def _show_warn_msg(self, warn_msg):
         if warn_msg != "":
             self.msg_label.config(text=f"[ERROR]{warn_msg}")
             self.timer_btn["state"] = "disabled"
@@ -429,10 +591,6 @@ class App(ttk.Frame):
             self.export_svg_btn["state"] = "normal"
             self.file_menu.entryconfig("Export SVG", state="normal")
 
-        self.csv_encoding = fl.get_encoding()
-        if self.csv_encoding is not None:
-            self.tree.set_write_encoding(self.csv_encoding)
-
     def clear_tree_and_canvas(self):
         self.tree.clear()
         self.canvas.delete("all")
@@ -443,72 +601,83 @@ class App(ttk.Frame):
         self.file_menu.entryconfig("Export SVG", state="disabled")
 
     def asign_rect_color(self):
-        title_list = list(set([s["title"] for s in self.stage_list]))
+        title_list = self.stage_list.get_titles()
         title_list.sort()
+        self.rect_color_dict = {}
         for i, title in enumerate(title_list):
-            for stage in self.stage_list:
-                if stage["title"] == title:
-                    if i >= len(gui_canvas.rect_colors):
-                        stage["color"] = "#aaaaaa"
-                    else:
-                        stage["color"] = gui_canvas.rect_colors[i]
+            if i >= len(gui_canvas.rect_colors):
+                self.rect_color_dict[title] = "#aaaaaa"
+            else:
+                self.rect_color_dict[title] = gui_canvas.rect_colors[i]
 
     def open_timer(self):
         # has_error check
-        has_error_list = [s["has_error"] for s in self.stage_list]
-        if True in has_error_list:
+        if self.stage_list.has_any_error():
             tk.messagebox.showinfo("Error", "Timer can't start because of error.")
             return
 
+        if self._flush_csv() is False:
+            return
         if self.time_format_combobox.get() == "h:mm:ss":
             hmmss = "hmmss"
         else:
             hmmss = "mmss"
 
+        color = self.timer_color_combobox.get()
+        # a standby timer opens at once with the timeline parsed here
+        if self.timer_handoff is not None:
+            request = timer_handoff.TimerRequest(
+                self.csv_path,
+                color,
+                self.start_index,
+                hmmss,
+                self.stage_list,
+                self.csv_encoding,
+            )
+            if self.timer_handoff.send(request):
+                return
+
+        command = self._timer_command()
+        if command is None:
+            return
+        subprocess.Popen(
+            command
+            + [
+                "--file_path",
+                self.csv_path,
+                "--fg_color",
+                color,
+                "--start_index",
+                str(self.start_index),
+                "--hmmss",
+                hmmss,
+            ]
+        )
+
+    def _timer_command(self):
+        """Command that starts the timer (None if it is not available)"""
         # frozen exe
         if getattr(sys, "frozen", False):
             current_dir = os.path.dirname(sys.executable)
-            tar_path = os.path.join(current_dir, "TimelinekunTimer.exe")
-            color = self.timer_color_combobox.get()
-
-            subprocess.Popen(
-                [
-                    tar_path,
-                    "--file_path",
-                    self.csv_path,
-                    "--fg_color",
-                    color,
-                    "--start_index",
-                    str(self.start_index),
-                    "--hmmss",
-                    hmmss,
-                ]
-            )
-        elif (
-            importlib.util.find_spec(
-                f"{__package__}.app_timer" if __package__ else "app_timer"
-            )
-            is not None
-        ):
-            color = self.timer_color_combobox.get()
-            module = f"{__package__}.app_timer" if __package__ else "app_timer"
-            subprocess.Popen(
-                [
-                    sys.executable,
-                    "-m",
-                    module,
-                    "--file_path",
-                    self.csv_path,
-                    "--fg_color",
-                    color,
-                    "--start_index",
-                    str(self.start_index),
-                    "--hmmss",
-                    hmmss,
-                ]
-            )
+            return [os.path.join(current_dir, "TimelinekunTimer.exe")]
+        module = f"{__package__}.app_timer" if __package__ else "app_timer"
+        if importlib.util.find_spec(module) is not None:
+            return [sys.executable, "-m", module]
+        return None
+
+    def _start_standby_timer(self):
+        if not self.use_timer_handoff:
+            return
+        if self.timer_handoff is None:
+            command = self._timer_command()
+            if command is None:
+                return
+            self.timer_handoff = timer_handoff.TimerHandoff(command)
+        self.timer_handoff.start_standby()
 
     def open_excel(self):
+        if self._flush_csv() is False:
+            return
         ok = file_loader.utf8_to_utf8bom(self.csv_path, self.fallback_encoding)
         # ok == True -> converted to utf-8-sig
         #       False -> failed to convert or already utf-8-sig
@@ -533,9 +702,19 @@ class App(ttk.Frame):
         if not file_path:
             return
 
-        svg_writer.save_as_svg(self.canvas, file_path)
+        # the whole timeline at the size of the canvas, not the zoomed view
+        svg_writer.save_as_svg(
+            self.stage_list,
+            file_path,
+            direction=self.direction_combobox.get(),
+            length_px=max(self.canvas.window_size, 100),
+            include_hour=self.time_format_combobox.get() == "h:mm:ss",
+            font=self.font_size_combobox.get(),
+        )
 
     def undo(self, event):
+        if self._flush_csv() is False:
+            return
         backup_dir = "backup"
         # move file backup to tar_path
         backup_file = os.path.join(backup_dir, os.path.basename(self.csv_path))
@@ -544,12 +723,21 @@ class App(ttk.Frame):
             self.load_file()
 
 
+def open_url(url):
+    import webbrowser
+
+    webbrowser.open(url)
+
+
 def quit(root):
     root.quit()
     root.destroy()
 
 
 def main():
+    # imported here so that importing this module stays fast (ttkthemes loads PIL)
+    import ttkthemes
+
     bg_color = "#e8e8e8"
     root = ttkthemes.ThemedTk(theme="breeze")
     root.geometry("1400x700+50+50")
@@ -572,11 +760,15 @@ def main():
         toml = tomllib.load(f)
     # Construct toml_dict for App
     excel_conf = toml.get("excel", {})
-    toml_dict = {**excel_conf}
+    timer_conf = toml.get("timer", {})
+    toml_dict = {**excel_conf, **timer_conf}
 
     app = App(root, toml_dict=toml_dict)
     root.protocol("WM_DELETE_WINDOW", lambda: quit(root))
     app.mainloop()
+    app.csv_writer.close()
+    if app.timer_handoff is not None:
+        app.timer_handoff.close()
 
 
 if __name__ == "__main__":
@@ -1,24 +1,42 @@
 import argparse
 import datetime
+import importlib
 import os
 import sys
 import tkinter as tk
 import tomllib
 from tkinter import ttk
 
+from . import clock as clock_module
 from . import (
     file_loader,
     gui_ble_button,
     icon_data,
-    sound,
+    scheduler,
     time_format,
+    timer_engine,
     timer_log,
+    timetable,
     trigger,
 )
 
 
+class NullAudioPlayer:
+    """Stands in for sound.AudioPlayer when the audio cannot be opened"""
+
+    def play_sound(self, filepath, play_time=None):
+        pass
+
+    def close(self):
+        pass
+
+
 class App(ttk.Frame):
     INTERMISSION = "Intermission"
+    # wake up slightly after a boundary so that the new second is displayed
+    WAKE_MARGIN_SEC = 0.002
+    # next update after an error in update_clock
+    RETRY_SEC = 0.1
 
     def __init__(
         self,
@@ -28,77 +46,121 @@ class App(ttk.Frame):
         is_hmmss=True,
         sound_file_name="countdown3_orange.wav",
         toml_dict={},
+        clock=None,
+        time_table=None,
+        encoding=None,
+        host=None,
+        style_prefix="",
     ):
         super().__init__(master)
         master.title("Timer")
+        # TimerHost whose scheduler, BLE loop and audio engine are shared
+        # (None: this timer has its own)
+        self.host = host
+        # ttk styles are per process; each timer of a host has its own ("cyan.")
+        self.style_prefix = style_prefix
+        # all elapsed times come from this monotonic clock
+        if host is not None:
+            clock = host.clock
+        self.clock = clock if clock is not None else clock_module.MonotonicClock()
         self.sound_file_name = sound_file_name
         self.hmmss = is_hmmss
         self.master = master
 
-        self.ap = sound.AudioPlayer()
-        self.ap.load_audio(sound_file_name)
-
-        self.trigger_device = trigger.Trigger(offset_sec=5)
+        # the audio backend (numpy, soundfile, sounddevice) is slow to load;
+        # it is opened once the window is up, or on first use
+        self._ap = None
+        self.master.after_idle(self._open_audio)
+
+        # BLE results are handled on the Tk thread, without blocking it
+        self.trigger_device = trigger.Trigger(
+            offset_sec=5,
+            clock=self.clock,
+            dispatch=self.master.after_idle,
+            ble_loop=host.ble_loop if host is not None else None,
+        )
 
         # header
-        head_frame = ttk.Frame(self.master, height=80)
+        head_frame = ttk.Frame(self.master, height=80, style=self._style("TFrame"))
         head_frame.pack(fill=tk.X, pady=10, padx=10)
         head_frame.propagate(False)
 
-        title_frame = ttk.Frame(head_frame)
+        title_frame = ttk.Frame(head_frame, style=self._style("TFrame"))
         title_frame.pack(side=tk.LEFT, anchor=tk.NW, fill=tk.X)
-        clock_frame = ttk.Frame(head_frame)
+        clock_frame = ttk.Frame(head_frame, style=self._style("TFrame"))
         clock_frame.pack(side=tk.RIGHT, fill=tk.X)
 
-        self.title_label = ttk.Label(title_frame, text="", font=("Helvetica", 28))
+        self.title_label = ttk.Label(
+            title_frame, text="", font=("Helvetica", 28), style=self._style("TLabel")
+        )
         self.title_label.pack(anchor=tk.W)
 
         self._main_clock_font_size = 12
         self.main_clock_label = ttk.Label(
-            clock_frame, font=("Helvetica", self._main_clock_font_size)
+            clock_frame,
+            font=("Helvetica", self._main_clock_font_size),
+            style=self._style("TLabel"),
         )
         self.main_clock_label.pack(anchor=tk.E, pady=1)
         self.main_clock_label.bind("<Button-1>", self._toggle_main_clock_font_size)
 
-        self.count_up_label = ttk.Label(clock_frame, font=("Helvetica", 18))
+        self.count_up_label = ttk.Label(
+            clock_frame, font=("Helvetica", 18), style=self._style("TLabel")
+        )
         self.count_up_label.pack(anchor=tk.E)
 
         # stage
-        center_frame = ttk.Frame(self.master)
+        center_frame = ttk.Frame(self.master, style=self._style("TFrame"))
         center_frame.pack(fill=tk.BOTH, expand=True)
-        self.current_stage_label = ttk.Label(center_frame, style="Small.TLabel")
+        self.current_stage_label = ttk.Label(
+            center_frame, style=self._style("Small.TLabel")
+        )
         self.current_stage_label.grid(row=0, column=0, sticky=tk.S)
-        self.current_instruction_label = ttk.Label(center_frame, font=("Helvetica", 18))
+        self.current_instruction_label = ttk.Label(
+            center_frame, font=("Helvetica", 18), style=self._style("TLabel")
+        )
         self.current_instruction_label.grid(row=1, column=0, sticky=tk.N)
         center_frame.columnconfigure(0, weight=1)
         center_frame.rowconfigure(0, weight=1)
         center_frame.rowconfigure(1, weight=1)
 
         # footer
-        buttons_frame = ttk.Frame(self.master)
+        buttons_frame = ttk.Frame(self.master, style=self._style("TFrame"))
         buttons_frame.pack(pady=(10, 5), side=tk.BOTTOM, fill=tk.BOTH, anchor=tk.S)
 
         # progress
-        progress_frame = ttk.Frame(buttons_frame)
+        progress_frame = ttk.Frame(buttons_frame, style=self._style("TFrame"))
         progress_frame.pack(pady=10, fill=tk.X)
         window_width = self.winfo_screenwidth()
         self.progress_bar = ttk.Progressbar(
-            progress_frame, orient=tk.HORIZONTAL, length=window_width
+            progress_frame,
+            orient=tk.HORIZONTAL,
+            length=window_width,
+            style=self._style("Horizontal.TProgressbar"),
         )
         self.progress_bar.pack()
         self.progress_bar["value"] = 0
         self.progress_bar["maximum"] = 100
 
         # next stage
-        next_frame = ttk.Frame(buttons_frame)
+        next_frame = ttk.Frame(buttons_frame, style=self._style("TFrame"))
         next_frame.pack(padx=10, pady=(0, 15), fill=tk.X)
-        self.next_stage_label = ttk.Label(next_frame, font=("Helvetica", 18))
+        self.next_stage_label = ttk.Label(
+            next_frame, font=("Helvetica", 18), style=self._style("TLabel")
+        )
         self.next_stage_label.pack(side=tk.LEFT, anchor=tk.E)
 
-        self.remaining_time_label = ttk.Label(next_frame, font=("Helvetica", 18))
+        self.remaining_time_label = ttk.Label(
+            next_frame, font=("Helvetica", 18), style=self._style("TLabel")
+        )
         self.remaining_time_label.pack(padx=(15, 0), side=tk.LEFT, anchor=tk.E)
 
-        self.start_btn = ttk.Button(buttons_frame, text="Start", command=self.start)
+        self.start_btn = ttk.Button(
+            buttons_frame,
+            text="Start",
+            command=self.start,
+            style=self._style("TButton"),
+        )
         self.start_btn.pack(padx=12, side=tk.LEFT)
         self.start_btn["state"] = "disabled"
 
@@ -106,19 +168,30 @@ class App(ttk.Frame):
             buttons_frame,
             text="Sound test",
             command=lambda: self.ap.play_sound(self.sound_file_name),
+            style=self._style("TButton"),
         )
         self.sound_test_btn.pack(padx=12, side=tk.LEFT)
 
-        self.reset_btn = ttk.Button(buttons_frame, text="Reset", command=self.reset_all)
+        self.reset_btn = ttk.Button(
+            buttons_frame,
+            text="Reset",
+            command=self.reset_all,
+            style=self._style("TButton"),
+        )
         self.reset_btn.pack(padx=12, side=tk.LEFT)
         self.reset_btn["state"] = "disabled"
 
         switch_label_size_button = ttk.Button(
-            buttons_frame, text="Label size", command=self.switch_label_size
+            buttons_frame,
+            text="Label size",
+            command=self.switch_label_size,
+            style=self._style("TButton"),
         )
         switch_label_size_button.pack(padx=12, side=tk.LEFT)
 
-        skip_btn = ttk.Button(buttons_frame, text="Skip", command=self.skip)
+        skip_btn = ttk.Button(
+            buttons_frame, text="Skip", command=self.skip, style=self._style("TButton")
+        )
         skip_btn.pack(padx=12, side=tk.LEFT)
 
         ble_names = toml_dict.get("ble_names", [])
@@ -131,6 +204,7 @@ class App(ttk.Frame):
                 self.trigger_device,
                 ble_names,
                 self.stop_delay_sec,
+                style_prefix=self.style_prefix,
             )
         else:
             self.enable_ble = False
@@ -138,106 +212,181 @@ class App(ttk.Frame):
         # close event
         self.master.protocol("WM_DELETE_WINDOW", self._on_closing)
 
-        self.stage_list = []
-        self.now_stage = 0
-        self.is_running = False
+        self.stage_list = timetable.Timetable()
+        # stage changes, cues and triggers are decided by the engine;
+        # the App only renders and forwards its events
+        self.engine = timer_engine.TimerEngine(
+            self.stage_list,
+            clock=self.clock,
+            intermission_desc=self.INTERMISSION,
+            enable_trigger=self.enable_ble,
+            trigger_offset_sec=self.trigger_device.offset_sec,
+            trigger_keyword=self.trigger_device.keyword,
+            trigger_lead_sec=toml_dict.get("trigger_lead_sec", 1.0),
+        )
+        self.engine.subscribe("session_start", self._on_session_start)
+        self.engine.subscribe("stage_change", self._on_stage_change)
+        self.engine.subscribe("sound_cue", self._on_sound_cue)
+        self.engine.subscribe("trigger_in", self._on_trigger_in)
+        self.engine.subscribe("trigger_out", self._on_trigger_out)
+        self.engine.subscribe("skip", self._on_skip)
+        self.engine.subscribe("session_end", self._on_session_end)
+
+        if host is not None:
+            self.scheduler = host.scheduler.client(self.update_clock)
+        else:
+            self.scheduler = scheduler.DeadlineScheduler(
+                self, self.update_clock, clock=self.clock
+            )
         self.update_clock()
-        self.ring_done = False
-        self.is_skip = False
-        self.disp_time = datetime.timedelta(seconds=0)
 
         print(f"Timeline CSV file path: {file_path}")
         self.csv_path = file_path
 
         # Make events.tsv
-        self.bids_log = timer_log.BIDSLog(self.csv_path)
+        self.bids_log = timer_log.BIDSLog(
+            self.csv_path,
+            clock=self.clock,
+            flush_interval_sec=toml_dict.get("flush_interval_sec", 1.0),
+            max_buffer_lines=toml_dict.get("flush_max_lines", 100),
+        )
         make_events_json = toml_dict.get("make_events_json", False)
         if make_events_json:
             self.bids_log.make_events_json()
 
         fall_back_encoding = toml_dict.get("read_extra_encoding", "utf-8-sig")
-        self.load_file(start_index, fallback_encoding=fall_back_encoding)
+        self.load_file(
+            start_index,
+            fallback_encoding=fall_back_encoding,
+            time_table=time_table,
+            encoding=encoding,
+        )
 
     def _toggle_main_clock_font_size(self, _event=None):
         self._main_clock_font_size = 28 if self._main_clock_font_size == 12 else 12
         self.main_clock_label.config(font=("Helvetica", self._main_clock_font_size))
 
     def update_clock(self):
-        now = datetime.datetime.now()
-        self.main_clock_label.config(text=now.strftime("%Y-%m-%d %H:%M:%S"))
-        self.after(100, self.update_clock)
+        try:
+            self._update_clock()
+        except Exception:
+            # a failing label, log write or cue must not stop the timer; retry
+            # later instead of at a deadline that may still be due
+            self.scheduler.schedule_in(self.RETRY_SEC)
+            raise
+        self.scheduler.schedule_at(self._next_deadline_ns())
+
+    def _next_deadline_ns(self):
+        """
+        Next instant at which the display, the sound or the BLE trigger changes:
+        the next wall-clock second or the next deadline of the engine.
+        """
+        now_ns = self.clock.now_ns()
+        deadline_ns = now_ns + (1_000_000 - self.clock.wall_now().microsecond) * 1000
+        engine_deadline_ns = self.engine.next_deadline_ns()
+        if engine_deadline_ns is not None:
+            deadline_ns = min(deadline_ns, engine_deadline_ns)
+        return deadline_ns + int(self.WAKE_MARGIN_SEC * 1e9)
+
+    def _update_clock(self):
+        self.main_clock_label.config(
+            text=self.clock.wall_now().strftime("%Y-%m-%d %H:%M:%S")
+        )
+        self.engine.tick()
 
         # If the timer is stopped, reset the timer
-        if self.is_running is False:
+        if self.engine.is_running is False:
             if self.hmmss == True:
                 self.count_up_label.config(text="0:00:00")
             else:
                 self.count_up_label.config(text="0:00")
-            self.now_stage = 0
             self.progress_bar.config(value=0)
-            self.reset_time = datetime.datetime.now()
-            self.total_skip_time = datetime.timedelta(seconds=0)
-            self.is_skip = False
             if self.enable_ble:
                 self.ble_manager.update_ble_status()
             return
-        # cnt_up: internal time counter
-        # self.disp_time: time used for display and log
-        cnt_up = now - self.reset_time
-        self.disp_time = cnt_up - self.total_skip_time
+
+        disp_time = clock_module.ns_to_timedelta(self.engine.disp_time_ns)
         self.count_up_label.config(
-            text=time_format.timedelta_to_str(self.disp_time, self.hmmss)
+            text=time_format.timedelta_to_str(disp_time, self.hmmss)
         )
 
-        current_stage = self.stage_list[self.now_stage]
-        current_start_dt = current_stage["start_dt"]
-        current_end_dt = current_stage["end_dt"]
-        # stage change if end time is reached
-        if cnt_up > current_end_dt:
-            self.now_stage += 1
-            if self.now_stage < len(self.stage_list):
-                print(
-                    f"stage change {self.now_stage} (/{len(self.stage_list)}) {cnt_up}"
-                )
-                current_stage = self.stage_list[self.now_stage]
-                current_start_dt = current_stage["start_dt"]
-                current_end_dt = current_stage["end_dt"]
-                self.bids_log.add_task_log()
-                if cnt_up < current_start_dt:
-                    msg = f"{self.INTERMISSION}({current_stage['start_dt']}-{current_stage['end_dt']})"
-                    self.bids_log.set_task_log(self.INTERMISSION)
-                else:
-                    msg = f"{current_stage['title']}({current_stage['start_dt']}-{current_stage['end_dt']})"
-                    self.bids_log.set_task_log(current_stage["title"])
-        #                self.tlog.add_log(self.disp_time, msg)
-
-        # If the last stage is reached, stop the timer
-        if self.now_stage >= len(self.stage_list):
-            self.current_stage_label.config(text="End")
-            self.current_instruction_label.config(text="")
-            self.next_stage_label.config(text="---")
-            self.remaining_time_label.config(text="")
-            self.is_running = False
-            self.bids_log.add_task_log()
-            self.bids_log.add_control_log("session_end")
-            self.trigger_device.trigger_out("End")
-            return
-
+        current_stage = self.engine.current_stage
         self.current_stage_label.config(text=current_stage["title"])
         self.title_label.config(text=current_stage["member"])
         self.update_next_stage_label(end_text="End")
-        self.update_instruction_label(current_stage, current_start_dt, current_end_dt)
-
-        remaining_dt = self.calc_remaining_time_next(cnt_up, current_end_dt)
-        self.sound(remaining_dt, offset_sec=3)
-        # BLE
+        self.update_instruction_label(
+            current_stage, current_stage["start_dt"], current_stage["end_dt"]
+        )
         if self.enable_ble:
-            self.trigger(self.now_stage, remaining_dt)
             self.ble_manager.update_ble_status()
 
+        remaining_dt = clock_module.ns_to_timedelta(self.engine.remaining_ns)
         self.update_remaining_time_label(remaining_dt)
-        self.update_progress_bar(cnt_up, current_end_dt)
-        self.update_skip(remaining_dt, offset_sec=4)
+        self.progress_bar.config(value=self.engine.get_progress())
+
+    def _on_session_start(self, stage):
+        self.bids_log.mark_start_time()
+        self.bids_log.set_task_log(stage["title"])
+
+    @property
+    def ap(self):
+        self._open_audio()
+        return self._ap
+
+    def _open_audio(self):
+        if self._ap is not None:
+            return
+        try:
+            if self.host is not None:
+                self._ap = self.host.audio_player()
+            else:
+                from . import sound
+
+                # all cues are decoded and the output stream is opened once here
+                self._ap = sound.AudioPlayer(clock=self.clock)
+        except Exception as e:
+            # opened on first use, possibly in the middle of a session: report
+            # it once and keep the timer running without cues
+            print(f"Audio is not available, cues are not played: {e}")
+            self._ap = NullAudioPlayer()
+
+    def _on_stage_change(self, index, stage, log_title, cnt_up_ns):
+        cnt_up = clock_module.ns_to_timedelta(cnt_up_ns)
+        print(f"stage change {index} (/{len(self.stage_list)}) {cnt_up}")
+        self.bids_log.add_task_log()
+        self.bids_log.set_task_log(log_title)
+
+    def _on_sound_cue(self, stage, at_ns):
+        self.ap.play_sound(self.sound_file_name, play_time=at_ns)
+
+    def _on_trigger_in(self, instruction, target_ns):
+        # predicted start now, estimated actual start when the cameras answer
+        is_start_trigger = self.trigger_device.trigger_in(
+            instruction,
+            on_started=lambda start_ns: self.bids_log.add_control_log(
+                "video_record_start", at_ns=start_ns
+            ),
+            target_ns=target_ns,
+        )
+        if is_start_trigger:
+            self.bids_log.add_control_log(
+                "video_record_start_scheduled", at_ns=target_ns
+            )
+
+    def _on_trigger_out(self, instruction):
+        self.trigger_device.trigger_out(instruction)
+
+    def _on_skip(self, skip_ns):
+        self.bids_log.add_control_log("task_skip")
+
+    def _on_session_end(self, cnt_up_ns):
+        self.current_stage_label.config(text="End")
+        self.current_instruction_label.config(text="")
+        self.next_stage_label.config(text="---")
+        self.remaining_time_label.config(text="")
+        self.bids_log.add_task_log()
+        self.bids_log.add_control_log("session_end")
+        print(f"Scheduler drift: {self.scheduler.drift.summary()}")
 
     def update_instruction_label(self, current_stage, start_dt, end_dt):
         # Display instruction if it exists, otherwise display start and end time
@@ -248,53 +397,10 @@ class App(ttk.Frame):
             end_str = time_format.timedelta_to_str(end_dt, self.hmmss)
             self.current_instruction_label.config(text=f"{start_str} - {end_str}")
 
-    def calc_remaining_time_next(self, cnt_up, next_dt):
-        if next_dt < cnt_up:
-            remaining_dt = datetime.timedelta(seconds=0)
-        else:
-            remaining_dt = next_dt - cnt_up + datetime.timedelta(seconds=1)
-        return remaining_dt
-
-    def sound(self, remaining_dt, offset_sec=3):
-        if remaining_dt.seconds == offset_sec and not self.ring_done:
-            self.ap.play_sound(self.sound_file_name)
-            self.ring_done = True
-        if remaining_dt.seconds < offset_sec:
-            self.ring_done = False
-
-    def trigger(self, now_stage, remaining_dt):
-        is_start_trigger = False
-        next_stage = now_stage + 1
-        if next_stage > len(self.stage_list):
-            return
-
-        if next_stage == len(self.stage_list):
-            next_stage_instruction = "End"
-        else:
-            next_stage_instruction = self.stage_list[next_stage]["instruction"]
-        current_stage_instruction = self.stage_list[now_stage]["instruction"]
-        # Trigger in before X seconds of next stage
-        if remaining_dt < datetime.timedelta(seconds=self.trigger_device.offset_sec):
-            is_start_trigger = self.trigger_device.trigger_in(next_stage_instruction)
-        else:
-            # for 1st stage
-            is_start_trigger = self.trigger_device.trigger_in(current_stage_instruction)
-            # Trigger out when leaving current stage
-            is_stop_trigger = self.trigger_device.trigger_out(current_stage_instruction)
-
-        if is_start_trigger:
-            #            self.tlog.add_log(self.disp_time, "recording start triggered")
-            self.bids_log.add_control_log("video_record_start")
-
-    def update_progress_bar(self, cnt_up, next_dt):
-        duration_dt = self.stage_list[self.now_stage]["duration"]
-        progress = cnt_up - next_dt
-        val = 100 + progress / duration_dt * 100
-        self.progress_bar.config(value=val)
-
     def update_next_stage_label(self, end_text="End"):
-        if self.now_stage + 1 < len(self.stage_list):
-            self.next_stage_label["text"] = self.stage_list[self.now_stage + 1]["title"]
+        next_stage = self.engine.next_stage
+        if next_stage is not None:
+            self.next_stage_label["text"] = next_stage["title"]
         else:
             self.next_stage_label["text"] = end_text
 
@@ -306,20 +412,7 @@ class App(ttk.Frame):
                 text=time_format.timedelta_to_str(remaining_dt, self.hmmss)
             )
 
-    def update_skip(self, remaining_dt, offset_sec=4):
-        if self.is_skip:
-            # prevent over skip
-            if remaining_dt > datetime.timedelta(seconds=offset_sec):
-                skip_time = remaining_dt - datetime.timedelta(seconds=offset_sec)
-                self.reset_time -= skip_time
-                self.total_skip_time += skip_time
-                #                self.tlog.skip_log(self.disp_time)
-                self.bids_log.add_control_log("task_skip")
-            self.is_skip = False
-
     def reset_all(self):
-        self.is_running = False
-        #        self.tlog.reset_log(self.disp_time)
         self.start_btn.config(state="normal")
         self.sound_test_btn.config(state="normal")
         self.reset_btn.config(state="disabled")
@@ -329,50 +422,53 @@ class App(ttk.Frame):
         self.remaining_time_label.config(text="")
 
         # BLE stop
+        self.engine.reset()
         self.trigger_device.trigger_out("")
-
-        # for close log
-        self.disp_time = datetime.timedelta(seconds=0)
+        self.scheduler.schedule_now()
 
     def start(self):
-        #        self.tlog.start_log()
-        self.bids_log.mark_start_time(datetime.datetime.now())
         self.start_btn.config(state="disabled")
         self.sound_test_btn.config(state="disabled")
         self.reset_btn.config(state="normal")
         if self.enable_ble:
             self.ble_manager.set_disabled()
-        self.is_running = True
-
-        # initial event log
-        current_stage = self.stage_list[0]
-        msg = f"{current_stage['title']}({current_stage['start_dt']}-{current_stage['end_dt']})"
-        #        self.tlog.add_log(self.disp_time, msg)
-        self.bids_log.set_task_log(current_stage["title"])
+        self.engine.start()
+        self.scheduler.schedule_now()
 
     def skip(self):
-        self.is_skip = True
+        self.engine.skip()
+        self.scheduler.schedule_now()
+
+    def _style(self, name):
+        return f"{self.style_prefix}{name}"
 
     def switch_label_size(self):
-        if self.current_stage_label["style"] == "Small.TLabel":
-            self.current_stage_label["style"] = "Large.TLabel"
-        elif self.current_stage_label["style"] == "Large.TLabel":
-            self.current_stage_label["style"] = "Tiny.TLabel"
+        style = str(self.current_stage_label["style"])
+        if style == self._style("Small.TLabel"):
+            self.current_stage_label["style"] = self._style("Large.TLabel")
+        elif style == self._style("Large.TLabel"):
+            self.current_stage_label["style"] = self._style("Tiny.TLabel")
         else:
-            self.current_stage_label["style"] = "Small.TLabel"
+            self.current_stage_label["style"] = self._style("Small.TLabel")
 
-    def load_file(self, start_index, fallback_encoding="utf-8-sig"):
+    def load_file(
+        self, start_index, fallback_encoding="utf-8-sig", time_table=None, encoding=None
+    ):
+        """time_table: timetable parsed by the Previewer (the file is not read)"""
         fl = file_loader.FileLoader(
             self.INTERMISSION, fallback_encoding=fallback_encoding
         )
-        fl.load_file_for_timer(start_index, self.csv_path)
+        if time_table is None:
+            fl.load_file_for_timer(start_index, self.csv_path)
+        else:
+            fl.load_timetable_for_timer(start_index, time_table, encoding)
+        print(f"Timeline CSV encoding: {fl.get_encoding()}")
 
         self.stage_list = fl.get_stage_list()
+        self.engine.set_stage_list(self.stage_list)
 
         self.title_label.config(text=self.stage_list[0]["member"])
         self.next_stage_label.config(text=self.stage_list[0]["title"])
-        self.now_stage = 0
-        self.is_running = False
         self.start_btn["state"] = "normal"
 
         for i, stage in enumerate(self.stage_list):
@@ -380,44 +476,80 @@ class App(ttk.Frame):
                 f"{i}: {stage['title']}({stage['start_dt']}-{stage['end_dt']}) {stage['instruction']}"
             )
 
+    def get_drift_stats(self):
+        return self.scheduler.drift
+
     def _on_closing(self):
+        self.scheduler.cancel()
+        print(f"Scheduler drift: {self.scheduler.drift.summary()}")
         self.trigger_device.trigger_out("")
         #        self.tlog.close_log(self.disp_time)
+        self.bids_log.close()
+        if self._ap is not None:
+            self._ap.close()
+        if self.host is not None:
+            self.host.scheduler.remove(self.scheduler)
+            self.master.destroy()
+            self.host.timer_closed(self)
+            return
         self.master.quit()
         self.master.destroy()
 
 
-def main(
-    file_path=None, fg_color: str = "orange", start_index: int = 0, hmmss: str = "hmmss"
-):
-    bg_color = "#202020"
-    color_and_sound = {
-        "orange": "countdown3_orange.wav",
-        "cyan": "countdown3_cyan.wav",
-        "lightgreen": "countdown3_lightgreen.wav",
-    }
+def load_config():
+    if getattr(sys, "frozen", False):
+        current_dir = os.path.dirname(sys.executable)
+    else:
+        current_dir = os.path.dirname(__file__)
+    ble_file_name = os.path.join(current_dir, "config.toml")
+    with open(ble_file_name, "rb") as f:
+        return tomllib.load(f)
 
-    root = tk.Tk()
-    root.geometry("900x420+0+0")
-    root.configure(background=bg_color)
-    root.tk.call("wm", "iconphoto", root._w, tk.PhotoImage(data=icon_data.icon_data))
-    s = ttk.Style(root)
-    s.theme_use("default")
-    s.configure("TFrame", background=bg_color)
-    s.configure("TLabel", foreground=fg_color, background=bg_color)
+
+BG_COLOR = "#202020"
+COLOR_AND_SOUND = {
+    "orange": "countdown3_orange.wav",
+    "cyan": "countdown3_cyan.wav",
+    "lightgreen": "countdown3_lightgreen.wav",
+}
+
+
+def configure_window(window, fg_color, style_prefix="", geometry="900x420+0+0"):
+    """Window and ttk styles of one timer (style names start with style_prefix)"""
+    bg_color = BG_COLOR
+    window.geometry(geometry)
+    window.configure(background=bg_color)
+    window.tk.call(
+        "wm", "iconphoto", window._w, tk.PhotoImage(data=icon_data.icon_data)
+    )
+    p = style_prefix
+    s = ttk.Style(window)
+    s.configure(f"{p}TFrame", background=bg_color)
+    s.configure(f"{p}TLabel", foreground=fg_color, background=bg_color)
     s.configure(
-        "Tiny.TLabel", foreground=fg_color, background=bg_color, font=("Helvetica", 36)
+        f"{p}Tiny.TLabel",
+        foreground=fg_color,
+        background=bg_color,
+        font=("Helvetica", 36),
     )
     s.configure(
-        "Small.TLabel", foreground=fg_color, background=bg_color, font=("Helvetica", 48)
+        f"{p}Small.TLabel",
+        foreground=fg_color,
+        background=bg_color,
+        font=("Helvetica", 48),
     )
     s.configure(
-        "Large.TLabel", foreground=fg_color, background=bg_color, font=("Helvetica", 64)
+        f"{p}Large.TLabel",
+        foreground=fg_color,
+        background=bg_color,
+        font=("Helvetica", 64),
+    )
+    s.configure(f"{p}TButton", foreground=fg_color, background=bg_color, relief="flat")
+    s.map(
+        f"{p}TButton", background=[("active", "#203030")], relief=[("active", "flat")]
     )
-    s.configure("TButton", foreground=fg_color, background=bg_color, relief="flat")
-    s.map("TButton", background=[("active", "#203030")], relief=[("active", "flat")])
     s.configure(
-        "Horizontal.TProgressbar",
+        f"{p}Horizontal.TProgressbar",
         troughcolor=bg_color,
         troughrelief="flat",
         background=fg_color,
@@ -425,28 +557,44 @@ def main(
         thickness=5,
     )
     s.map(
-        "Horizontal.TProgressbar",
+        f"{p}Horizontal.TProgressbar",
         troughcolor=[("active", bg_color), ("!active", bg_color)],
     )
 
+
+def timer_config(toml, fg_color):
+    """toml_dict of App for the timer of fg_color"""
+    ble_conf = toml.get("ble", {}).get(fg_color, {})
+    log_conf = toml.get("log", {})
+    excel_conf = toml.get("excel", {})
+    return {**ble_conf, **log_conf, **excel_conf}
+
+
+def main(
+    file_path=None,
+    fg_color: str = "orange",
+    start_index: int = 0,
+    hmmss: str = "hmmss",
+    root=None,
+    toml=None,
+    time_table=None,
+    encoding=None,
+):
+    if root is None:
+        root = tk.Tk()
+    ttk.Style(root).theme_use("default")
+    configure_window(root, fg_color)
+
     if hmmss == "hmmss":
         is_hmmss = True
     else:
         is_hmmss = False
 
     # Load toml config
-    if getattr(sys, "frozen", False):
-        current_dir = os.path.dirname(sys.executable)
-    else:
-        current_dir = os.path.dirname(__file__)
-    ble_file_name = os.path.join(current_dir, "config.toml")
-    with open(ble_file_name, "rb") as f:
-        toml = tomllib.load(f)
+    if toml is None:
+        toml = load_config()
     # Construct toml_dict for App
-    ble_conf = toml.get("ble", {}).get(fg_color, {})
-    log_conf = toml.get("log", {})
-    excel_conf = toml.get("excel", {})
-    toml_dict = {**ble_conf, **log_conf, **excel_conf}
+    toml_dict = timer_config(toml, fg_color)
 
     print(f"TOML config: {toml_dict}")
 
@@ -455,22 +603,83 @@ def main(
         file_path,
         start_index,
         is_hmmss,
-        sound_file_name=color_and_sound[fg_color],
+        sound_file_name=COLOR_AND_SOUND[fg_color],
         toml_dict=toml_dict,
+        time_table=time_table,
+        encoding=encoding,
     )
+    root.deiconify()
     app.mainloop()
 
 
+def standby(address):
+    """
+    Pre-spawned timer (see timer_handoff): create the (hidden) window, read
+    the config and load the backends, then wait for the Previewer to hand
+    over the parsed timeline.
+    """
+    from . import timer_handoff
+
+    root = tk.Tk()
+    root.withdraw()
+    toml = load_config()
+    _warm_up(toml)
+
+    request = timer_handoff.wait_for_request(address)
+    if request is None:
+        root.destroy()
+        return
+    main(
+        request.file_path,
+        request.fg_color,
+        request.start_index,
+        request.hmmss,
+        root=root,
+        toml=toml,
+        time_table=request.time_table,
+        encoding=request.encoding,
+    )
+
+
+def _warm_up(toml):
+    """Import the backends that the timer otherwise loads on first use"""
+    modules = ["numpy", "soundfile", "sounddevice", f"{__package__}.sound"]
+    if any(conf.get("ble_names") for conf in toml.get("ble", {}).values()):
+        modules += ["bleak", f"{__package__}.ble_control"]
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except (ImportError, OSError) as e:
+            # OSError: sounddevice without PortAudio (reported when used)
+            print(f"Warm-up: {name} not loaded ({e})")
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Timeline-kun Timer: manage timed tasks with GUI."
     )
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         "--file_path",
         type=str,
-        required=True,
         help="Path to the CSV file containing task definitions (required).",
     )
+    source.add_argument(
+        "--standby",
+        type=str,
+        metavar="HOST:PORT",
+        help="Start hidden and wait for the Previewer to hand over a timeline "
+        "(used by the Previewer).",
+    )
+    source.add_argument(
+        "--timer",
+        type=str,
+        nargs=2,
+        action="append",
+        metavar=("COLOR", "FILE_PATH"),
+        help="Run several timers in one process (repeat for each timer, "
+        "e.g. --timer orange a.csv --timer cyan b.csv).",
+    )
     parser.add_argument(
         "--fg_color",
         type=str,
@@ -497,6 +706,15 @@ def build_parser() -> argparse.ArgumentParser:
 def cli(argv=None):
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.standby is not None:
+        return standby(args.standby)
+    if args.timer is not None:
+        for color, _ in args.timer:
+            if color not in COLOR_AND_SOUND:
+                parser.error(f"--timer: invalid color {color!r}")
+        from . import timer_host
+
+        return timer_host.main(args.timer, args.start_index, args.hmmss)
     return main(args.file_path, args.fg_color, args.start_index, args.hmmss)
 
 
@@ -1,14 +1,22 @@
 # ble_control.py
 import asyncio
-import queue
+import itertools
+import json
+import os
 import threading
+from concurrent.futures import Future
 from dataclasses import dataclass, field
 from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from bleak import BleakClient, BleakScanner
+from . import parse_cache
+
+# bleak is imported on first use: it is slow to import and not needed
+# unless BLE devices are configured
+ADDRESS_CACHE_FILE = "ble_addresses.json"
 
 Result = Tuple[str, int, str]
 CommandHandler = Callable[[Optional[Any]], Awaitable[Result]]
+ResultCallback = Callable[[Result], None]
 
 
 @dataclass(frozen=True)
@@ -115,12 +123,38 @@ class NotifyCenter:
             return
 
 
+def _bleak_scanner(**kwargs: Any) -> Any:
+    from bleak import BleakScanner
+
+    return BleakScanner(**kwargs)
+
+
 class DeviceSession:
+    # weight of the newest sample in the round-trip average
+    RTT_ALPHA = 0.3
+
     def __init__(self, address: str) -> None:
         self.address = address
+        from bleak import BleakClient
+
         self.client = BleakClient(address)
         self.center = NotifyCenter()
         self.last_alive: bool = False
+        # smoothed keep-alive round trip (None until the first answer)
+        self.rtt_sec: Optional[float] = None
+
+    @property
+    def one_way_latency_sec(self) -> float:
+        """Estimated time for a command to reach the camera"""
+        if self.rtt_sec is None:
+            return 0.0
+        return self.rtt_sec / 2
+
+    def add_rtt_sample(self, rtt_sec: float) -> None:
+        if self.rtt_sec is None:
+            self.rtt_sec = rtt_sec
+        else:
+            self.rtt_sec += self.RTT_ALPHA * (rtt_sec - self.rtt_sec)
 
     async def connect_and_listen(self) -> bool:
         if not self.client.is_connected:
@@ -129,6 +163,12 @@ class DeviceSession:
         await self.client.start_notify(BLE.RESPONSE_UUID, self.center.get_handler())
         return True
 
+    async def disconnect(self) -> None:
+        try:
+            await self.client.disconnect()
+        except Exception as e:
+            print(f"disconnect failed {self.address} {e}")
+
     async def ensure_connected(self) -> bool:
         if self.client.is_connected:
             return True
@@ -151,7 +191,9 @@ class DeviceSession:
             return False
 
     async def keep_alive_roundtrip(self, timeout: float = 3.0) -> bool:
+        loop = asyncio.get_running_loop()
         self.center.clear(BLE.KEEP_ALIVE_ID)
+        t0 = loop.time()
         if not await self.write_command(BLE.SETTING_UUID, BLE.KEEP_ALIVE):
             self.last_alive = False
             return False
@@ -159,38 +201,269 @@ class DeviceSession:
         if msg and msg.status != BLE.OK:
             print(msg)
         ok = bool(msg and msg.msg_type == BLE.RESP_PREFIX and msg.status == BLE.OK)
+        if ok:
+            self.add_rtt_sample(loop.time() - t0)
         self.last_alive = ok
         return ok
 
 
+class AddressCache:
+    """
+    Camera name -> BLE address of the last successful connection (JSON file).
+
+    The file lives in the per-user cache directory and is only read or written
+    if that directory is private (see parse_cache.is_private_dir), so another
+    user cannot plant addresses. save() merges with the file on disk, so the
+    timers of other processes (or of the same host) keep their addresses.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        if path is None:
+            path = os.path.join(parse_cache.user_cache_dir(), ADDRESS_CACHE_FILE)
+        self.path = path
+        self.addresses: Dict[str, str] = self._read()
+        # names set by this instance (written over the file's entries)
+        self._changed: Dict[str, str] = {}
+
+    def _read(self) -> Dict[str, str]:
+        if not parse_cache.is_private_dir(os.path.dirname(self.path)):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {k: v for k, v in data.items() if isinstance(v, str)}
+
+    def get(self, name: str) -> Optional[str]:
+        return self.addresses.get(name)
+
+    def set(self, name: str, address: str) -> None:
+        self.addresses[name] = address
+        self._changed[name] = address
+
+    def save(self) -> None:
+        dir_path = os.path.dirname(self.path)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(dir_path, mode=0o700, exist_ok=True)
+            if not parse_cache.is_private_dir(dir_path):
+                print(f"BLE address cache not saved: {dir_path} is not private")
+                return
+            self.addresses = {**self._read(), **self._changed}
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.addresses, f, indent=2)
+            # replaces a planted symlink instead of writing through it
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"BLE address cache not saved: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+@dataclass
+class FanOutReport:
+    """Per-device result of one operation sent to all devices at once"""
+
+    operation: str
+    # address -> (ok, seconds from the common start to the acknowledgement)
+    results: Dict[str, Tuple[bool, float]] = field(default_factory=dict)
+
+    @property
+    def ok_count(self) -> int:
+        return sum(1 for ok, _ in self.results.values() if ok)
+
+    @property
+    def mean_sec(self) -> float:
+        latencies = [lat for ok, lat in self.results.values() if ok]
+        if not latencies:
+            return 0.0
+        return sum(latencies) / len(latencies)
+
+    @property
+    def spread_sec(self) -> float:
+        """Time between the first and the last successful acknowledgement"""
+        latencies = [lat for ok, lat in self.results.values() if ok]
+        if len(latencies) < 2:
+            return 0.0
+        return max(latencies) - min(latencies)
+
+    def summary(self) -> str:
+        devices = ", ".join(
+            f"{addr} {lat * 1000:.0f} ms{'' if ok else ' (failed)'}"
+            for addr, (ok, lat) in self.results.items()
+        )
+        return (
+            f"{self.operation}: {self.ok_count}/{len(self.results)} ok, "
+            f"spread {self.spread_sec * 1000:.0f} ms [{devices}]"
+        )
+
+
 class BleManager:
     def __init__(
-        self, target_device_names: List[str], keep_alive_sec: float = 3.0
+        self,
+        target_device_names: List[str],
+        keep_alive_sec: float = 3.0,
+        command_timeout_sec: float = 3.0,
+        connect_timeout_sec: float = 20.0,
+        cached_connect_timeout_sec: float = 5.0,
+        scan_timeout_sec: float = 10.0,
+        address_cache: Optional["AddressCache"] = None,
+        session_factory: Callable[[str], DeviceSession] = DeviceSession,
+        scanner_factory: Optional[Callable[..., Any]] = None,
     ) -> None:
         self.target_device_names = target_device_names
         self.sessions: List[DeviceSession] = []
         self.keep_alive_sec = keep_alive_sec
+        self.command_timeout_sec = command_timeout_sec
+        self.connect_timeout_sec = connect_timeout_sec
+        # a stale cached address must not hold up the scanned one for long
+        self.cached_connect_timeout_sec = cached_connect_timeout_sec
+        self.scan_timeout_sec = scan_timeout_sec
+        self.address_cache = (
+            address_cache if address_cache is not None else AddressCache()
+        )
+        self.session_factory = session_factory
+        self.scanner_factory = (
+            scanner_factory if scanner_factory is not None else _bleak_scanner
+        )
         self._keep_task: Optional[asyncio.Task] = None
         self._running = False
         self.is_recording = False
+        # operation -> FanOutReport of the last run
+        self.reports: Dict[str, FanOutReport] = {}
+
+    async def fan_out(
+        self,
+        operation: str,
+        func: Callable[[DeviceSession], Awaitable[bool]],
+        timeout: float,
+    ) -> FanOutReport:
+        """
+        Run func on every session concurrently, each with its own timeout, and
+        record how long each device took to acknowledge.
+        """
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+
+        async def run_one(s: DeviceSession) -> Tuple[bool, float]:
+            try:
+                ok = bool(await asyncio.wait_for(func(s), timeout=timeout))
+            except asyncio.TimeoutError:
+                print(f"{operation} timeout {s.address}")
+                ok = False
+            except Exception as e:
+                print(f"{operation} failed {s.address} {e}")
+                ok = False
+            return ok, loop.time() - t0
+
+        sessions = list(self.sessions)
+        results = await asyncio.gather(*(run_one(s) for s in sessions))
+        report = FanOutReport(operation)
+        for s, res in zip(sessions, results):
+            report.results[s.address] = res
+        self.reports[operation] = report
+        return report
 
     async def discover_and_connect(self) -> int:
-        devices = await BleakScanner.discover(timeout=10)
+        """
+        Connect to every camera in target_device_names.
+        Cameras with a cached address are connected directly (with the short
+        cached_connect_timeout_sec); the others are connected as soon as their
+        advertisement is seen. If a camera advertises another address than the
+        cached one, that address is raced against the cached one right away.
+        Scanning stops when every camera is found, or after scan_timeout_sec.
+        """
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
         names = set(n for n in self.target_device_names if n)
-        addrs: List[str] = []
-        for d in devices:
-            if d.name and d.name in names:
-                print(f"found {d.name} {d.address}")
-                addrs.append(d.address)
-
-        self.sessions = [DeviceSession(addr) for addr in addrs]
-        ok = 0
-        for s in self.sessions:
+        report = FanOutReport("connect")
+        connected: Dict[str, DeviceSession] = {}
+        # name -> address seen in advertisements
+        found: Dict[str, str] = {}
+        # name -> cached address whose connection is still being tried
+        direct: Dict[str, str] = {}
+        tasks: List[asyncio.Task] = []
+        all_found = asyncio.Event()
+
+        def check_all_found() -> None:
+            if all(n in connected or n in found for n in names):
+                all_found.set()
+
+        async def connect(name: str, address: str, timeout: float) -> bool:
+            if name in connected:
+                return True
+            session = self.session_factory(address)
             try:
-                await s.connect_and_listen()
-                ok += 1
+                await asyncio.wait_for(session.connect_and_listen(), timeout=timeout)
             except Exception as e:
-                print(f"connect failed {s.address} {e}")
+                print(f"connect failed {name} {address} {e!r}")
+                report.results[address] = (False, loop.time() - t0)
+                return False
+            if name in connected:
+                # the other address of the race won
+                await session.disconnect()
+                return True
+            elapsed = loop.time() - t0
+            print(f"connected {name} {address} in {elapsed:.2f} s")
+            report.results[address] = (True, elapsed)
+            connected[name] = session
+            check_all_found()
+            return True
+
+        async def connect_cached(name: str, address: str) -> None:
+            ok = await connect(name, address, self.cached_connect_timeout_sec)
+            del direct[name]
+            if ok:
+                return
+            # the same address was advertised: it may just be slow, try again
+            # with the full timeout (another address is already being tried)
+            if found.get(name) == address:
+                await connect(name, address, self.connect_timeout_sec)
+
+        def on_detect(device, advertisement_data) -> None:
+            name = device.name or advertisement_data.local_name
+            if name not in names or name in found:
+                return
+            print(f"found {name} {device.address}")
+            found[name] = device.address
+            if name not in connected and direct.get(name) != device.address:
+                tasks.append(
+                    asyncio.create_task(
+                        connect(name, device.address, self.connect_timeout_sec)
+                    )
+                )
+            check_all_found()
+
+        for name in names:
+            address = self.address_cache.get(name)
+            if address is not None:
+                direct[name] = address
+                tasks.append(asyncio.create_task(connect_cached(name, address)))
+
+        scanner = self.scanner_factory(detection_callback=on_detect)
+        await scanner.start()
+        try:
+            await asyncio.wait_for(all_found.wait(), timeout=self.scan_timeout_sec)
+        except asyncio.TimeoutError:
+            missing = sorted(names - set(found) - set(connected))
+            print(f"not found: {', '.join(missing)}")
+        finally:
+            await scanner.stop()
+        await asyncio.gather(*tasks)
+
+        self.sessions = list(connected.values())
+        for name, session in connected.items():
+            self.address_cache.set(name, session.address)
+        self.address_cache.save()
+
+        self.reports["connect"] = report
+        print(report.summary())
+        ok = len(self.sessions)
 
         if ok:
             self.start_keep_alive_loop()
@@ -214,47 +487,118 @@ class BleManager:
             except asyncio.CancelledError:
                 break
 
+    async def _keep_alive_one(self, s: DeviceSession) -> bool:
+        alive = await s.keep_alive_roundtrip(timeout=self.command_timeout_sec)
+        if not alive:
+            # 再接続のチャンスをここで与える
+            if await s.ensure_connected():
+                alive = await s.keep_alive_roundtrip(timeout=self.command_timeout_sec)
+        return alive
+
     async def send_keep_alive_all(self) -> int:
-        ok_cnt = 0
-        for s in list(self.sessions):
-            alive = await s.keep_alive_roundtrip(timeout=3.0)
-            if not alive:
-                # 再接続のチャンスをここで与える
-                if await s.ensure_connected():
-                    alive = await s.keep_alive_roundtrip(timeout=3.0)
-            if alive:
-                ok_cnt += 1
+        # roundtrip + reconnect + roundtrip
+        timeout = 2 * self.command_timeout_sec + self.connect_timeout_sec
+        report = await self.fan_out("keep_alive", self._keep_alive_one, timeout)
+        ok_cnt = report.ok_count
         #        print(f"keep alive {ok} of {len(self.sessions)}")
         if ok_cnt < len(self.sessions):
             print(f"[!] keep alive ok {ok_cnt} of {len(self.sessions)}")
         return ok_cnt
 
     async def start_recording_all(self) -> int:
-        cnt = 0
-        for s in self.sessions:
-            if await s.write_command(BLE.COMMAND_UUID, BLE.START_RECORDING):
-                cnt += 1
+        return await self.start_recording_at(asyncio.get_running_loop().time())
+
+    async def start_recording_at(self, target: float) -> int:
+        """
+        Start recording so that every camera begins at target (loop time).
+        Each command is sent ahead by the camera's one-way latency (half the
+        keep-alive round trip). The "record_start" report holds the estimated
+        start of each camera relative to target.
+        """
+        loop = asyncio.get_running_loop()
+        starts: Dict[str, float] = {}
+
+        async def start_one(s: DeviceSession) -> bool:
+            latency = s.one_way_latency_sec
+            await asyncio.sleep(max(0.0, target - latency - loop.time()))
+            ok = await s.write_command(BLE.COMMAND_UUID, BLE.START_RECORDING)
+            # the acknowledgement takes as long to come back
+            starts[s.address] = loop.time() - latency
+            return ok
+
+        timeout = max(0.0, target - loop.time()) + self.command_timeout_sec
+        report = await self.fan_out("record_start", start_one, timeout)
+        for address, (ok, lat) in report.results.items():
+            if address in starts:
+                report.results[address] = (ok, starts[address] - target)
+        print(report.summary())
+        cnt = report.ok_count
         self.is_recording = cnt > 0
         return cnt
 
     async def stop_recording_all(self) -> int:
-        cnt = 0
-        for s in self.sessions:
-            if await s.write_command(BLE.COMMAND_UUID, BLE.STOP_RECORDING):
-                cnt += 1
+        report = await self.fan_out(
+            "record_stop",
+            lambda s: s.write_command(BLE.COMMAND_UUID, BLE.STOP_RECORDING),
+            self.command_timeout_sec,
+        )
+        print(report.summary())
+        cnt = report.ok_count
         self.is_recording = False if cnt > 0 else self.is_recording
         return cnt
 
 
+class BleLoop:
+    """
+    One event loop thread shared by several BleThreads (multi-timer host).
+    Each BleThread keeps its own command queue and BleManager (device group).
+    """
+
+    def __init__(self) -> None:
+        self.thread: Optional[threading.Thread] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            return self.loop
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self.thread is None or not self.thread.is_alive():
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+
 class BleThread:
     """スレッドはキュー処理だけに限定"""
 
-    def __init__(self) -> None:
+    def __init__(self, ble_loop: Optional[BleLoop] = None) -> None:
         self.thread: Optional[threading.Thread] = None
         self.loop: Optional[asyncio.AbstractEventLoop] = None
+        # with ble_loop, the commands are served on its shared thread
+        self.ble_loop = ble_loop
+        self._serving: Optional[Future] = None
         self.running = False
-        self.command_q: "queue.Queue[Tuple[str, Optional[Any]]]" = queue.Queue()
-        self.result_q: "queue.Queue[Result]" = queue.Queue()
+        # commands are posted into the loop with call_soon_threadsafe, so the
+        # thread sleeps in the event loop until one arrives
+        self.command_q: Optional["asyncio.Queue[Tuple[int, str, Optional[Any]]]"] = None
+        # request id -> Future of the result (one per submitted command)
+        self._pending: Dict[int, Future] = {}
+        self._pending_lock = threading.Lock()
+        self._request_ids = itertools.count(1)
         self.manager: Optional[BleManager] = None
         self.target_device_names: List[str] = [""]
         self._handlers: Dict[str, CommandHandler] = {
@@ -268,8 +612,19 @@ class BleThread:
         self.target_device_names = names
 
     def start(self) -> None:
+        if self.ble_loop is not None:
+            if self._serving is not None and not self._serving.done():
+                return
+            self.loop = self.ble_loop.start()
+            self.thread = self.ble_loop.thread
+            self.command_q = asyncio.Queue()
+            self.running = True
+            self._serving = asyncio.run_coroutine_threadsafe(self._serve(), self.loop)
+            return
         if self.thread and self.thread.is_alive():
             return
+        self.loop = asyncio.new_event_loop()
+        self.command_q = asyncio.Queue()
         self.running = True
         self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
@@ -278,53 +633,113 @@ class BleThread:
         if not self.running:
             return
         self.running = False
-        self.command_q.put(("__stop__", None))
+        self._post((0, "__stop__", None))
+        if self.ble_loop is not None:
+            # the shared loop keeps running for the other timers
+            if threading.current_thread() is not self.thread:
+                self._serving.result()
+            return
         if self.thread and self.thread.is_alive():
             self.thread.join()
 
+    def _post(self, item: Tuple[int, str, Optional[Any]]) -> bool:
+        """Put item on the command queue from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self.command_q.put_nowait, item)
+        except RuntimeError:
+            # the loop is already closed
+            return False
+        return True
+
+    def submit(
+        self,
+        command: str,
+        data: Optional[Any] = None,
+        callback: Optional[ResultCallback] = None,
+    ) -> Future:
+        """
+        Queue a command without waiting. Returns a Future of its Result; each
+        request has its own id, so results never go to another caller.
+        callback(result) is called when done, on the BLE thread (or right away
+        if the thread is not running).
+        """
+        future: Future = Future()
+        future.request_id = next(self._request_ids)
+        future.command = command
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        if not self.running:
+            future.set_result((command, 0, "thread not running"))
+            return future
+        with self._pending_lock:
+            self._pending[future.request_id] = future
+        if not self._post((future.request_id, command, data)):
+            self._resolve(future.request_id, (command, 0, "thread not running"))
+        return future
+
     def execute_command(
         self, command: str, data: Optional[Any] = None, timeout: int = 30
     ) -> Result:
-        if not self.running:
-            return (command, 0, "thread not running")
-        self.command_q.put((command, data))
+        """Blocking version of submit() (do not call from the Tk thread)"""
+        future = self.submit(command, data)
         try:
-            return self.result_q.get(timeout=timeout)
-        except queue.Empty:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            # the late result is dropped with its request
+            self._resolve(future.request_id, (command, 0, "timeout"))
             return (command, 0, "timeout")
 
+    def get_report(self, operation: str) -> Optional[FanOutReport]:
+        if self.manager is None:
+            return None
+        return self.manager.reports.get(operation)
+
+    def _resolve(self, request_id: int, result: Result) -> None:
+        with self._pending_lock:
+            future = self._pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
     def _run(self) -> None:
-        self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
         try:
-            self.manager = BleManager(self.target_device_names, keep_alive_sec=3.0)
-            self.loop.run_until_complete(self._loop())
+            self.loop.run_until_complete(self._serve())
         finally:
             if self.loop:
                 self.loop.close()
+            self._fail_pending()
+
+    async def _serve(self) -> None:
+        self.manager = BleManager(self.target_device_names, keep_alive_sec=3.0)
+        try:
+            await self._loop()
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        # nobody will answer the requests left in the queue
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        for future in pending:
+            self._resolve(future.request_id, (future.command, 0, "thread stopped"))
 
     async def _loop(self) -> None:
         assert self.manager is not None
-        while self.running:
-            try:
-                cmd, data = self.command_q.get_nowait()
-            except queue.Empty:
-                await asyncio.sleep(0.05)
-                continue
-
+        while True:
+            request_id, cmd, data = await self.command_q.get()
             if cmd == "__stop__":
                 self.manager.stop_keep_alive_loop()
                 break
 
             handler = self._handlers.get(cmd)
             if handler is None:
-                self.result_q.put((cmd, 0, "unknown"))
+                self._resolve(request_id, (cmd, 0, "unknown"))
                 continue
             try:
                 res = await handler(data)
             except Exception as e:
                 res = (cmd, 0, f"error {e}")
-            self.result_q.put(res)
+            self._resolve(request_id, res)
 
     # handlers
     async def _h_connect(self, _: Optional[Any]) -> Result:
@@ -333,9 +748,12 @@ class BleThread:
         ok = await self.manager.discover_and_connect()
         return ("connect", ok, "success" if ok else "failed")
 
-    async def _h_start(self, _: Optional[Any]) -> Result:
+    async def _h_start(self, data: Optional[Any]) -> Result:
         assert self.manager is not None
-        ok = await self.manager.start_recording_all()
+        # data: {"delay_sec": seconds from now to the target start}
+        delay_sec = data.get("delay_sec", 0.0) if data else 0.0
+        target = asyncio.get_running_loop().time() + delay_sec
+        ok = await self.manager.start_recording_at(target)
         return ("record_start", ok, "success" if ok else "failed")
 
     async def _h_stop(self, _: Optional[Any]) -> Result:
@@ -1,4 +1,118 @@
-def main() -> None:
+import argparse
+import os
+import sys
+
+
+def build_export_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="timeline-kun export",
+        description="Export timeline CSV files to SVG without opening a window.",
+    )
+    parser.add_argument("csv_files", nargs="+", help="CSV files to export.")
+    parser.add_argument(
+        "--out_dir",
+        type=str,
+        default=None,
+        help="Output directory (default: next to each CSV file).",
+    )
+    parser.add_argument(
+        "--direction",
+        type=str,
+        default="vertical",
+        choices=["vertical", "horizontal"],
+        help="Direction of the time axis (default: vertical).",
+    )
+    parser.add_argument(
+        "--length",
+        type=int,
+        default=1000,
+        help="Length of the time axis of one page in px (default: 1000).",
+    )
+    parser.add_argument(
+        "--px_per_sec",
+        type=float,
+        default=None,
+        help="Scale in px per second. Long timelines are split into pages "
+        "(default: fit the whole timeline into one page).",
+    )
+    parser.add_argument(
+        "--font",
+        type=str,
+        default="small",
+        choices=["tiny", "small", "normal"],
+        help="Font size (default: small).",
+    )
+    parser.add_argument(
+        "--hmmss",
+        type=str,
+        default="mmss",
+        choices=["hmmss", "mmss"],
+        help="Time format (default: mmss).",
+    )
+    return parser
+
+
+def export(argv=None) -> int:
+    """Export each CSV to SVG. Returns 1 if any file failed."""
+    from . import file_loader, svg_writer
+
+    args = build_export_parser().parse_args(argv)
+    if args.length <= 0:
+        print("--length must be positive", file=sys.stderr)
+        return 2
+    if args.px_per_sec is not None and args.px_per_sec <= 0:
+        print("--px_per_sec must be positive", file=sys.stderr)
+        return 2
+    if args.out_dir is not None:
+        try:
+            os.makedirs(args.out_dir, exist_ok=True)
+        except OSError as e:
+            print(f"{args.out_dir}: {e}", file=sys.stderr)
+            return 1
+
+    loader = file_loader.FileLoader(use_cache=False)
+    failed = 0
+    for csv_path in args.csv_files:
+        try:
+            warn_msg, time_table = loader.load_file_for_preview(csv_path)
+        except ValueError as e:
+            print(f"{csv_path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        if time_table is None:
+            print(f"{csv_path}: {warn_msg}", file=sys.stderr)
+            failed += 1
+            continue
+        if warn_msg != "":
+            print(f"{csv_path}: {warn_msg}")
+
+        stem = os.path.splitext(os.path.basename(csv_path))[0]
+        out_dir = args.out_dir or os.path.dirname(csv_path)
+        try:
+            paths = svg_writer.save_as_svg(
+                time_table.get_timetable(),
+                os.path.join(out_dir, f"{stem}.svg"),
+                direction=args.direction,
+                length_px=args.length,
+                px_per_sec=args.px_per_sec,
+                include_hour=args.hmmss == "hmmss",
+                font=args.font,
+            )
+        except OSError as e:
+            print(f"{csv_path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        for path in paths:
+            print(path)
+    return 1 if failed > 0 else 0
+
+
+def main(argv=None) -> None:
+    if argv is None:
+        argv = sys.argv[1:]
+    if len(argv) > 0 and argv[0] == "export":
+        sys.exit(export(argv[1:]))
+
     import importlib
 
     mod = importlib.import_module("timeline_kun.app_previewer")
@@ -0,0 +1,87 @@
+import datetime
+import threading
+import time
+
+
+def ns_to_timedelta(ns: int) -> datetime.timedelta:
+    return datetime.timedelta(microseconds=ns // 1000)
+
+
+def timedelta_to_ns(td: datetime.timedelta) -> int:
+    return (td // datetime.timedelta(microseconds=1)) * 1000
+
+
+class MonotonicClock:
+    """
+    Timebase of the timer.
+    Elapsed time comes from time.perf_counter_ns(), so NTP slews and wall-clock
+    jumps do not move stage boundaries. The wall clock is read only once, as an
+    anchor for displaying the current date and time.
+    """
+
+    def __init__(self):
+        self._anchor_ns = time.perf_counter_ns()
+        self._anchor_wall = datetime.datetime.now()
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns()
+
+    def wall_now(self) -> datetime.datetime:
+        return self._anchor_wall + ns_to_timedelta(self.now_ns() - self._anchor_ns)
+
+    def sleep(self, sec: float) -> None:
+        time.sleep(sec)
+
+
+class FakeClock:
+    """
+    Simulated clock for tests and simulations.
+    Time moves forward by advance(); with speed > 0 it also runs at speed times
+    real time (e.g. speed=1000 plays a 3-hour session in about 11 seconds).
+    sleep() blocks until the simulated time has passed.
+    """
+
+    def __init__(self, start_wall=None, speed=0.0):
+        self.speed = speed
+        self._cond = threading.Condition()
+        self._offset_ns = 0
+        self._real_anchor_ns = time.perf_counter_ns()
+        if start_wall is None:
+            start_wall = datetime.datetime(2000, 1, 1)
+        self._start_wall = start_wall
+
+    def now_ns(self) -> int:
+        with self._cond:
+            now = self._offset_ns
+        if self.speed:
+            now += int((time.perf_counter_ns() - self._real_anchor_ns) * self.speed)
+        return now
+
+    def wall_now(self) -> datetime.datetime:
+        return self._start_wall + ns_to_timedelta(self.now_ns())
+
+    def advance(self, sec: float) -> None:
+        self.advance_ns(int(sec * 1e9))
+
+    def advance_ns(self, ns: int) -> None:
+        with self._cond:
+            self._offset_ns += ns
+            self._cond.notify_all()
+
+    def set_ns(self, ns: int) -> None:
+        """Jump to an absolute simulated time (never backwards)"""
+        now = self.now_ns()
+        if ns > now:
+            self.advance_ns(ns - now)
+
+    def sleep(self, sec: float) -> None:
+        deadline = self.now_ns() + int(sec * 1e9)
+        with self._cond:
+            while True:
+                remaining = deadline - self.now_ns()
+                if remaining <= 0:
+                    return
+                if self.speed:
+                    self._cond.wait(timeout=remaining / 1e9 / self.speed)
+                else:
+                    self._cond.wait()
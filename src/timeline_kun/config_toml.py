@@ -16,10 +16,16 @@ stop_delay_sec = 2
 
 [log]
 make_events_json = true
+#flush_interval_sec = 1.0
+#flush_max_lines = 100
 
 [excel]
 #read_extra_encoding = "your_encoding"
 
+[timer]
+# keep a warmed-up timer process ready for "Send to timer"
+#handoff = true
+
 """
 
     if os.path.exists(tar_path):
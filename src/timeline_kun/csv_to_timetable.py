@@ -1,15 +1,84 @@
 import csv
-import datetime
 import io
 import re
 
-from . import time_format
+from . import time_format, timetable
+
+
+def compute_row_times(
+    i,
+    title,
+    fixed,
+    start_sec_str,
+    end_sec_str,
+    duration_sec_str,
+    current_time,
+    prev_start,
+    prev_has_end,
+    next_start_str,
+):
+    """
+    Start/end of row i from its raw time strings and the previous row.
+    Shared by the parser and the Previewer's TimelineModel.
+
+    current_time: end of the previous row, prev_start: its start (None for
+    the first row), prev_has_end: whether it had a duration or end.
+    next_start_str: raw start of the next row (None for the last row); only
+    used by fixed==start rows without duration/end.
+    Returns (start_sec, end_sec, warning, is_earlier); warning has no
+    "[line N]" prefix. Raises ValueError for rows that cannot be scheduled.
+    """
+    duration_sec = time_format.str_to_seconds(duration_sec_str)
+    start_sec = time_format.str_to_seconds(start_sec_str)
+    end_sec = time_format.str_to_seconds(end_sec_str)
+
+    if fixed not in ["start", "duration"]:
+        raise ValueError(f"[line {i + 1}] Invalid fixed code: {fixed}")
+
+    warning = ""
+    if fixed == "start":
+        if start_sec < current_time:
+            warning = f"{title} conflict with the previous line"
+
+        if start_sec == 0 and i != 0:
+            raise ValueError(f"[line {i + 1}] Start must be set in fixed==start")
+
+        if duration_sec > 0:
+            end_sec = start_sec + duration_sec
+        elif end_sec > 0:
+            pass
+        else:
+            if next_start_str is None:
+                raise ValueError(f"[line {i + 1}] No next line")
+            if next_start_str == "0":
+                raise ValueError(f"[line {i + 2}] next_start_sec is 0")
+            end_sec = time_format.str_to_seconds(next_start_str)
+            if end_sec == 0:
+                end_sec = start_sec
+
+    elif fixed == "duration":
+        if duration_sec == 0:
+            raise ValueError(f"[line {i + 1}] Duration must be set in fixed==duration")
+        if start_sec == 0 and end_sec == 0:
+            start_sec = current_time
+            end_sec = start_sec + duration_sec
+        elif start_sec > 0:
+            end_sec = start_sec + duration_sec
+        elif end_sec > 0:
+            start_sec = end_sec - duration_sec
+
+        if i > 0 and prev_has_end is False:
+            warning = "No duration (or end) in the previous line"
+
+    is_earlier = prev_start is not None and start_sec < prev_start
+    return start_sec, end_sec, warning, is_earlier
 
 
 class TimeTable:
     def __init__(self):
-        self.time_table = []
+        self.time_table = timetable.Timetable()
         self.current_time = 0
+        self.warn_msg = ""
 
     @staticmethod
     def _cell(row, idx: int) -> str:
@@ -19,18 +88,31 @@ class TimeTable:
             return ""
         return row[idx].strip()
 
+    @staticmethod
+    def _iter_nonempty_rows(reader):
+        for row in reader:
+            if not row or all(cell.strip() == "" for cell in row):
+                continue
+            yield row
+
     def load_csv_str(self, csv_str):
-        warn_msg = ""
+        for _ in self.iter_csv_str(csv_str):
+            pass
+        return self.warn_msg
+
+    def iter_csv_str(self, csv_str):
+        """
+        Parse csv_str in a single pass, append each entry to the timetable and
+        yield it as a row view.
+        Only one row is looked ahead (for fixed==start rows without duration/end).
+        Warnings are checked inline; the resulting message is in self.warn_msg
+        once the generator is exhausted.
+        """
+        self.warn_msg = ""
         # UTF-8 BOM removal
         csv_str = re.sub(r"^\ufeff+", "", csv_str)
 
-        reader = csv.reader(io.StringIO(csv_str))
-
-        rows = []
-        for row in reader:
-            if not row or all(cell.strip() == "" for cell in row):
-                continue
-            rows.append(row)
+        rows = self._iter_nonempty_rows(csv.reader(io.StringIO(csv_str)))
 
         required_headers = [
             "title",
@@ -42,13 +124,14 @@ class TimeTable:
         ]
 
         # Empty file check
-        if not rows:
+        header_row = next(rows, None)
+        if header_row is None:
             raise ValueError(
                 f"Header missing required field: {', '.join(required_headers)}"
             )
 
         # Validate the header
-        header = [h.strip().lower() for h in rows[0]]
+        header = [h.strip().lower() for h in header_row]
         header_dict = {header[i]: i for i in range(len(header))}
 
         missing_headers = [rh for rh in required_headers if rh not in header_dict]
@@ -64,9 +147,16 @@ class TimeTable:
             is_no_end = False
 
         has_end_time = True
-
-        data_rows = rows[1:]
-        for i, line in enumerate(data_rows):
+        # "Start time is earlier than the previous line" is reported only for
+        # the first occurrence and takes precedence over the other warnings.
+        earlier_warn_msg = ""
+        prev_start_sec = None
+
+        i = 0
+        next_line = next(rows, None)
+        while next_line is not None:
+            line = next_line
+            next_line = next(rows, None)
             (
                 title,
                 member,
@@ -77,85 +167,54 @@ class TimeTable:
                 instruction,
             ) = self._asign(line, header_dict, is_no_end)
 
-            duration_sec = time_format.str_to_seconds(duration_sec_str)
-            start_sec = time_format.str_to_seconds(start_sec_str)
-            end_sec = time_format.str_to_seconds(end_sec_str)
-
-            if fixed not in ["start", "duration"]:
-                raise ValueError(f"[line {i + 1}] Invalid fixed code: {fixed}")
+            if next_line is None:
+                next_start_str = None
+            else:
+                next_start_str = self._cell(next_line, header_dict["start"])
+            start_sec, end_sec, warning, is_earlier = compute_row_times(
+                i,
+                title,
+                fixed,
+                start_sec_str,
+                end_sec_str,
+                duration_sec_str,
+                self.current_time,
+                prev_start_sec,
+                has_end_time,
+                next_start_str,
+            )
 
             has_error = False
-            if fixed == "start":
-                if start_sec < self.current_time:
-                    warn_msg = f"[line {i + 1}] {title} conflict with the previous line"
-                    has_error = True
-
-                if start_sec == 0 and i != 0:
-                    raise ValueError(
-                        f"[line {i + 1}] Start must be set in fixed==start"
-                    )
-
-                if duration_sec > 0:
-                    end_sec = start_sec + duration_sec
-                elif end_sec > 0:
-                    end_sec = end_sec
-                else:
-                    next_row = self._find_next_nonempty_row(data_rows, i)
-                    if next_row is None:
-                        raise ValueError(f"[line {i + 1}] No next line")
-                    end_sec = self.get_next_start(line, next_row, header_dict)
-                    if end_sec == 0:
-                        end_sec = start_sec
-
-            elif fixed == "duration":
-                if duration_sec == 0:
-                    raise ValueError(
-                        f"[line {i + 1}] Duration must be set in fixed==duration"
-                    )
-                if start_sec == 0 and end_sec == 0:
-                    start_sec = self.current_time
-                    end_sec = start_sec + duration_sec
-                elif start_sec > 0:
-                    end_sec = start_sec + duration_sec
-                elif end_sec > 0:
-                    start_sec = end_sec - duration_sec
-
-                if (i > 0) and (has_end_time is False):
-                    warn_msg = (
-                        f"[line {i + 1}] No duration (or end) in the previous line"
-                    )
-                    has_error = True
-
-            start_td = datetime.timedelta(seconds=start_sec)
-            end_td = datetime.timedelta(seconds=end_sec)
+            if warning != "":
+                self.warn_msg = f"[line {i + 1}] {warning}"
+                has_error = True
+            if earlier_warn_msg == "" and is_earlier:
+                earlier_warn_msg = (
+                    f"[line {i + 1}] Start time is earlier than the previous line"
+                )
+                has_error = True
 
             self.time_table.append(
-                {
-                    "title": title,
-                    "start": start_td,
-                    "end": end_td,
-                    "member": member,
-                    "duration_sec": duration_sec_str,
-                    "start_sec": start_sec_str,
-                    "end_sec": end_sec_str,
-                    "fixed": fixed,
-                    "instruction": instruction,
-                    "has_error": has_error,
-                }
+                title,
+                start_sec,
+                end_sec,
+                member=member,
+                instruction=instruction,
+                fixed=fixed,
+                start_sec=start_sec_str,
+                end_sec=end_sec_str,
+                duration_sec=duration_sec_str,
+                has_error=has_error,
             )
+            yield self.time_table[-1]
 
             self.current_time = end_sec
             has_end_time = (end_sec_str != "") or (duration_sec_str != "")
+            prev_start_sec = start_sec
+            i += 1
 
-        for i in range(1, len(self.time_table)):
-            if self.time_table[i]["start"] < self.time_table[i - 1]["start"]:
-                warn_msg = (
-                    f"[line {i + 1}] Start time is earlier than the previous line"
-                )
-                self.time_table[i]["has_error"] = True
-                break
-
-        return warn_msg
+        if earlier_warn_msg != "":
+            self.warn_msg = earlier_warn_msg
 
     def _asign(self, row, header_dict, is_no_end=False):
         title = self._cell(row, header_dict["title"])
@@ -181,13 +240,6 @@ class TimeTable:
             instruction,
         )
 
-    def _find_next_nonempty_row(self, data_rows, current_index: int):
-        for j in range(current_index + 1, len(data_rows)):
-            row = data_rows[j]
-            if row and any(c.strip() != "" for c in row):
-                return row
-        return None
-
     def get_timetable(self):
         return self.time_table
 
@@ -205,17 +257,3 @@ class TimeTable:
                 }
             )
         return ret_table
-
-    def get_next_start(self, current_row, next_row, header_dict):
-        (
-            title,
-            member,
-            duration_sec_str,
-            start_sec_str,
-            end_sec_str,
-            fixed,
-            instruction,
-        ) = self._asign(next_row, header_dict, False)
-        if start_sec_str == "0":
-            raise ValueError(f"next_start_sec is 0: {current_row}")
-        return time_format.str_to_seconds(start_sec_str)
@@ -8,6 +8,7 @@ def make_events_json(tar_path):
     "Description": "Type of event (includes user-defined tasks and control events)",
     "HED": {
       "task_skip": "Experiment-control, Action/Skip",
+      "video_record_start_scheduled": "Experiment-control, Video/Start, Expected",
       "video_record_start": "Experiment-control, Video/Start",
       "session_end": "Experiment-end"
     }
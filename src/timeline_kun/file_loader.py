@@ -1,7 +1,110 @@
+import codecs
+import mmap
 import os
 import re
+import time
+from dataclasses import dataclass
 
-from . import csv_to_timetable
+from . import csv_to_timetable, parse_cache, timetable
+
+# Files at least this large are memory-mapped instead of read into a bytes object
+MMAP_THRESHOLD = 1024 * 1024
+
+
+@dataclass
+class EncodingDetection:
+    encoding: str
+    has_bom: bool
+    size: int
+    used_mmap: bool
+    read_sec: float
+    # time spent in decode attempts that failed (i.e. sniffing)
+    detect_sec: float
+    # time of the successful decode
+    decode_sec: float
+
+    def summary(self):
+        return (
+            f"{self.encoding}{' (BOM)' if self.has_bom else ''} {self.size} bytes, "
+            f"read {self.read_sec * 1000:.1f} ms, "
+            f"detect {self.detect_sec * 1000:.1f} ms, "
+            f"decode {self.decode_sec * 1000:.1f} ms"
+            f"{' (mmap)' if self.used_mmap else ''}"
+        )
+
+
+class FileBuffer:
+    """Whole file content as a bytes-like object, read once (mmap for large files)"""
+
+    def __init__(self, tar_path, mmap_threshold=MMAP_THRESHOLD):
+        self.tar_path = tar_path
+        self.mmap_threshold = mmap_threshold
+        self.data = b""
+        self.used_mmap = False
+        self.read_sec = 0.0
+        self._file = None
+
+    def __enter__(self):
+        t0 = time.perf_counter()
+        self._file = open(self.tar_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= self.mmap_threshold:
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.used_mmap = True
+        else:
+            self.data = self._file.read()
+        self.read_sec = time.perf_counter() - t0
+        return self
+
+    def __exit__(self, *exc):
+        if self.used_mmap:
+            self.data.close()
+        self._file.close()
+        return False
+
+
+def _universal_newlines(text):
+    # same newline handling as reading the file in text mode
+    if "\r" not in text:
+        return text
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def detect_and_decode(buf: FileBuffer, encodings):
+    """
+    Find the first of encodings that can decode buf and return the decoded text
+    with an EncodingDetection. The buffer is decoded only once by the encoding
+    that succeeds; failed attempts stop at the first invalid byte.
+    """
+    data = buf.data
+    has_bom = data[:3] == codecs.BOM_UTF8
+    detect_sec = 0.0
+    tried = []
+    for encoding in encodings:
+        name = codecs.lookup(encoding).name
+        # utf-8-sig fails wherever utf-8 does
+        if name.replace("-sig", "") in tried:
+            continue
+        t0 = time.perf_counter()
+        try:
+            text = str(data, encoding)
+        except UnicodeDecodeError:
+            detect_sec += time.perf_counter() - t0
+            tried.append(name.replace("-sig", ""))
+            print(f"{encoding} decoding failed")
+            continue
+        decode_sec = time.perf_counter() - t0
+        detection = EncodingDetection(
+            encoding=encoding,
+            has_bom=has_bom,
+            size=len(data),
+            used_mmap=buf.used_mmap,
+            read_sec=buf.read_sec,
+            detect_sec=detect_sec,
+            decode_sec=decode_sec,
+        )
+        return _universal_newlines(text), detection
+    raise ValueError(f"File encoding not supported")
 
 
 class FileLoader:
@@ -9,101 +112,102 @@ class FileLoader:
         self,
         intermission_desc="Intermission",
         fallback_encoding="utf-8-sig",
+        use_cache=True,
     ):
-        self.stage_list = []
+        self.stage_list = timetable.Timetable()
         self.intermission_desc = intermission_desc
         self.fallback_encoding = fallback_encoding
         self.encoding = None
+        self.detection = None
+        self.cache = parse_cache.get_default_cache() if use_cache else None
 
     def _read_file(self, tar_path):
-        self.stage_list = []
+        self.stage_list = timetable.Timetable()
         self.encoding = None
 
         if not os.path.exists(tar_path):
             print(f"File not found: {tar_path}")
             return None
-        try:
-            with open(tar_path, "r", encoding="utf-8") as f:
-                content = f.read()
-            self.encoding = "utf-8"
-            return content
-        except UnicodeDecodeError:
-            print(f"UTF-8 decoding failed, falling back to {self.fallback_encoding}")
-            try:
-                with open(tar_path, "r", encoding=self.fallback_encoding) as f:
-                    content = f.read()
-                self.encoding = self.fallback_encoding
-                return content
-            except UnicodeDecodeError:
-                print(
-                    f"{self.fallback_encoding} decoding also failed, falling back to cp932"
-                )
-                try:
-                    with open(tar_path, "r", encoding="cp932") as f:
-                        content = f.read()
-                    self.encoding = "cp932"
-                    return content
-                except UnicodeDecodeError:
-                    self.encoding = None
-                    raise ValueError(f"File encoding not supported")
+        with FileBuffer(tar_path) as buf:
+            return self._decode(buf)
+
+    def _decode(self, buf):
+        content, self.detection = detect_and_decode(
+            buf, ["utf-8", self.fallback_encoding, "cp932"]
+        )
+        self.encoding = self.detection.encoding
+        return content
+
+    def _parse_file(self, csv_path):
+        """
+        Read and parse csv_path. Unchanged files are served from the parse cache.
+        The file is read once; the same buffer is hashed for the cache and decoded.
+        Returns None if the file does not exist.
+        """
+        self.stage_list = timetable.Timetable()
+        self.encoding = None
+        self.detection = None
+
+        if not os.path.exists(csv_path):
+            print(f"File not found: {csv_path}")
+            return None
+
+        with FileBuffer(csv_path) as buf:
+            if self.cache is not None:
+                parsed = self.cache.get(csv_path, self.fallback_encoding, buf.data)
+                if parsed is not None:
+                    self.encoding = parsed.encoding
+                    return parsed
+
+            timetable_csv_str = self._decode(buf)
+            time_table = csv_to_timetable.TimeTable()
+            warn_msg = time_table.load_csv_str(timetable_csv_str)
+            parsed = parse_cache.ParsedTimeline(time_table, self.encoding, warn_msg)
+            if self.cache is not None:
+                self.cache.put(csv_path, parsed, self.fallback_encoding, buf.data)
+        return parsed
 
     def load_file_for_preview(self, csv_path):
-        timetable_csv_str = self._read_file(csv_path)
-        if timetable_csv_str is None:
+        parsed = self._parse_file(csv_path)
+        if parsed is None:
             return "Load file failed", None
-        time_table = csv_to_timetable.TimeTable()
-        try:
-            warn_msg = time_table.load_csv_str(timetable_csv_str)
-        except ValueError as e:
-            raise e
-        return warn_msg, time_table
+        return parsed.warn_msg, parsed.time_table
 
     def load_file_for_timer(self, start_index: int, csv_path: str):
-        timetable_csv_str = self._read_file(csv_path)
-        if timetable_csv_str is None:
+        parsed = self._parse_file(csv_path)
+        if parsed is None:
             return
-        time_table = csv_to_timetable.TimeTable()
-        time_table.load_csv_str(timetable_csv_str)
+        self.load_timetable_for_timer(start_index, parsed.time_table.get_timetable())
 
-        start_row = time_table.get_timetable()[start_index]
-        for i, row in enumerate(time_table.get_timetable()):
-            if i < start_index:
-                continue
+    def load_timetable_for_timer(self, start_index: int, rows, encoding=None):
+        """
+        Build the stage list from an already parsed timetable (e.g. the one
+        handed over by the Previewer) instead of reading the file.
+        """
+        self.stage_list = timetable.Timetable()
+        if encoding is not None:
+            self.encoding = encoding
+
+        # Build the stage list and the intermissions between stages in one pass.
+        # Rows before start_index are not visited; times are relative to the
+        # start row.
+        offset = rows.start[start_index]
+        last = len(rows) - 1
+        for i in range(start_index, last + 1):
+            start = rows.start[i] - offset
+            end = rows.end[i] - offset
             self.stage_list.append(
-                {
-                    "title": row["title"],
-                    "start_dt": row["start"] - start_row["start"],
-                    "end_dt": row["end"] - start_row["start"],
-                    "duration": row["end"] - row["start"],
-                    "member": row["member"],
-                    "instruction": row["instruction"],
-                }
+                rows.title[i],
+                start,
+                end,
+                member=rows.member[i],
+                instruction=rows.instruction[i],
             )
-
-        # Intermission check
-        intermission_list = []
-        for i, stage in enumerate(self.stage_list):
             # check if intermission space exists
-            current_end_dt = stage["end_dt"]
-            if i + 1 < len(self.stage_list):
-                next_start_dt = self.stage_list[i + 1]["start_dt"]
-                if current_end_dt != next_start_dt:
-                    intermission_list.append(
-                        {
-                            "title": self.intermission_desc,
-                            "start_dt": current_end_dt,
-                            "end_dt": next_start_dt,
-                            "duration": next_start_dt - current_end_dt,
-                            "member": "",
-                            "instruction": "",
-                        }
-                    )
-                else:
-                    intermission_list.append(None)
-        # Insert intermission into stage list from the end
-        for i in range(len(intermission_list) - 1, -1, -1):
-            if intermission_list[i] is not None:
-                self.stage_list.insert(i + 1, intermission_list[i])
+            if i < last:
+                next_start = rows.start[i + 1] - offset
+                if end != next_start:
+                    self.stage_list.append(self.intermission_desc, end, next_start)
 
     def get_stage_list(self):
         return self.stage_list
@@ -111,8 +215,17 @@ class FileLoader:
     def get_encoding(self):
         return self.encoding
 
+    def get_encoding_detection(self):
+        """EncodingDetection of the last decoded file (None if served from cache)"""
+        return self.detection
+
     def clear(self):
-        self.stage_list = []
+        self.stage_list = timetable.Timetable()
+
+    def invalidate_cache(self, csv_path=None):
+        if self.cache is not None:
+            self.cache.invalidate(csv_path)
+
 
 def utf8_to_utf8bom(tar_path: str, fallback_encoding: str) -> bool:
     """
@@ -120,14 +233,10 @@ def utf8_to_utf8bom(tar_path: str, fallback_encoding: str) -> bool:
     First, try reading as UTF-8; if that fails, read using fallback_encoding.
     Then, write the content back as UTF-8 with BOM.
     """
-    try:
-        with open(tar_path, "r", encoding="utf-8") as f:
-            content = f.read()
-    except UnicodeDecodeError as e:
+    with FileBuffer(tar_path) as buf:
         try:
-            with open(tar_path, "r", encoding=fallback_encoding) as f:
-                content = f.read()
-        except UnicodeDecodeError as e:
+            content, _ = detect_and_decode(buf, ["utf-8", fallback_encoding])
+        except ValueError as e:
             print(f"Error converting {tar_path}: {e}")
             return False
 
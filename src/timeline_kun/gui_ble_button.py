@@ -7,13 +7,20 @@ class BleButtonManager:
     """Manages the BLE button and status display."""
 
     def __init__(
-        self, parent_frame, master_window, trigger_device, ble_names, stop_delay_sec=2
+        self,
+        parent_frame,
+        master_window,
+        trigger_device,
+        ble_names,
+        stop_delay_sec=2,
+        style_prefix="",
     ):
         """
         Args:
             parent_frame: Parent frame where the button and label are placed
             master_window: Main window used to schedule UI updates
             trigger_device: Trigger instance used for BLE control
+            style_prefix: Prefix of the ttk style names (e.g. "cyan.")
         """
         self.master_window = master_window
         self.trigger_device = trigger_device
@@ -21,15 +28,18 @@ class BleButtonManager:
         self.trigger_device.set_delay_sec(self.stop_delay_sec)
 
         # Create BLE UI elements
-        self.ble_frame = ttk.Frame(parent_frame)
+        self.ble_frame = ttk.Frame(parent_frame, style=f"{style_prefix}TFrame")
         self.ble_frame.pack(side=tk.RIGHT)
 
         self.ble_btn = ttk.Button(
-            self.ble_frame, text="BLE Connect", command=self.connect_ble
+            self.ble_frame,
+            text="BLE Connect",
+            command=self.connect_ble,
+            style=f"{style_prefix}TButton",
         )
         self.ble_btn.pack(padx=0, side=tk.LEFT)
 
-        self.ble_status_label = ttk.Label(self.ble_frame)
+        self.ble_status_label = ttk.Label(self.ble_frame, style=f"{style_prefix}TLabel")
         self.ble_status_label.pack(padx=12, side=tk.LEFT)
 
         self.default_fg_color = self.ble_status_label.cget("foreground")
@@ -1,4 +1,6 @@
 import tkinter as tk
+from bisect import bisect_right
+from itertools import accumulate
 
 rect_colors = [
     "#a9a9af",
@@ -16,6 +18,84 @@ rect_colors = [
     "#9b9ba6",
     "#d8d8ef",
 ]
+aggregate_color = "#c8c8c8"
+
+# stages shorter than this (px) are merged with their neighbours
+MIN_STAGE_PX = 2
+# a merged (aggregated) bar is closed once it is this long (px)
+AGGREGATE_PX = 6
+ZOOM_STEP = 1.25
+MAX_ZOOM = 10000
+
+
+class StageIndex:
+    """
+    Finds the stages inside a time range by bisection and merges sub-pixel
+    stages into aggregated bars, so the number of canvas items depends on the
+    size of the view rather than the length of the timeline.
+    Start times may go backwards (a warning, not an error), so the search
+    uses the running maximum of the ends and the running minimum of the
+    starts from the back, which are both sorted.
+    """
+
+    def __init__(self, starts, ends):
+        self.starts = starts
+        self.ends = ends
+        self.max_end = list(accumulate(ends, max))
+        self.min_start = list(accumulate(reversed(starts), min))[::-1]
+
+    def visible_range(self, t0, t1):
+        """Rows [lo, hi) that may overlap the time range t0..t1 (sec)"""
+        lo = bisect_right(self.max_end, t0)
+        hi = bisect_right(self.min_start, t1)
+        # a zero-length stage at the very start is still shown
+        while lo > 0 and self.ends[lo - 1] == t0 == self.starts[lo - 1]:
+            lo -= 1
+        return lo, max(lo, hi)
+
+    def plan(self, t0, t1, scale):
+        """
+        What to draw for t0..t1 at scale (px/sec):
+        ("stage", index) for a single stage and
+        ("group", first, last, start, end) for merged sub-pixel stages.
+        """
+        lo, hi = self.visible_range(t0, t1)
+        starts = self.starts
+        ends = self.ends
+        min_sec = MIN_STAGE_PX / scale
+        max_group_sec = AGGREGATE_PX / scale
+        items = []
+        group = None
+
+        def close(group):
+            first, last, start, end = group
+            if first == last:
+                items.append(("stage", first))
+            else:
+                items.append(("group", first, last, start, end))
+
+        for i in range(lo, hi):
+            start = starts[i]
+            end = ends[i]
+            if end - start >= min_sec:
+                if group is not None:
+                    close(group)
+                    group = None
+                items.append(("stage", i))
+            elif (
+                group is not None
+                and start - group[3] < min_sec
+                and group[3] - group[2] < max_group_sec
+            ):
+                group[1] = i
+                group[3] = max(group[3], end)
+            else:
+                if group is not None:
+                    close(group)
+                group = [i, i, start, end]
+        if group is not None:
+            close(group)
+        return items
 
 
 class Canvas(tk.Canvas):
@@ -44,11 +124,104 @@ class Canvas(tk.Canvas):
         self.left_padding = 30
         self.top_padding = 100
 
+        # view: zoom 1 shows the whole timeline, view_start_sec is at the top/left
+        self.zoom = 1.0
+        self.view_start_sec = 0.0
+        self.total_duration = 0
+        self.window_size = 1
+        self.on_view_change = None
+        self._view_change_pending = False
+        self._drag_px = None
+        self.bind("<MouseWheel>", self._on_wheel)
+        self.bind("<Button-4>", self._on_wheel)
+        self.bind("<Button-5>", self._on_wheel)
+        self.bind("<ButtonPress-1>", self._on_drag_start)
+        self.bind("<B1-Motion>", self._on_drag)
+
     def set_font(self, font):
         self.font = self.fonts[font]["font"]
 
     def set_scale(self, total_duration):
-        self.scale = self.window_size / total_duration
+        self.total_duration = total_duration
+        self.scale = self.window_size / total_duration * self.zoom
+        self._clamp_view()
+
+    def _offset(self):
+        return 20 if self.mode == "vertical" else self.left_padding
+
+    def to_px(self, sec):
+        """Canvas coordinate (y in vertical, x in horizontal mode) of a time"""
+        return (sec - self.view_start_sec) * self.scale + self._offset()
+
+    def view_range(self):
+        """Time range (sec) currently in the view"""
+        return self.view_start_sec, self.view_start_sec + self.window_size / self.scale
+
+    def reset_view(self):
+        self.zoom = 1.0
+        self.view_start_sec = 0.0
+
+    def _clamp_view(self):
+        view_sec = self.total_duration / self.zoom
+        max_start = max(self.total_duration - view_sec, 0)
+        self.view_start_sec = min(max(self.view_start_sec, 0.0), max_start)
+
+    def zoom_at(self, factor, px):
+        """Zoom by factor keeping the time under canvas coordinate px fixed"""
+        if self.total_duration <= 0:
+            return
+        offset_px = px - self._offset()
+        sec = self.view_start_sec + offset_px / self.scale
+        self.zoom = min(max(self.zoom * factor, 1.0), MAX_ZOOM)
+        self.scale = self.window_size / self.total_duration * self.zoom
+        self.view_start_sec = sec - offset_px / self.scale
+        self._clamp_view()
+        self._view_changed()
+
+    def pan(self, px):
+        """Move the view by px (positive: later times)"""
+        if self.total_duration <= 0:
+            return
+        self.view_start_sec += px / self.scale
+        self._clamp_view()
+        self._view_changed()
+
+    def _view_changed(self):
+        # redraw once per batch of wheel/drag events
+        if self.on_view_change is None or self._view_change_pending:
+            return
+        self._view_change_pending = True
+
+        def redraw():
+            self._view_change_pending = False
+            self.on_view_change()
+
+        self.after_idle(redraw)
+
+    def _event_px(self, event):
+        return event.y if self.mode == "vertical" else event.x
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            direction = -1
+        else:
+            direction = 1
+        if event.state & 0x0004:
+            # Ctrl + wheel: zoom around the pointer
+            factor = ZOOM_STEP if direction < 0 else 1 / ZOOM_STEP
+            self.zoom_at(factor, self._event_px(event))
+        else:
+            self.pan(direction * self.window_size / 10)
+
+    def _on_drag_start(self, event):
+        self._drag_px = self._event_px(event)
+
+    def _on_drag(self, event):
+        if self._drag_px is None:
+            return
+        px = self._event_px(event)
+        self.pan(self._drag_px - px)
+        self._drag_px = px
 
     def set_direction(self, mode):
         if mode not in ["horizontal", "vertical"]:
@@ -60,106 +233,116 @@ class Canvas(tk.Canvas):
             self.window_size = self.winfo_width() - 60
 
     def draw_start_line(self, start, total_duration):
-        self.delete("start_line")
+        """Start mark at start; it is moved if it already exists"""
         self.delete("highlight")
         start_sec = start.total_seconds()
         if self.mode == "vertical":
-            y_start = start_sec * self.scale + 20
-            self._create_start_mark_right(84, y_start, 10, "red")
+            y_start = self.to_px(start_sec)
+            coords = self._start_mark_right(84, y_start, 10)
         else:
-            x_start = start_sec * self.scale + self.left_padding
-            self._create_start_mark_up(x_start, 200 + self.rect_width, 10, "red")
+            x_start = self.to_px(start_sec)
+            coords = self._start_mark_up(x_start, 200 + self.rect_width, 10)
+        if self.find_withtag("start_line"):
+            self.coords("start_line", *coords)
+        else:
+            self.create_polygon(*coords, fill="red", tag="start_line")
         self.tag_lower("start_line")
-        self.delete("time")
-
-    def _create_start_mark_right(self, x, y, size, color):
-        self.create_polygon(
-            x - size,
-            y - size / 2,
-            x,
-            y,
-            x - size,
-            y + size / 2,
-            fill=color,
-            tag="start_line",
-        )
 
-    def _create_start_mark_up(self, x, y, size, color):
-        self.create_polygon(
-            x - size / 2,
-            y + size,
-            x,
-            y,
-            x + size / 2,
-            y + size,
-            fill=color,
-            tag="start_line",
-        )
+    def _start_mark_right(self, x, y, size):
+        return (x - size, y - size / 2, x, y, x - size, y + size / 2)
 
-    def create_rect(self, start, duration, color, tag="rect"):
-        start_sec = start.total_seconds()
-        duration_sec = duration.total_seconds()
-        rect_length = duration_sec * self.scale
+    def _start_mark_up(self, x, y, size):
+        return (x - size / 2, y + size, x, y, x + size / 2, y + size)
+
+    def _rect_coords(self, start_sec, duration_sec):
+        px_start = self.to_px(start_sec)
+        px_end = px_start + duration_sec * self.scale
         if self.mode == "vertical":
-            y_start = start_sec * self.scale + 20
-            y_end = y_start + rect_length
-            self.create_rectangle(
-                84,
-                y_start,
-                84 + self.rect_width,
-                y_end,
-                fill=color,
-                outline="#101010",
-                tag=tag,
-            )
+            return (84, px_start, 84 + self.rect_width, px_end)
+        return (px_start, self.top_padding, px_end, self.top_padding + self.rect_width)
+
+    def set_highlight(self, start, duration, color):
+        """Highlight rect over a stage; the existing one is moved"""
+        coords = self._rect_coords(start.total_seconds(), duration.total_seconds())
+        if self.find_withtag("highlight"):
+            self.coords("highlight", *coords)
         else:
-            x_start = start_sec * self.scale + self.left_padding
-            x_end = x_start + rect_length
             self.create_rectangle(
-                x_start,
-                self.top_padding,
-                x_end,
-                self.top_padding + self.rect_width,
-                fill=color,
-                outline="#101010",
-                tag=tag,
+                *coords, fill=color, outline="#101010", tag="highlight"
             )
-        return rect_length
+        self.tag_raise("highlight")
+
+    def create_rect(self, start, duration, color, tag="rect"):
+        duration_sec = duration.total_seconds()
+        self.create_rectangle(
+            *self._rect_coords(start.total_seconds(), duration_sec),
+            fill=color,
+            outline="#101010",
+            tag=tag,
+        )
+        return duration_sec * self.scale
+
+    def create_group(self, start_sec, end_sec, tags=()):
+        """Aggregated bar of stages too short to draw one by one"""
+        # at least 1 px long
+        duration_sec = max(end_sec - start_sec, 1 / self.scale)
+        self.create_rectangle(
+            *self._rect_coords(start_sec, duration_sec),
+            fill=aggregate_color,
+            outline="",
+            tag=("rect", "group", *tags),
+        )
 
-    def create_time(self, start, text):
+    def create_time(self, start, text, tags=(), state="normal"):
+        """Time caption at start. Returns its item ids (none if off the top)."""
         start_sec = start.total_seconds()
         if self.mode == "vertical":
-            y_start = start_sec * self.scale + 20
+            y_start = self.to_px(start_sec)
             if y_start < 10:
-                return
-            self.create_text(
+                return ()
+            text_id = self.create_text(
                 70,
                 y_start,
                 text=text,
                 anchor="e",
                 font=self.font,
-                tag="time",
+                state=state,
+                tag=("time", *tags),
             )
+            return (text_id,)
         else:
-            x_start = start_sec * self.scale + self.left_padding
-            self.create_text(
+            x_start = self.to_px(start_sec)
+            text_id = self.create_text(
                 x_start,
                 self.top_padding + 10 + self.rect_width,
                 text=text,
                 anchor="n",
                 font=self.font,
-                tag="time",
+                state=state,
+                tag=("time", *tags),
             )
-            self.create_line(
+            line_id = self.create_line(
                 x_start,
                 self.top_padding,
                 x_start,
                 self.top_padding + 8 + self.rect_width,
                 fill="#101010",
-                tag="time",
+                state=state,
+                tag=("time", *tags),
             )
+            return (text_id, line_id)
+
+    def set_time(self, item_ids, text):
+        """Change a caption made by create_time in place (and show it)"""
+        if not item_ids:
+            return
+        self.itemconfigure(item_ids[0], text=text)
+        for item_id in item_ids:
+            self.itemconfigure(item_id, state="normal")
 
-    def create_label(self, start, duration, title_str, time_str, has_error=False):
+    def create_label(
+        self, start, duration, title_str, time_str, has_error=False, tags=()
+    ):
         start_sec = start.total_seconds()
         duration_sec = duration.total_seconds()
         rect_length = duration_sec * self.scale
@@ -170,7 +353,7 @@ class Canvas(tk.Canvas):
         else:
             color = "black"
         if self.mode == "vertical":
-            y_start = start_sec * self.scale + 20
+            y_start = self.to_px(start_sec)
             y_end = y_start + rect_length
             self.create_text(
                 100 + self.rect_width,
@@ -179,9 +362,10 @@ class Canvas(tk.Canvas):
                 anchor="w",
                 font=self.font,
                 fill=color,
+                tag=tags,
             )
         else:
-            x_start = start_sec * self.scale + self.left_padding
+            x_start = self.to_px(start_sec)
             x_end = x_start + rect_length
             self.create_text(
                 (x_start + x_end) / 2,
@@ -189,11 +373,13 @@ class Canvas(tk.Canvas):
                 text=f"{title_str}\n{time_str}",
                 anchor="n",
                 font=self.font,
+                tag=tags,
             )
             self.create_line(
                 (x_start + x_end) / 2,
-                self.top_padding-15,
+                self.top_padding - 15,
                 (x_start + x_end) / 2,
                 self.top_padding,
                 fill="#101010",
+                tag=tags,
             )
@@ -1,5 +1,3 @@
-import csv
-import datetime
 import re
 import sys
 import tkinter as tk
@@ -12,10 +10,75 @@ IS_DARWIN = sys.platform.startswith("darwin")
 ValidateMode = Literal["none", "focus", "focusin", "focusout", "key", "all"]
 
 
+# rows above which only a window of the rows is materialised as items
+VIRTUAL_THRESHOLD = 500
+NEW_ROW_VALUES = ["New event", "", "", "", "0:01:00", "duration", ""]
+
+
+class RowWindow:
+    """
+    Window of rows [start, start + size) that exist as Treeview items.
+    top is the first row shown; buffer rows are kept above and below the
+    visible ones so that short scrolls and key presses do not re-window.
+    """
+
+    def __init__(self, visible=30, buffer=20):
+        self.visible = visible
+        self.buffer = buffer
+        self.count = 0
+        self.start = 0
+        self.top = 0
+
+    @property
+    def size(self):
+        return min(self.count, self.visible + 2 * self.buffer)
+
+    def set_count(self, count):
+        self.count = count
+        return self.scroll_to(self.top, force=True)
+
+    def set_visible(self, visible):
+        self.visible = max(visible, 1)
+        return self.scroll_to(self.top, force=True)
+
+    def scroll_to(self, top, force=False):
+        """Show row top first. Returns True if the window moved."""
+        self.top = max(min(top, self.count - self.visible), 0)
+        if (
+            not force
+            and self.start <= self.top
+            and self.top + self.visible <= self.start + self.size
+        ):
+            return False
+        start = max(min(self.top - self.buffer, self.count - self.size), 0)
+        moved = force or start != self.start
+        self.start = start
+        return moved
+
+    def see(self, index):
+        """Scroll as little as possible so that row index is shown"""
+        if index < self.top:
+            return self.scroll_to(index)
+        if index >= self.top + self.visible:
+            return self.scroll_to(index - self.visible + 1)
+        return False
+
+    def position(self, index):
+        """Item position of row index, or None if it is not materialised"""
+        if self.start <= index < self.start + self.size:
+            return index - self.start
+        return None
+
+
 class Tree(ttk.Frame):
     """
     End column is not displayed in the tree.
     If you set the end time, csv file will have the end column.
+
+    Rows are read from stage_list (the previewer's timeline model). Above
+    VIRTUAL_THRESHOLD rows the tree is virtual: only a window of rows exists
+    as items, the items are reused while scrolling and the scrollbar is
+    driven by the row index.
     """
 
     def __init__(self, master, columns: list):
@@ -27,6 +90,9 @@ class Tree(ttk.Frame):
         for column in columns:
             self.tree.heading(column["name"], text=column["name"])
             self.tree.column(column["name"], width=column["width"])
+        self.scrollbar = ttk.Scrollbar(
+            self, orient=tk.VERTICAL, command=self._on_scrollbar
+        )
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.tree["displaycolumns"] = (
             "title",
@@ -40,28 +106,204 @@ class Tree(ttk.Frame):
             self.tree.bind("<Button-3>", self._right_click_tree)
         else:
             self.tree.bind("<Button-2>", self._right_click_tree)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel, add="+")
+        self.tree.configure(yscrollcommand=self._on_tree_yview)
 
         self.menu = tk.Menu(self, tearoff=0)
         self.stage_list = []
         self.write_encoding = "utf-8"
+        self.virtual = False
+        self.window = RowWindow()
+        self.selected_index = -1
 
     def set_stages(self, stages):
-        self.tree.delete(*self.tree.get_children())
-        for i, stage in enumerate(stages):
-            self.tree.insert(
-                "",
-                "end",
-                values=[
-                    stage["title"],
-                    stage["member"],
-                    time_format.str_to_time_str(stage["start_sec"]),
-                    time_format.str_to_time_str(stage["end_sec"]),
-                    time_format.str_to_time_str(stage["duration_sec"]),
-                    stage["fixed"],
-                    stage["instruction"],
-                ],
-            )
+        # rows of the previewer's timeline model; insert/remove/edit only
+        # tell the tree which rows changed, the model is updated by the caller
         self.stage_list = stages
+        self.selected_index = -1
+        self.window.top = 0
+        self._set_mode()
+
+    def _set_mode(self):
+        """Switch between plain and virtual rows, keeping window.top"""
+        self.virtual = len(self.stage_list) > VIRTUAL_THRESHOLD
+        if self.virtual:
+            self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y, before=self.tree)
+            self.window.set_count(len(self.stage_list))
+        else:
+            self.scrollbar.pack_forget()
+        self._render()
+
+    def _row_values(self, index):
+        stage = self.stage_list[index]
+        return [
+            stage["title"],
+            stage["member"],
+            time_format.str_to_time_str(stage["start_sec"]),
+            time_format.str_to_time_str(stage["end_sec"]),
+            time_format.str_to_time_str(stage["duration_sec"]),
+            stage["fixed"],
+            stage["instruction"],
+        ]
+
+    def _rows_shown(self):
+        if self.virtual:
+            return range(self.window.start, self.window.start + self.window.size)
+        return range(len(self.stage_list))
+
+    def _render(self):
+        """Make the items show the current rows, reusing the existing items"""
+        rows = self._rows_shown()
+        items = list(self.tree.get_children())
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows) :])
+            del items[len(rows) :]
+        for pos, index in enumerate(rows):
+            values = self._row_values(index)
+            if pos < len(items):
+                self.tree.item(items[pos], values=values)
+            else:
+                items.append(self.tree.insert("", "end", values=values))
+        self._sync_selection(items)
+        if self.virtual:
+            self._sync_view(items)
+
+    def _sync_selection(self, items):
+        pos = self._position(self.selected_index)
+        if pos is None:
+            if self.tree.selection():
+                self.tree.selection_remove(self.tree.selection())
+        elif self.tree.selection() != (items[pos],):
+            self.tree.selection_set(items[pos])
+
+    def _sync_view(self, items):
+        if items:
+            self.tree.yview_moveto((self.window.top - self.window.start) / len(items))
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        count = max(self.window.count, 1)
+        top = self.window.top
+        self.scrollbar.set(top / count, min(top + self.window.visible, count) / count)
+
+    def _position(self, index):
+        if index < 0 or index >= len(self.stage_list):
+            return None
+        if self.virtual:
+            return self.window.position(index)
+        return index
+
+    def _scroll_to(self, top):
+        if self.window.scroll_to(top):
+            self._render()
+        else:
+            self._sync_view(self.tree.get_children())
+
+    def _on_scrollbar(self, *args):
+        if not self.virtual:
+            self.tree.yview(*args)
+            return
+        if args[0] == "moveto":
+            top = round(float(args[1]) * self.window.count)
+        else:
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.window.visible
+            top = self.window.top + step
+        self._scroll_to(top)
+
+    def _on_tree_yview(self, first, last):
+        if not self.virtual:
+            self.scrollbar.set(first, last)
+            return
+        # the Treeview scrolled itself (keys, see()): follow in row terms
+        size = max(self.window.size, 1)
+        top = self.window.start + round(float(first) * size)
+        if top != self.window.top:
+            self.window.top = top
+            self._update_scrollbar()
+
+    def _on_wheel(self, event):
+        if not self.virtual:
+            return None
+        if event.num == 4:
+            step = -3
+        elif event.num == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self._scroll_to(self.window.top + step)
+        return "break"
+
+    def _on_configure(self, event):
+        if not self.virtual:
+            return
+        row_height = ttk.Style(self).lookup("Treeview", "rowheight") or 20
+        visible = max(event.height // int(row_height) - 1, 1)
+        if visible != self.window.visible:
+            self.window.set_visible(visible)
+            self._render()
+
+    def _on_select(self, event):
+        selected = self.tree.selection()
+        if len(selected) == 0:
+            return
+        pos = self.tree.index(selected[0])
+        if self.virtual:
+            self.selected_index = self.window.start + pos
+            if self.window.see(self.selected_index) or self._at_window_edge(pos):
+                self._render()
+        else:
+            self.selected_index = pos
+
+    def _at_window_edge(self, pos):
+        """
+        The selection was moved (by keys) next to the first/last item while
+        more rows exist beyond it: re-window around the current view.
+        """
+        window = self.window
+        if pos < 1 and window.start > 0:
+            return window.scroll_to(window.top, force=True)
+        if pos >= window.size - 1 and window.start + window.size < window.count:
+            return window.scroll_to(window.top, force=True)
+        return False
+
+    def update_row(self, index):
+        """Redisplay one row from stage_list"""
+        pos = self._position(index)
+        if pos is not None:
+            item = self.tree.get_children()[pos]
+            self.tree.item(item, values=self._row_values(index))
+
+    def row_inserted(self, index):
+        if self.selected_index >= index:
+            self.selected_index += 1
+        if self.virtual:
+            self.window.set_count(len(self.stage_list))
+            self._render()
+        elif len(self.stage_list) > VIRTUAL_THRESHOLD:
+            # becomes virtual: keep the selection and the scroll position
+            self.window.top = round(self.tree.yview()[0] * len(self.stage_list))
+            self.window.set_count(len(self.stage_list))
+            if self.selected_index >= 0:
+                self.window.see(self.selected_index)
+            self._set_mode()
+        else:
+            self.tree.insert("", index, values=self._row_values(index))
+
+    def row_removed(self, index):
+        if self.selected_index == index:
+            self.selected_index = -1
+        elif self.selected_index > index:
+            self.selected_index -= 1
+        if self.virtual:
+            self.window.set_count(len(self.stage_list))
+            self._render()
+        else:
+            self.tree.delete(self.tree.get_children()[index])
 
     def add_menu(self, label, command):
         self.menu.add_command(label=label, command=command)
@@ -71,15 +313,11 @@ class Tree(ttk.Frame):
         print(f"Set write encoding: {encoding}")
 
     def get_selected_index(self):
-        selected = self.tree.selection()
-        if len(selected) == 0:
-            return -1
-        selected = selected[0]
-        return self.tree.index(selected)
+        """Row index of the selection (it may be scrolled out), -1 if none"""
+        return self.selected_index
 
     def _right_click_tree(self, event):
-        selected = self.tree.selection()
-        if len(selected) == 0:
+        if self.selected_index == -1:
             return
         self.menu.post(event.x_root, event.y_root)
 
@@ -89,24 +327,20 @@ class Tree(ttk.Frame):
         return False
 
     def edit(self, prev_end_sec):
-        """Only one row can be edited at once"""
-        selected = self.tree.selection()
-        if len(selected) == 0 or len(selected) > 1:
-            return False
-
-        values = self.tree.item(selected[0]).get("values", None)
-        if values is None or len(values) < 7:
-            return False
-        values = list(values)
+        """
+        Only one row can be edited at once.
+        Returns the new values of the selected row, or None if cancelled.
+        """
+        idx = self.get_selected_index()
+        if idx == -1:
+            return None
+        values = self._row_values(idx)
 
         x = self.winfo_rootx()
         y = self.winfo_rooty()
         dialog = TimelineTreeDialog(self, x, y)
         dialog.set_row_contents(values)
 
-        idx = self.get_selected_index()
-        if idx == -1:
-            return False
         start = time_format.timedelta_to_str(self.stage_list[idx]["start_dt"])
         end = time_format.timedelta_to_str(self.stage_list[idx]["end_dt"])
         dialog.set_current_time_range(start, end)
@@ -116,7 +350,7 @@ class Tree(ttk.Frame):
         new_title = dialog.selected_title
         new_member = dialog.selected_member
         if new_title == None or new_member == None:
-            return False
+            return None
 
         if new_title != "":
             values[0] = new_title
@@ -131,83 +365,26 @@ class Tree(ttk.Frame):
             values[6] = dialog.selected_instruction
         elif dialog.selected_instruction == " " or dialog.selected_instruction == "":
             values[6] = ""
-
-        self.tree.item(selected[0], values=values)
-        return True
+        return values
 
     def insert(self):
-        selected = self.tree.selection()
-        if len(selected) != 1:
-            return False
-
-        item = selected[0]
-        idx = self.tree.index(item)
-        if idx == 0:
-            start_dt = datetime.timedelta(seconds=0)
-        else:
-            start_dt = self.stage_list[idx - 1]["end_dt"]
-
-        new_row = {
-            "title": "New event",
-            "member": "",
-            "start_dt": start_dt,
-            "end_dt": start_dt,
-            "duration": datetime.timedelta(seconds=60),
-            "start_sec": "",
-            "end_sec": "",
-            "duration_sec": "1:00",
-            "fixed": "duration",
-            "instruction": "",
-        }
-        item = selected[0]
-        idx = self.tree.index(item)
-        self.stage_list.insert(idx, new_row)
-        self.set_stages(self.stage_list)
-        return True
+        """Index for a new row before the selected one (None if no selection)"""
+        idx = self.get_selected_index()
+        if idx == -1:
+            return None
+        return idx
 
     def remove(self):
-        """Only one row can be removed at once"""
-        selected = self.tree.selection()
-        if len(selected) != 1:
-            return False
-
-        item = selected[0]
-
-        # update start and end time below all removed item
-        idx = self.tree.index(item)
-        self.stage_list.pop(idx)
-        self.set_stages(self.stage_list)
-        return True
-
-    def tree_to_csv_file(self, file_path):
-        end_col_num = 3
-        timetable_to_csv.move_to_backup_folder(file_path)
-        ends = [
-            self.tree.item(item)["values"][end_col_num]
-            for item in self.tree.get_children()
-        ]
-
-        if ends.count("") == len(ends):
-            header = "title,member,start,duration,fixed,instruction"
-            no_end = True
-        else:
-            header = "title,member,start,end,duration,fixed,instruction"
-            no_end = False
-
-        with open(file_path, "w", encoding=self.write_encoding, newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(header.split(","))
-
-            for item in self.tree.get_children():
-                values = list(self.tree.item(item).get("values", ()))
-                if no_end:
-                    values.pop(end_col_num)
-
-                writer.writerow([str(v) for v in values])
+        """Only one row can be removed at once; returns its index or None"""
+        idx = self.get_selected_index()
+        if idx == -1:
+            return None
+        return idx
 
     def clear(self):
         self.tree.delete(*self.tree.get_children())
         self.stage_list = []
+        self.selected_index = -1
 
 
 class TimelineTreeDialog(tk.Frame):
@@ -0,0 +1,133 @@
+import atexit
+import os
+import threading
+import weakref
+
+# writers that are still open; flushed and closed at interpreter exit
+_open_writers = weakref.WeakSet()
+
+
+def close_all():
+    for writer in list(_open_writers):
+        writer.close()
+
+
+atexit.register(close_all)
+
+
+class BufferedLogWriter:
+    """
+    Line-oriented log file that is kept open and written by a background thread.
+    write() only appends to an in-memory buffer, so the caller (the Tk thread)
+    never waits on the disk. The buffer is written every flush_interval_sec,
+    when it holds max_buffer_lines lines, or on flush(). flush(sync=True) also
+    fsyncs the file (still on the background thread).
+    """
+
+    def __init__(
+        self,
+        path,
+        mode="a",
+        header=None,
+        flush_interval_sec=1.0,
+        max_buffer_lines=100,
+        encoding=None,
+    ):
+        self.path = path
+        self.flush_interval_sec = flush_interval_sec
+        self.max_buffer_lines = max_buffer_lines
+        self._file = open(path, mode, encoding=encoding)
+        if header is not None:
+            self._file.write(header)
+            self._file.flush()
+
+        self._cond = threading.Condition()
+        self._lines = []
+        self._flush_requested = False
+        self._sync_requested = False
+        # flush requests issued / completed, for flush(wait=True)
+        self._requested = 0
+        self._completed = 0
+        self._closed = False
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"log {os.path.basename(path)}", daemon=True
+        )
+        self._thread.start()
+        _open_writers.add(self)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def write(self, line):
+        with self._cond:
+            if self._closed:
+                raise ValueError(f"Log file already closed: {self.path}")
+            self._lines.append(line)
+            if len(self._lines) >= self.max_buffer_lines:
+                self._flush_requested = True
+                self._cond.notify_all()
+
+    def flush(self, sync=False, wait=False):
+        """
+        Ask the background thread to write the buffer now (and fsync if sync).
+        With wait, block until it is done.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._flush_requested = True
+            self._sync_requested = self._sync_requested or sync
+            self._requested += 1
+            target = self._requested
+            self._cond.notify_all()
+            if wait:
+                while self._completed < target and not self._closed:
+                    self._cond.wait()
+
+    def close(self):
+        """Write everything left, fsync and close the file (blocks until done)"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+        _open_writers.discard(self)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._flush_requested and not self._closed:
+                    self._cond.wait(timeout=self.flush_interval_sec)
+                lines, self._lines = self._lines, []
+                sync = self._sync_requested or self._closed
+                self._flush_requested = False
+                self._sync_requested = False
+                target = self._requested
+                stopping = self._closed
+
+            if self._write(lines, sync) is False:
+                with self._cond:
+                    # keep the lines for the next attempt
+                    self._lines[:0] = lines
+
+            with self._cond:
+                self._completed = target
+                self._cond.notify_all()
+            if stopping:
+                return
+
+    def _write(self, lines, sync):
+        try:
+            if lines:
+                self._file.write("".join(lines))
+                self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+        except OSError as e:
+            print(f"Log write failed ({self.path}): {e}")
+            return False
+        return True
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from . import csv_to_timetable, timetable
+
+# Bump when the JSON layout of ParsedTimeline/Timetable changes
+CACHE_VERSION = 2
+CACHE_SUFFIX = ".json"
+
+
+def user_cache_dir():
+    """Per-user cache directory (not the shared temp directory)"""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(
+            os.path.expanduser("~"), "AppData", "Local"
+        )
+    elif sys.platform.startswith("darwin"):
+        base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+    return os.path.join(base, "timeline_kun")
+
+
+DEFAULT_CACHE_DIR = user_cache_dir()
+
+
+def is_private_dir(path):
+    """
+    True if path is a real directory that only the current user can write to.
+    (On Windows the per-user profile directory is trusted as it is.)
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if not os.path.isdir(path) or os.path.islink(path):
+        return False
+    if not hasattr(os, "getuid"):
+        return True
+    return st.st_uid == os.getuid() and st.st_mode & 0o022 == 0
+
+
+@dataclass
+class ParsedTimeline:
+    """Parse result shared through the cache. Treat it as read-only."""
+
+    time_table: object  # csv_to_timetable.TimeTable
+    encoding: Optional[str]
+    warn_msg: str
+
+
+class ParseCache:
+    """
+    Cache of parsed timeline CSV files.
+
+    Entries are keyed by the content hash of the file (plus the fallback
+    encoding used to decode it). The file size/mtime is remembered per path so
+    that an unchanged file is found without reading it again.
+    The in-process cache and the on-disk cache (shared with the Timer process)
+    are both LRU bounded.
+    """
+
+    def __init__(
+        self, max_entries=16, cache_dir=DEFAULT_CACHE_DIR, max_disk_entries=64
+    ):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        # (abs path, variant) -> (stat key, digest)
+        self._paths: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # digest -> ParsedTimeline
+        self._entries: "OrderedDict[str, ParsedTimeline]" = OrderedDict()
+        if self.cache_dir is not None:
+            try:
+                os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            except OSError as e:
+                print(f"Parse cache disabled: {e}")
+                self.cache_dir = None
+        if self.cache_dir is not None and not is_private_dir(self.cache_dir):
+            # another user could plant cache files there
+            print(f"Parse cache disabled: {self.cache_dir} is not private")
+            self.cache_dir = None
+
+    @staticmethod
+    def _stat_key(path):
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+
+    @staticmethod
+    def _digest(path, variant, data=None):
+        h = hashlib.blake2b(variant.encode("utf-8"), digest_size=16)
+        if data is not None:
+            h.update(data)
+            return h.hexdigest()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _disk_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}{CACHE_SUFFIX}")
+
+    def get(self, path, variant="", data=None) -> Optional[ParsedTimeline]:
+        """
+        Return the cached parse result of path, or None.
+        variant distinguishes results of the same content (e.g. fallback encoding).
+        data is the file content if the caller has already read it (bytes-like);
+        it is only hashed when the size/mtime of path has changed.
+        """
+        path_key = (os.path.abspath(path), variant)
+        stat_key = self._stat_key(path)
+
+        known = self._paths.get(path_key)
+        if known is not None and known[0] == stat_key:
+            digest = known[1]
+        else:
+            digest = self._digest(path, variant, data)
+        self._paths[path_key] = (stat_key, digest)
+        self._paths.move_to_end(path_key)
+        self._trim_paths()
+
+        parsed = self._entries.get(digest)
+        if parsed is not None:
+            self._entries.move_to_end(digest)
+            return parsed
+
+        parsed = self._load_from_disk(digest)
+        if parsed is not None:
+            self._remember(digest, parsed)
+        return parsed
+
+    def put(self, path, parsed: ParsedTimeline, variant="", data=None):
+        path_key = (os.path.abspath(path), variant)
+        stat_key = self._stat_key(path)
+        known = self._paths.get(path_key)
+        if known is not None and known[0] == stat_key:
+            digest = known[1]
+        else:
+            digest = self._digest(path, variant, data)
+            self._paths[path_key] = (stat_key, digest)
+            self._trim_paths()
+        self._remember(digest, parsed)
+        self._save_to_disk(digest, parsed)
+
+    def invalidate(self, path=None):
+        """Forget path (or everything when path is None), including the disk cache"""
+        if path is None:
+            self._paths.clear()
+            self._entries.clear()
+            if self.cache_dir is not None:
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith(CACHE_SUFFIX):
+                        self._remove_file(os.path.join(self.cache_dir, name))
+            return
+
+        path = os.path.abspath(path)
+        for path_key in [k for k in self._paths if k[0] == path]:
+            digest = self._paths.pop(path_key)[1]
+            self._entries.pop(digest, None)
+            if self.cache_dir is not None:
+                self._remove_file(self._disk_path(digest))
+
+    def _remember(self, digest, parsed):
+        self._entries[digest] = parsed
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _trim_paths(self):
+        while len(self._paths) > self.max_entries * 4:
+            self._paths.popitem(last=False)
+
+    def _load_from_disk(self, digest):
+        if self.cache_dir is None:
+            return None
+        file_path = self._disk_path(digest)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry["version"] != CACHE_VERSION:
+                self._remove_file(file_path)
+                return None
+            parsed = _from_entry(entry)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            print(f"Broken parse cache {file_path}: {e}")
+            self._remove_file(file_path)
+            return None
+        # touch for LRU eviction
+        os.utime(file_path)
+        return parsed
+
+    def _save_to_disk(self, digest, parsed):
+        if self.cache_dir is None:
+            return
+        file_path = self._disk_path(digest)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(_to_entry(parsed), f, ensure_ascii=False)
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            print(f"Failed to write parse cache {file_path}: {e}")
+            self._remove_file(tmp_path)
+            return
+        self._evict_disk(keep=file_path)
+
+    def _evict_disk(self, keep=None):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            file_path = os.path.join(self.cache_dir, name)
+            if file_path == keep:
+                continue
+            try:
+                entries.append((os.stat(file_path).st_mtime_ns, file_path))
+            except OSError:
+                continue
+        max_others = self.max_disk_entries - (1 if keep else 0)
+        if len(entries) <= max_others:
+            return
+        entries.sort()
+        for _, file_path in entries[: len(entries) - max_others]:
+            self._remove_file(file_path)
+
+    @staticmethod
+    def _remove_file(file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+
+def _to_entry(parsed):
+    time_table = parsed.time_table
+    return {
+        "version": CACHE_VERSION,
+        "encoding": parsed.encoding,
+        "warn_msg": parsed.warn_msg,
+        "current_time": time_table.current_time,
+        "table": time_table.get_timetable().to_columns(),
+    }
+
+
+def _from_entry(entry):
+    """ParsedTimeline of a cache entry; plain data only, nothing is executed"""
+    time_table = csv_to_timetable.TimeTable()
+    time_table.time_table = timetable.Timetable.from_columns(entry["table"])
+    time_table.current_time = int(entry["current_time"])
+    time_table.warn_msg = str(entry["warn_msg"])
+    encoding = entry["encoding"]
+    if encoding is not None:
+        encoding = str(encoding)
+    return ParsedTimeline(time_table, encoding, time_table.warn_msg)
+
+
+_default_cache = None
+
+
+def get_default_cache() -> ParseCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache
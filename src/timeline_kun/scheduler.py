@@ -0,0 +1,193 @@
+import math
+from dataclasses import dataclass
+
+from . import clock as clock_module
+
+
+@dataclass
+class DriftStats:
+    """Lateness of the wake-ups compared with the requested deadlines"""
+
+    count: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+    last_ns: int = 0
+
+    def add(self, late_ns: int) -> None:
+        self.count += 1
+        self.total_ns += late_ns
+        self.max_ns = max(self.max_ns, late_ns)
+        self.last_ns = late_ns
+
+    @property
+    def mean_ms(self) -> float:
+        if self.count == 0:
+            return 0.0
+        return self.total_ns / self.count / 1e6
+
+    def summary(self) -> str:
+        return (
+            f"{self.count} wake-ups, mean {self.mean_ms:.2f} ms, "
+            f"max {self.max_ns / 1e6:.2f} ms, last {self.last_ns / 1e6:.2f} ms late"
+        )
+
+
+class DeadlineScheduler:
+    """
+    Call callback once at a monotonic deadline, using Tk's after().
+    Only one deadline is pending at a time; scheduling again replaces it.
+    """
+
+    def __init__(self, widget, callback, clock=None):
+        self.widget = widget
+        self.callback = callback
+        self.clock = clock if clock is not None else clock_module.MonotonicClock()
+        self.drift = DriftStats()
+        self._after_id = None
+        self._deadline_ns = None
+
+    def now_ns(self) -> int:
+        return self.clock.now_ns()
+
+    def schedule_at(self, deadline_ns: int) -> None:
+        self.cancel()
+        self._deadline_ns = deadline_ns
+        self._arm()
+
+    def schedule_in(self, delay_sec: float) -> None:
+        self.schedule_at(self.now_ns() + int(delay_sec * 1e9))
+
+    def schedule_now(self) -> None:
+        self.schedule_at(self.now_ns())
+
+    def cancel(self) -> None:
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self._deadline_ns = None
+
+    def _arm(self) -> None:
+        remaining_ns = self._deadline_ns - self.now_ns()
+        delay_ms = max(0, math.ceil(remaining_ns / 1e6))
+        self._after_id = self.widget.after(delay_ms, self._fire)
+
+    def _fire(self) -> None:
+        self._after_id = None
+        if self._deadline_ns is None:
+            return
+        late_ns = self.now_ns() - self._deadline_ns
+        if late_ns < 0:
+            # after() has millisecond resolution and may wake up slightly early
+            self._arm()
+            return
+        self.drift.add(late_ns)
+        self._deadline_ns = None
+        self.callback()
+
+
+class SharedScheduler:
+    """
+    One Tk after() shared by several timers (multi-timer host).
+    Each client (see client()) has the interface of DeadlineScheduler and its
+    own deadline; only the earliest deadline of all clients is armed.
+    """
+
+    def __init__(self, widget, clock=None):
+        self.widget = widget
+        self.clock = clock if clock is not None else clock_module.MonotonicClock()
+        self.drift = DriftStats()
+        self._clients = []
+        self._after_id = None
+        self._armed_ns = None
+        self._firing = False
+
+    def now_ns(self) -> int:
+        return self.clock.now_ns()
+
+    def client(self, callback) -> "SharedDeadline":
+        deadline = SharedDeadline(self, callback)
+        self._clients.append(deadline)
+        return deadline
+
+    def remove(self, deadline: "SharedDeadline") -> None:
+        if deadline in self._clients:
+            self._clients.remove(deadline)
+        self._update()
+
+    def _update(self) -> None:
+        if self._firing:
+            # re-armed once all due clients have run
+            return
+        deadlines = [c.deadline_ns for c in self._clients if c.deadline_ns is not None]
+        earliest = min(deadlines) if deadlines else None
+        if self._after_id is not None and earliest == self._armed_ns:
+            return
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+        self._armed_ns = earliest
+        if earliest is None:
+            return
+        remaining_ns = earliest - self.now_ns()
+        delay_ms = max(0, math.ceil(remaining_ns / 1e6))
+        self._after_id = self.widget.after(delay_ms, self._fire)
+
+    def _fire(self) -> None:
+        self._after_id = None
+        self._armed_ns = None
+        now_ns = self.now_ns()
+        # after() may wake up slightly early: those clients simply stay pending
+        due = [
+            c
+            for c in self._clients
+            if c.deadline_ns is not None and c.deadline_ns <= now_ns
+        ]
+        self._firing = True
+        error = None
+        try:
+            for c in due:
+                late_ns = now_ns - c.deadline_ns
+                c.drift.add(late_ns)
+                self.drift.add(late_ns)
+                c.deadline_ns = None
+            for c in due:
+                try:
+                    c.callback()
+                except Exception as e:
+                    # one timer's error must not freeze the other timers
+                    if error is None:
+                        error = e
+        finally:
+            self._firing = False
+            self._update()
+        if error is not None:
+            # reported by Tk, once every due client has run
+            raise error
+
+
+class SharedDeadline:
+    """Client of a SharedScheduler, used like a DeadlineScheduler"""
+
+    def __init__(self, host, callback):
+        self.host = host
+        self.callback = callback
+        self.clock = host.clock
+        self.drift = DriftStats()
+        self.deadline_ns = None
+
+    def now_ns(self) -> int:
+        return self.host.now_ns()
+
+    def schedule_at(self, deadline_ns: int) -> None:
+        self.deadline_ns = deadline_ns
+        self.host._update()
+
+    def schedule_in(self, delay_sec: float) -> None:
+        self.schedule_at(self.now_ns() + int(delay_sec * 1e9))
+
+    def schedule_now(self) -> None:
+        self.schedule_at(self.now_ns())
+
+    def cancel(self) -> None:
+        self.deadline_ns = None
+        self.host._update()
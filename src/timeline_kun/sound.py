@@ -1,8 +1,229 @@
 import os
 import sys
+import threading
 
-import sounddevice as sd
-import soundfile as sf
+import numpy as np
+
+from . import clock as clock_module
+
+CUE_FILES = (
+    "countdown3_orange.wav",
+    "countdown3_cyan.wav",
+    "countdown3_lightgreen.wav",
+)
+
+
+def get_sound_path(sound_name):
+    if getattr(sys, "frozen", False):
+        current_dir = os.path.dirname(sys.executable)
+    else:
+        current_dir = os.path.dirname(__file__)
+    return os.path.join(current_dir, "sound", sound_name)
+
+
+def _resample(data, src_rate, dst_rate):
+    """Linear interpolation, good enough for short cue sounds"""
+    n = round(len(data) * dst_rate / src_rate)
+    src_x = np.arange(len(data)) / src_rate
+    dst_x = np.arange(n) / dst_rate
+    channels = [np.interp(dst_x, src_x, data[:, ch]) for ch in range(data.shape[1])]
+    return np.stack(channels, axis=1).astype(np.float32)
+
+
+class StreamTime:
+    """Same fields as the time argument of a sounddevice callback"""
+
+    def __init__(self, current_time, output_time):
+        self.currentTime = current_time
+        self.outputBufferDacTime = output_time
+        self.inputBufferAdcTime = 0.0
+
+
+class NullOutputStream:
+    """
+    Output stream without a sound device (headless tests).
+    Nothing is played; render() pulls blocks from the callback by hand.
+    """
+
+    def __init__(self, samplerate, channels, callback, blocksize=256, **_):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.callback = callback
+        self.blocksize = blocksize
+        self.frames_rendered = 0
+        self.active = False
+        self.latency = 0.0
+
+    @property
+    def time(self):
+        return self.frames_rendered / self.samplerate
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        self.active = False
+
+    def render(self, frames=None):
+        frames = frames or self.blocksize
+        out = np.zeros((frames, self.channels), dtype=np.float32)
+        self.callback(out, frames, StreamTime(self.time, self.time), None)
+        self.frames_rendered += frames
+        return out
+
+
+class _Voice:
+    __slots__ = ("data", "pos", "start_time")
+
+    def __init__(self, data, start_time):
+        self.data = data
+        self.pos = 0
+        # stream time of the first sample (None: as soon as possible)
+        self.start_time = start_time
+
+
+class CueEngine:
+    """
+    Plays countdown cues through one output stream that stays open.
+    All cues are decoded to float32 at construction; play() only queues a
+    voice, which the stream callback mixes in at the requested monotonic
+    time (to the sample, within the stream's clock accuracy).
+
+    backend: "sounddevice", "null" (no device) or "auto" (sounddevice, or
+    null if no device can be opened).
+    """
+
+    def __init__(
+        self,
+        cue_names=CUE_FILES,
+        backend="auto",
+        clock=None,
+        blocksize=256,
+        latency="low",
+    ):
+        self.clock = clock if clock is not None else clock_module.MonotonicClock()
+        self.cues = {}
+        self.samplerate = None
+        self.channels = 1
+        for name in cue_names:
+            self.load(name)
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._voices = []
+        self.stream = self._open_stream(backend, blocksize, latency)
+
+    def load(self, sound_name):
+        """Decode a WAV file (cached) and return (data, samplerate)"""
+        if sound_name not in self.cues:
+            # imported here: loading libsndfile is slow and only needed once
+            import soundfile as sf
+
+            data, samplerate = sf.read(
+                get_sound_path(sound_name), dtype="float32", always_2d=True
+            )
+            if self.samplerate is None:
+                self.samplerate = samplerate
+            elif samplerate != self.samplerate:
+                # custom WAVs may differ; the stream has one sample rate
+                data = _resample(data, samplerate, self.samplerate)
+            self.channels = max(self.channels, data.shape[1])
+            self.cues[sound_name] = data
+        return self.cues[sound_name], self.samplerate
+
+    def _open_stream(self, backend, blocksize, latency):
+        kwargs = dict(
+            samplerate=self.samplerate,
+            channels=self.channels,
+            dtype="float32",
+            blocksize=blocksize,
+            latency=latency,
+            callback=self._callback,
+        )
+        if backend == "null":
+            return self._null_stream(kwargs)
+        try:
+            # OSError: no PortAudio library
+            import sounddevice as sd
+        except OSError as e:
+            if backend != "auto":
+                raise
+            print(f"No audio output ({e}), cues are not played")
+            return self._null_stream(kwargs)
+        try:
+            stream = sd.OutputStream(**kwargs)
+            stream.start()
+            return stream
+        except sd.PortAudioError as e:
+            # PortAudio is there, but no output device can be opened
+            if backend != "auto":
+                raise
+            print(f"No audio output ({e}), cues are not played")
+            return self._null_stream(kwargs)
+
+    @staticmethod
+    def _null_stream(kwargs):
+        stream = NullOutputStream(**kwargs)
+        stream.start()
+        return stream
+
+    def play(self, sound_name, at_ns=None):
+        """Play a cue now, or at clock time at_ns"""
+        data, _ = self.load(sound_name)
+        start_time = None
+        if at_ns is not None:
+            # clock time -> stream time
+            start_time = self.stream.time + (at_ns - self.clock.now_ns()) / 1e9
+        with self._lock:
+            self._pending.append(_Voice(data, start_time))
+
+    def stop_all(self):
+        with self._lock:
+            self._pending.clear()
+            self._voices = []
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
+
+    def _callback(self, outdata, frames, time, status):
+        outdata.fill(0)
+        with self._lock:
+            if self._pending:
+                self._voices.extend(self._pending)
+                self._pending.clear()
+            voices = self._voices
+        if not voices:
+            return
+
+        buffer_time = time.outputBufferDacTime
+        finished = []
+        for voice in voices:
+            offset = 0
+            if voice.pos == 0 and voice.start_time is not None:
+                offset = round((voice.start_time - buffer_time) * self.samplerate)
+                if offset >= frames:
+                    continue
+                offset = max(offset, 0)
+            n = min(frames - offset, len(voice.data) - voice.pos)
+            chunk = voice.data[voice.pos : voice.pos + n]
+            if chunk.shape[1] == 1:
+                # mono cue on every channel
+                outdata[offset : offset + n] += chunk
+            else:
+                ch = min(chunk.shape[1], outdata.shape[1])
+                outdata[offset : offset + n, :ch] += chunk[:, :ch]
+            voice.pos += n
+            if voice.pos >= len(voice.data):
+                finished.append(voice)
+
+        if finished:
+            with self._lock:
+                self._voices = [v for v in self._voices if v not in finished]
+        np.clip(outdata, -1.0, 1.0, out=outdata)
 
 
 class AudioPlayer:
@@ -10,43 +231,39 @@ class AudioPlayer:
     A simple class for playing WAV audio files at specified timings
     """
 
-    def __init__(self):
-        """Initialize the audio player"""
-        self.audio_cache = {}  # Cache for loaded audio data
+    def __init__(self, clock=None, backend="auto", engine=None):
+        """
+        Initialize the audio player (all cues are loaded and the stream opened).
+        With engine, that CueEngine is shared (e.g. by the timers of the
+        multi-timer host) and close() leaves it open.
+        """
+        self._owns_engine = engine is None
+        if engine is None:
+            engine = CueEngine(backend=backend, clock=clock)
+        self.engine = engine
 
     def load_audio(self, sound_name):
         """
         Load a WAV file and save it to cache
 
         Args:
-            filepath (str): Path to the WAV file
+            sound_name (str): File name of the WAV file in the sound folder
 
         Returns:
             tuple: (audio data, sample rate)
         """
-        if getattr(sys, "frozen", False):
-            current_dir = os.path.dirname(sys.executable)
-        else:
-            current_dir = os.path.dirname(__file__)
-        sound_path = os.path.join(current_dir, "sound", sound_name)
-
-        if sound_path not in self.audio_cache:
-            data, samplerate = sf.read(sound_path)
-            self.audio_cache[sound_path] = (data, samplerate)
-        return self.audio_cache[sound_path]
+        return self.engine.load(sound_name)
 
     def play_sound(self, filepath, play_time=None):
         """
         Play audio at a specified time
 
         Args:
-            filepath (str): Path to the WAV file to play
-            play_time (datetime.datetime, optional): Time to play. If None, play immediately
+            filepath (str): File name of the WAV file to play
+            play_time (int, optional): Clock time (ns) to play at. If None, play immediately
         """
-        # Pre-load the audio
-        data, samplerate = self.load_audio(filepath)
+        self.engine.play(filepath, at_ns=play_time)
 
-        if play_time is None:
-            # Play immediately
-            sd.play(data, samplerate)
-            return
+    def close(self):
+        if self._owns_engine:
+            self.engine.close()
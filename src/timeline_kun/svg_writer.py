@@ -1,34 +1,210 @@
-def save_as_svg(tk_canvas, filename):
-    svg = '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
-    width = tk_canvas.winfo_width() + 100
-    height = tk_canvas.winfo_height()
-    svg += f"<svg xmlns='http://www.w3.org/2000/svg' width='{width}' height='{height}' viewBox='0 0 {width} {height}'>\n"
-
-    for item in tk_canvas.find_all():
-        if tk_canvas.type(item) == "rectangle":
-            x1, y1, x2, y2 = tk_canvas.coords(item)
-            color = tk_canvas.itemcget(item, "fill")
-            svg += f"<rect x='{x1}' y='{y1}' width='{x2-x1}' height='{y2-y1}' fill='{color}' stroke='black' />\n"
-        elif tk_canvas.type(item) == "text":
-            x, y = tk_canvas.coords(item)
-            text = tk_canvas.itemcget(item, "text")
-            anchor = tk_canvas.itemcget(item, "anchor")
-            font = tk_canvas.itemcget(item, "font")
-            font_size = int(font.split(" ")[1])
-
-            if anchor == "e":
-                anchor = "end"
-            elif anchor == "w":
-                anchor = "start"
-            elif anchor == "n":
-                anchor = "middle"
-
-            y += font_size / 2 - 2
-            svg += f"<text x='{x}' y='{y}' font-family='Helvetica' font-size='{font_size}' text-anchor='{anchor}'>{text}</text>\n"
-        elif tk_canvas.type(item) == "line":
-            x1, y1, x2, y2 = tk_canvas.coords(item)
-            svg += f"<line x1='{x1}' y1='{y1}' x2='{x2}' y2='{y2}' stroke='black' />\n"
-
-    svg += "</svg>"
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(svg)
+import datetime
+import math
+import os
+from html import escape
+
+from . import gui_canvas, time_format
+
+FONT_SIZES = {name: font["font"][1] for name, font in gui_canvas.Canvas.fonts.items()}
+
+
+def title_colors(time_table):
+    """Rect color of each title, as the previewer assigns them"""
+    colors = {}
+    for i, title in enumerate(sorted(time_table.get_titles())):
+        if i >= len(gui_canvas.rect_colors):
+            colors[title] = "#aaaaaa"
+        else:
+            colors[title] = gui_canvas.rect_colors[i]
+    return colors
+
+
+class SvgRenderer:
+    """
+    Renders a timetable (columnar Timetable) to SVG without a Tk window, with
+    the same layout as the previewer canvas.
+
+    length_px is the length of the time axis of one page. Without
+    px_per_sec the whole timeline is fitted into one page; with px_per_sec
+    the timeline is split into as many pages as needed. width_px is the size
+    of a page across the time axis. Elements are generated one by one, so a
+    page is never held in memory as a whole.
+    """
+
+    rect_width = 15
+    left_padding = 30
+    top_padding = 100
+
+    def __init__(
+        self,
+        time_table,
+        direction="vertical",
+        length_px=1000,
+        px_per_sec=None,
+        include_hour=False,
+        font="small",
+        width_px=None,
+    ):
+        if direction not in ["horizontal", "vertical"]:
+            raise ValueError("direction must be 'horizontal' or 'vertical'")
+        self.time_table = time_table
+        self.direction = direction
+        self.length_px = length_px
+        self.include_hour = include_hour
+        self.font_size = FONT_SIZES[font]
+        self.colors = title_colors(time_table)
+
+        self.total_sec = time_table.end[-1] if len(time_table) > 0 else 0
+        if px_per_sec is None:
+            px_per_sec = length_px / max(self.total_sec, 1)
+        self.scale = px_per_sec
+        self.page_sec = length_px / px_per_sec
+        self.page_count = max(math.ceil(self.total_sec / self.page_sec), 1)
+
+        if width_px is None:
+            width_px = 600 if direction == "vertical" else 200
+        self.width_px = width_px
+        self.index = gui_canvas.StageIndex(time_table.start, time_table.end)
+
+    def _to_px(self, sec, page_start):
+        if self.direction == "vertical":
+            offset = 20
+        else:
+            offset = self.left_padding
+        return (sec - page_start) * self.scale + offset
+
+    def _rect(self, px_start, px_end, fill, stroke="black"):
+        if self.direction == "vertical":
+            x, y = 84, px_start
+            width, height = self.rect_width, px_end - px_start
+        else:
+            x, y = px_start, self.top_padding
+            width, height = px_end - px_start, self.rect_width
+        stroke_attr = f" stroke='{stroke}'" if stroke else ""
+        return (
+            f"<rect x='{x:g}' y='{y:g}' width='{width:g}' height='{height:g}' "
+            f"fill='{fill}'{stroke_attr} />\n"
+        )
+
+    def _text(self, x, y, text, anchor, baseline, fill="black"):
+        lines = [escape(line, quote=False) for line in text.split("\n")]
+        attrs = (
+            f"x='{x:g}' y='{y:g}' font-family='Helvetica' "
+            f"font-size='{self.font_size}' text-anchor='{anchor}' "
+            f"dominant-baseline='{baseline}' fill='{fill}'"
+        )
+        if len(lines) == 1:
+            return f"<text {attrs}>{lines[0]}</text>\n"
+        spans = "".join(
+            f"<tspan x='{x:g}' dy='{0 if i == 0 else 1.2}em'>{line}</tspan>"
+            for i, line in enumerate(lines)
+        )
+        return f"<text {attrs}>{spans}</text>\n"
+
+    def _line(self, x1, y1, x2, y2):
+        return (
+            f"<line x1='{x1:g}' y1='{y1:g}' x2='{x2:g}' y2='{y2:g}' stroke='black' />\n"
+        )
+
+    def _time(self, px, text):
+        if self.direction == "vertical":
+            if px < 10:
+                return ""
+            return self._text(70, px, text, "end", "middle")
+        y = self.top_padding + 10 + self.rect_width
+        return self._text(px, y, text, "middle", "hanging") + self._line(
+            px, self.top_padding, px, self.top_padding + 8 + self.rect_width
+        )
+
+    def _label(self, px_start, px_end, title, time_str, has_error):
+        if has_error:
+            color = "red"
+        elif time_str in ["0:00", "00:00", "0:00:00"]:
+            color = "orange"
+        else:
+            color = "black"
+        middle = (px_start + px_end) / 2
+        if self.direction == "vertical":
+            x = 100 + self.rect_width
+            return self._text(
+                x, middle, f"{title} ({time_str})", "start", "middle", color
+            )
+        # the canvas draws horizontal labels in black
+        y = self.top_padding - 50
+        return self._text(
+            middle, y, f"{title}\n{time_str}", "middle", "hanging"
+        ) + self._line(middle, self.top_padding - 15, middle, self.top_padding)
+
+    def _format(self, sec):
+        td = datetime.timedelta(seconds=sec)
+        return time_format.timedelta_to_str(td, self.include_hour)
+
+    def _stage(self, i, page_start):
+        t = self.time_table
+        if i == 0:
+            past_start, past_rect_px = 0, 10000
+        else:
+            past_start = t.start[i - 1]
+            past_rect_px = t.duration[i - 1] * self.scale
+        start = t.start[i] if t.start[i] != 0 else past_start
+        duration = t.duration[i]
+
+        px_start = self._to_px(start, page_start)
+        px_end = px_start + duration * self.scale
+        yield self._rect(px_start, px_end, self.colors[t.title[i]])
+        yield self._label(
+            px_start, px_end, t.title[i], self._format(duration), t.has_error(i)
+        )
+        if past_rect_px > 10:
+            yield self._time(self._to_px(t.start[i], page_start), self._format(start))
+
+    def page_size(self):
+        if self.direction == "vertical":
+            return self.width_px, self.length_px + 40
+        return self.length_px + 2 * self.left_padding, self.width_px
+
+    def iter_page(self, page):
+        """SVG document of one page, element by element"""
+        width, height = self.page_size()
+        page_start = page * self.page_sec
+        page_end = page_start + self.page_sec
+        yield '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        yield (
+            f"<svg xmlns='http://www.w3.org/2000/svg' width='{width:g}' "
+            f"height='{height:g}' viewBox='0 0 {width:g} {height:g}'>\n"
+        )
+        if len(self.time_table) > 0:
+            for item in self.index.plan(page_start, page_end, self.scale):
+                if item[0] == "stage":
+                    yield from self._stage(item[1], page_start)
+                else:
+                    _, _, _, start, end = item
+                    px_start = self._to_px(start, page_start)
+                    px_end = max(self._to_px(end, page_start), px_start + 1)
+                    yield self._rect(
+                        px_start, px_end, gui_canvas.aggregate_color, stroke=None
+                    )
+            if page_start <= self.total_sec <= page_end:
+                px = self._to_px(self.total_sec, page_start)
+                yield self._time(px, self._format(self.total_sec))
+        yield "</svg>\n"
+
+    def page_paths(self, file_path):
+        if self.page_count == 1:
+            return [file_path]
+        stem, ext = os.path.splitext(file_path)
+        digits = len(str(self.page_count))
+        return [f"{stem}_p{p + 1:0{digits}}{ext}" for p in range(self.page_count)]
+
+    def write(self, file_path):
+        """Write all pages. Returns the paths written."""
+        paths = self.page_paths(file_path)
+        for page, path in enumerate(paths):
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(self.iter_page(page))
+        return paths
+
+
+def save_as_svg(time_table, filename, **kwargs):
+    """Render time_table to filename (split into pages if needed)"""
+    return SvgRenderer(time_table, **kwargs).write(filename)
@@ -1,36 +1,43 @@
-def timedelta_to_str(td, hhmmss=True):
+import functools
+
+# A protocol repeats a few time strings ("0:01:00", "0:00:30", ...), so the
+# parsed values are memoized; the bound keeps huge generated files in check.
+MEMO_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=8)
+def _hour_table(hours, hhmmss):
+    """Formatted strings of the 3600 seconds of one hour (built on first use)"""
     if hhmmss:
-        return timedelta_to_str_hh_mm_ss(td)
-    else:
-        return timedelta_to_str_mm_ss(td)
+        return tuple(f"{hours}:{m:02}:{s:02}" for m in range(60) for s in range(60))
+    return tuple(f"{hours * 60 + m}:{s:02}" for m in range(60) for s in range(60))
+
+
+def _format_seconds(sec, hhmmss):
+    hours, remain = divmod(sec, 3600)
+    return _hour_table(hours, hhmmss)[remain]
+
+
+def timedelta_to_str(td, hhmmss=True):
+    return _format_seconds(td.seconds, hhmmss)
 
 
 def timedelta_to_str_hh_mm_ss(td):
-    hours = td.seconds // 3600
-    remain = td.seconds - (hours * 3600)
-    minutes = remain // 60
-    seconds = remain - (minutes * 60)
-    return f"{int(hours)}:{int(minutes):02}:{int(seconds):02}"
+    return _format_seconds(td.seconds, True)
 
 
 def timedelta_to_str_mm_ss(td):
-    minutes = td.seconds // 60
-    seconds = td.seconds - (minutes * 60)
-    return f"{int(minutes)}:{int(seconds):02}"
+    return _format_seconds(td.seconds, False)
 
 
 def seconds_to_time_str(sec: int | float) -> str:
     sec_i = int(sec)
     if sec_i < 0:
         raise ValueError(f"sec must be >= 0, got {sec!r}")
-
-    hours = sec_i // 3600
-    remain = sec_i - (hours * 3600)
-    minutes = remain // 60
-    seconds = remain - (minutes * 60)
-    return f"{int(hours)}:{int(minutes):02}:{int(seconds):02}"
+    return _format_seconds(sec_i, True)
 
 
+@functools.lru_cache(maxsize=MEMO_SIZE)
 def str_to_seconds(src: str) -> int:
     s = src.strip()
     if s == "":
@@ -59,8 +66,31 @@ def str_to_seconds(src: str) -> int:
     raise ValueError(f"Invalid time format: {src!r}")
 
 
+@functools.lru_cache(maxsize=MEMO_SIZE)
 def str_to_time_str(src: str) -> str:
     s = src.strip()
     if s == "":
         return ""
     return seconds_to_time_str(str_to_seconds(s))
+
+
+def _batch(func, values):
+    # each distinct string is converted once per call, even past the memo bound
+    done = {}
+    out = []
+    for value in values:
+        result = done.get(value)
+        if result is None:
+            result = done[value] = func(value)
+        out.append(result)
+    return out
+
+
+def strs_to_seconds(values) -> list[int]:
+    """str_to_seconds of a whole column (e.g. Timetable.duration_sec)"""
+    return _batch(str_to_seconds, values)
+
+
+def strs_to_time_strs(values) -> list[str]:
+    """str_to_time_str of a whole column"""
+    return _batch(str_to_time_str, values)
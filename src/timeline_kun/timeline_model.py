@@ -0,0 +1,209 @@
+from . import csv_to_timetable, time_format, timetable
+
+# Tree/CSV column order of one row
+COLUMNS = ("title", "member", "start", "end", "duration", "fixed", "instruction")
+_RAW_FIELDS = (
+    "title",
+    "member",
+    "start_sec",
+    "end_sec",
+    "duration_sec",
+    "fixed",
+    "instruction",
+)
+
+
+class TimelineModel:
+    """
+    In-memory timeline of the Previewer.
+
+    Holds a copy of the parsed timetable and recomputes start/end times with
+    the same rules as csv_to_timetable.TimeTable. After an edit only the rows
+    from the edited one onwards are recomputed, and only until a row keeps its
+    previous start/end (e.g. a fixed=start row re-anchors the schedule); the
+    rest of the timeline cannot depend on the edit.
+
+    Warnings are kept per row, so the message of the whole file (warn_msg)
+    does not need a full pass either.
+    Edits raise ValueError for rows the parser would reject; the raw values
+    are already applied then, so the CSV written from the model keeps them.
+    """
+
+    def __init__(self, time_table=None):
+        # never modify the parser's timetable (it may be shared by the cache)
+        if time_table is None:
+            self.time_table = timetable.Timetable()
+        else:
+            self.time_table = time_table.copy()
+        n = len(self.time_table)
+        self._warnings = [""] * n
+        # rows starting earlier than the previous row (only the first one is an error)
+        self._earlier = bytearray(n)
+        # stable ids of the rows (for canvas tags etc.)
+        self._row_ids = list(range(n))
+        self._next_id = n
+        self._recompute(0, range(n), n - 1)
+
+    def __len__(self):
+        return len(self.time_table)
+
+    def get_timetable(self):
+        return self.time_table
+
+    def row_id(self, index):
+        return self._row_ids[index]
+
+    def row_values(self, index):
+        """Values of one row in COLUMNS order (times as H:MM:SS)"""
+        t = self.time_table
+        return [
+            t.title[index],
+            t.member[index],
+            time_format.str_to_time_str(t.start_sec[index]),
+            time_format.str_to_time_str(t.end_sec[index]),
+            time_format.str_to_time_str(t.duration_sec[index]),
+            t.fixed[index],
+            t.instruction[index],
+        ]
+
+    def get_warn_msg(self):
+        """Same message as TimeTable.load_csv_str would return"""
+        first = self._earlier.find(1)
+        if first >= 0:
+            return f"[line {first + 1}] Start time is earlier than the previous line"
+        for i in range(len(self._warnings) - 1, -1, -1):
+            if self._warnings[i] != "":
+                return f"[line {i + 1}] {self._warnings[i]}"
+        return ""
+
+    def edit_row(self, index, values):
+        """
+        Replace row index with values (COLUMNS order).
+        Returns the sorted indices of rows whose times or errors changed.
+        """
+        self.time_table.set_fields(index, **self._raw_fields(values))
+        # the previous row may take its end from this row's start
+        return self._recompute(max(index - 1, 0), [index], index)
+
+    def insert_row(self, index, values):
+        """Insert a row before index. Returns the changed rows like edit_row."""
+        fields = self._raw_fields(values)
+        self.time_table.insert(index, fields.pop("title"), 0, 0, **fields)
+        self._warnings.insert(index, "")
+        self._earlier.insert(index, 0)
+        self._row_ids.insert(index, self._next_id)
+        self._next_id += 1
+        # the following row gets a new predecessor (and index 0 is special)
+        return self._recompute(max(index - 1, 0), [index], index + 1)
+
+    def remove_row(self, index):
+        """Remove row index. Returns the changed rows (indices after removal)."""
+        self.time_table.remove(index)
+        self._warnings.pop(index)
+        first = self._earlier.find(1)
+        self._earlier.pop(index)
+        self._row_ids.pop(index)
+        if first == index:
+            # the error of the removed row moves to the next earlier row
+            first = -1
+        elif first > index:
+            first -= 1
+        if len(self) == 0:
+            return []
+        return self._recompute(max(index - 1, 0), [], index, old_first=first)
+
+    def to_csv_rows(self):
+        """Header and rows for writing the CSV (no end column if unused)"""
+        t = self.time_table
+        has_end = any(t.end_sec[i] != "" for i in range(len(t)))
+        columns = list(COLUMNS)
+        if not has_end:
+            columns.remove("end")
+        rows = []
+        for i in range(len(t)):
+            values = self.row_values(i)
+            if not has_end:
+                values.pop(3)
+            rows.append(values)
+        return columns, rows
+
+    @staticmethod
+    def _raw_fields(values):
+        return {name: str(value).strip() for name, value in zip(_RAW_FIELDS, values)}
+
+    def _compute_row(self, i, current_time, prev_start, prev_has_end):
+        """
+        Start/end of row i with the parser's rules.
+        Returns (start, end, warning, is_earlier).
+        """
+        t = self.time_table
+        next_start_str = t.start_sec[i + 1] if i < len(t) - 1 else None
+        return csv_to_timetable.compute_row_times(
+            i,
+            t.title[i],
+            t.fixed[i],
+            t.start_sec[i],
+            t.end_sec[i],
+            t.duration_sec[i],
+            current_time,
+            prev_start,
+            prev_has_end,
+            next_start_str,
+        )
+
+    def _has_end_time(self, i):
+        t = self.time_table
+        return t.end_sec[i] != "" or t.duration_sec[i] != ""
+
+    def _recompute(self, lo, edited, last_dirty, old_first=None):
+        """
+        Recompute rows from lo. Rows up to last_dirty are always recomputed;
+        after that, the pass stops at the first unedited row whose start/end
+        did not change, since the next row only depends on those (and on
+        whether that row has a duration/end, which only an edit changes).
+        Rows in edited are reported as changed even if their times are not.
+        """
+        t = self.time_table
+        n = len(t)
+        if old_first is None:
+            old_first = self._earlier.find(1)
+        if lo == 0:
+            current_time, prev_start, prev_has_end = 0, None, True
+        else:
+            current_time = t.end[lo - 1]
+            prev_start = t.start[lo - 1]
+            prev_has_end = self._has_end_time(lo - 1)
+
+        changed = []
+        for i in range(lo, n):
+            start, end, warning, is_earlier = self._compute_row(
+                i, current_time, prev_start, prev_has_end
+            )
+            same_times = start == t.start[i] and end == t.end[i]
+            if (
+                i in edited
+                or not same_times
+                or warning != self._warnings[i]
+                or is_earlier != bool(self._earlier[i])
+            ):
+                changed.append(i)
+            t.set_times(i, start, end)
+            self._warnings[i] = warning
+            self._earlier[i] = is_earlier
+            # an edited row may have gained or lost its duration/end, which the
+            # next row's "No duration (or end)" warning depends on
+            if i >= last_dirty and same_times and i not in edited:
+                break
+            current_time = end
+            prev_start = start
+            prev_has_end = self._has_end_time(i)
+
+        # the "earlier" error is only flagged on its first occurrence
+        new_first = self._earlier.find(1)
+        errors = set(changed)
+        for i in (old_first, new_first):
+            if 0 <= i < n:
+                errors.add(i)
+        for i in errors:
+            t.set_error(i, self._warnings[i] != "" or i == new_first)
+        return sorted(errors)
@@ -0,0 +1,289 @@
+from . import clock as clock_module
+
+SEC = 1_000_000_000
+
+EVENTS = (
+    "session_start",
+    "stage_change",
+    "sound_cue",
+    "trigger_in",
+    "trigger_out",
+    "skip",
+    "session_end",
+    "reset",
+)
+
+
+class TimerEngine:
+    """
+    GUI-free timer.
+
+    Runs the stage list made by FileLoader.load_file_for_timer on an injectable
+    clock and decides stage changes, skips, sound cues and BLE trigger points.
+    Nothing here touches Tk, audio or BLE: subscribers are notified through
+    events (see EVENTS). With a FakeClock, simulate() runs a whole session
+    in milliseconds.
+    """
+
+    def __init__(
+        self,
+        stage_list,
+        clock=None,
+        intermission_desc="Intermission",
+        enable_trigger=False,
+        trigger_offset_sec=5,
+        trigger_keyword="(recording)",
+        trigger_lead_sec=0.0,
+        sound_offset_sec=3,
+        skip_offset_sec=4,
+        progress_steps=100,
+        min_progress_interval_sec=0.1,
+    ):
+        self.clock = clock if clock is not None else clock_module.MonotonicClock()
+        self.intermission_desc = intermission_desc
+        self.enable_trigger = enable_trigger
+        self.trigger_offset_sec = trigger_offset_sec
+        self.trigger_keyword = trigger_keyword
+        # trigger_in is emitted this much before the recording should start,
+        # so that the cameras can be commanded ahead of their latency
+        self.trigger_lead_ns = int(trigger_lead_sec * SEC)
+        self.sound_offset_sec = sound_offset_sec
+        self.skip_offset_sec = skip_offset_sec
+        self.progress_steps = progress_steps
+        self.min_progress_interval_ns = int(min_progress_interval_sec * SEC)
+
+        self._listeners = {event: [] for event in EVENTS}
+        self.triggered_in = False
+        self.set_stage_list(stage_list)
+
+    def subscribe(self, event, callback):
+        if event not in self._listeners:
+            raise ValueError(f"Unknown timer event: {event}")
+        self._listeners[event].append(callback)
+
+    def _emit(self, event, **payload):
+        for callback in self._listeners[event]:
+            callback(**payload)
+
+    def set_stage_list(self, stage_list):
+        self.stage_list = stage_list
+        self.is_running = False
+        self._init_state()
+
+    def _init_state(self):
+        self.now_stage = 0
+        self.reset_ns = self.clock.now_ns()
+        self.total_skip_ns = 0
+        self.cnt_up_ns = 0
+        self.remaining_ns = 0
+        self.is_skip = False
+        self.ring_done = False
+
+    def _start_ns(self, index):
+        return self.stage_list.start[index] * SEC
+
+    def _end_ns(self, index):
+        return self.stage_list.end[index] * SEC
+
+    @property
+    def disp_time_ns(self):
+        """Elapsed time without skipped time (used for display and log)"""
+        return self.cnt_up_ns - self.total_skip_ns
+
+    @property
+    def current_stage(self):
+        if self.now_stage >= len(self.stage_list):
+            return None
+        return self.stage_list[self.now_stage]
+
+    @property
+    def next_stage(self):
+        if self.now_stage + 1 >= len(self.stage_list):
+            return None
+        return self.stage_list[self.now_stage + 1]
+
+    def get_progress(self):
+        """Progress of the current stage in percent"""
+        if self.now_stage >= len(self.stage_list):
+            return 0
+        duration_ns = self.stage_list.duration[self.now_stage] * SEC
+        if duration_ns <= 0:
+            return 100
+        progress = self.cnt_up_ns - self._end_ns(self.now_stage)
+        return 100 + progress / duration_ns * 100
+
+    # controls
+    def start(self):
+        if len(self.stage_list) == 0:
+            return
+        self._init_state()
+        self.is_running = True
+        self._emit("session_start", stage=self.stage_list[0])
+
+    def reset(self):
+        self.is_running = False
+        self._init_state()
+        self._emit("reset")
+        self._trigger_out("")
+
+    def skip(self):
+        if self.is_running:
+            self.is_skip = True
+
+    def tick(self):
+        """Bring the timer up to the current time of the clock"""
+        if self.is_running is False:
+            return
+        # cnt_up: internal time counter
+        self.cnt_up_ns = self.clock.now_ns() - self.reset_ns
+
+        # stage change if end time is reached
+        n = len(self.stage_list)
+        while self.now_stage < n and self.cnt_up_ns > self._end_ns(self.now_stage):
+            self.now_stage += 1
+            if self.now_stage < n:
+                stage = self.stage_list[self.now_stage]
+                if self.cnt_up_ns < self._start_ns(self.now_stage):
+                    log_title = self.intermission_desc
+                else:
+                    log_title = stage["title"]
+                self._emit(
+                    "stage_change",
+                    index=self.now_stage,
+                    stage=stage,
+                    log_title=log_title,
+                    cnt_up_ns=self.cnt_up_ns,
+                )
+
+        # If the last stage is reached, stop the timer
+        if self.now_stage >= n:
+            self.is_running = False
+            self.remaining_ns = 0
+            self._emit("session_end", cnt_up_ns=self.cnt_up_ns)
+            self._trigger_out("End")
+            return
+
+        end_ns = self._end_ns(self.now_stage)
+        if end_ns < self.cnt_up_ns:
+            self.remaining_ns = 0
+        else:
+            self.remaining_ns = end_ns - self.cnt_up_ns + SEC
+
+        self._sound()
+        if self.enable_trigger:
+            self._trigger()
+        self._skip()
+
+    def _sound(self):
+        remaining_sec = self.remaining_ns // SEC
+        if remaining_sec == self.sound_offset_sec and not self.ring_done:
+            self.ring_done = True
+            # the instant the remaining time reached sound_offset_sec
+            end_ns = self._end_ns(self.now_stage)
+            at_ns = self.reset_ns + end_ns + SEC - (self.sound_offset_sec + 1) * SEC
+            self._emit("sound_cue", stage=self.stage_list[self.now_stage], at_ns=at_ns)
+        if remaining_sec < self.sound_offset_sec:
+            self.ring_done = False
+
+    def _trigger(self):
+        next_stage = self.now_stage + 1
+        if next_stage == len(self.stage_list):
+            next_stage_instruction = "End"
+        else:
+            next_stage_instruction = self.stage_list.instruction[next_stage]
+        current_stage_instruction = self.stage_list.instruction[self.now_stage]
+        offset_ns = self.trigger_offset_sec * SEC
+        # Trigger in before X seconds of next stage
+        if self.remaining_ns < offset_ns + self.trigger_lead_ns:
+            # the recording should start when remaining time reaches X seconds
+            end_ns = self._end_ns(self.now_stage)
+            target_ns = self.reset_ns + end_ns + SEC - offset_ns
+            self._trigger_in(next_stage_instruction, target_ns)
+        else:
+            # for 1st stage
+            self._trigger_in(current_stage_instruction, self.clock.now_ns())
+            # Trigger out when leaving current stage
+            self._trigger_out(current_stage_instruction)
+
+    def _trigger_in(self, instruction, target_ns):
+        if self.trigger_keyword in instruction and self.triggered_in is False:
+            self.triggered_in = True
+            target_ns = max(target_ns, self.clock.now_ns())
+            self._emit("trigger_in", instruction=instruction, target_ns=target_ns)
+
+    def _trigger_out(self, instruction):
+        if self.trigger_keyword not in instruction and self.triggered_in is True:
+            self.triggered_in = False
+            self._emit("trigger_out", instruction=instruction)
+
+    def _skip(self):
+        if self.is_skip:
+            # prevent over skip
+            offset_ns = self.skip_offset_sec * SEC
+            if self.remaining_ns > offset_ns:
+                skip_ns = self.remaining_ns - offset_ns
+                self.reset_ns -= skip_ns
+                self.total_skip_ns += skip_ns
+                self._emit("skip", skip_ns=skip_ns)
+            self.is_skip = False
+
+    # scheduling
+    def next_deadline_ns(self, include_display=True):
+        """
+        Clock time of the next tick that changes anything, or None if stopped.
+        The stage end, the sound cue and the trigger point are reached when the
+        counter passes them. With include_display, the next second of the
+        count-up/remaining time and the next progress bar step are included.
+        """
+        if self.is_running is False:
+            return None
+        now_ns = self.clock.now_ns()
+        if self.is_skip:
+            return now_ns
+        cnt_up = now_ns - self.reset_ns
+        if self.now_stage >= len(self.stage_list):
+            return now_ns
+
+        start_ns = self._start_ns(self.now_stage)
+        end_ns = self._end_ns(self.now_stage)
+        points = [
+            end_ns,
+            end_ns - self.sound_offset_sec * SEC,
+            end_ns - (self.sound_offset_sec - 1) * SEC,
+        ]
+        if self.enable_trigger:
+            points.append(
+                end_ns - (self.trigger_offset_sec - 1) * SEC - self.trigger_lead_ns
+            )
+        points = [p + 1 for p in points if p >= cnt_up]
+
+        if include_display:
+            disp_time = cnt_up - self.total_skip_ns
+            points.append(cnt_up + SEC - cnt_up % SEC)
+            points.append(cnt_up + SEC - disp_time % SEC)
+            duration_ns = end_ns - start_ns
+            step = max(
+                duration_ns // self.progress_steps, self.min_progress_interval_ns
+            )
+            points.append(cnt_up + step - (cnt_up - start_ns) % step)
+
+        if not points:
+            return now_ns
+        return self.reset_ns + min(points)
+
+    def simulate(self, max_ticks=10_000_000):
+        """
+        Run the whole session on a simulated clock (FakeClock), jumping from
+        deadline to deadline. Returns the number of ticks.
+        """
+        if self.is_running is False:
+            self.start()
+        ticks = 0
+        while self.is_running and ticks < max_ticks:
+            self.tick()
+            ticks += 1
+            deadline = self.next_deadline_ns(include_display=False)
+            if deadline is None:
+                break
+            self.clock.set_ns(deadline)
+        return ticks
@@ -0,0 +1,134 @@
+import os
+import subprocess
+import threading
+from dataclasses import dataclass
+from multiprocessing.connection import AuthenticationError, Client, Listener
+from typing import Optional
+
+from . import timetable
+
+# the authkey is passed in the environment, not on the (world-readable) command line
+AUTHKEY_ENV = "TIMELINE_KUN_HANDOFF_KEY"
+
+
+@dataclass
+class TimerRequest:
+    """What the Previewer sends to a standby timer"""
+
+    file_path: str
+    fg_color: str
+    start_index: int
+    hmmss: str
+    time_table: timetable.Timetable
+    encoding: Optional[str] = None
+
+
+class TimerHandoff:
+    """
+    Previewer side of the timer handoff.
+
+    A timer process is started in standby mode (command + ["--standby",
+    "host:port"]); it imports and loads everything it can, connects back over
+    a local multiprocessing connection and waits. send() hands it the parsed
+    timeline, so the timer opens without a cold start or a re-parse. Then the
+    next standby timer is started.
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self._authkey = None
+        self._listener = None
+        self._conn = None
+        self._process = None
+        self._lock = threading.Lock()
+
+    def start_standby(self):
+        """Start a standby timer, unless one is already starting or waiting"""
+        if self._process is not None and self._process.poll() is None:
+            return
+        if self._listener is None:
+            self._authkey = os.urandom(32)
+            self._listener = Listener(("127.0.0.1", 0), authkey=self._authkey)
+            threading.Thread(target=self._accept_loop, daemon=True).start()
+        host, port = self._listener.address
+        env = dict(os.environ)
+        env[AUTHKEY_ENV] = self._authkey.hex()
+        try:
+            self._process = subprocess.Popen(
+                self.command + ["--standby", f"{host}:{port}"], env=env
+            )
+        except OSError as e:
+            print(f"Failed to start the standby timer: {e}")
+            self._process = None
+
+    def _accept_loop(self):
+        listener = self._listener
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, ConnectionError) as e:
+                print(f"Timer handoff: rejected a connection ({e})")
+                continue
+            except OSError:
+                # listener closed
+                return
+            with self._lock:
+                if self._conn is not None:
+                    self._conn.close()
+                self._conn = conn
+
+    def ready(self):
+        with self._lock:
+            return self._conn is not None
+
+    def send(self, request):
+        """
+        Hand request (TimerRequest) to the standby timer.
+        Returns False if no standby timer is ready (start one the usual way).
+        """
+        with self._lock:
+            conn, self._conn = self._conn, None
+        if conn is None:
+            return False
+        try:
+            conn.send(request)
+            sent = True
+        except (OSError, EOFError) as e:
+            print(f"Timer handoff failed: {e}")
+            sent = False
+        finally:
+            conn.close()
+        # that timer is taken (or broken); get the next one ready
+        self._process = None
+        self.start_standby()
+        return sent
+
+    def close(self):
+        """The standby timer exits when its connection is closed"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+
+def parse_address(address):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+def wait_for_request(address, authkey=None):
+    """
+    Timer side: connect to the Previewer and wait for a TimerRequest.
+    Returns None if the Previewer is gone.
+    """
+    if authkey is None:
+        authkey = bytes.fromhex(os.environ.get(AUTHKEY_ENV, ""))
+    try:
+        with Client(parse_address(address), authkey=authkey) as conn:
+            return conn.recv()
+    except (OSError, EOFError, AuthenticationError) as e:
+        print(f"No timer request: {e}")
+        return None
@@ -0,0 +1,94 @@
+import tkinter as tk
+from tkinter import ttk
+
+from . import app_timer
+from . import clock as clock_module
+from . import scheduler
+
+
+class TimerHost:
+    """
+    Runs several timers (e.g. orange/cyan/lightgreen) in one process.
+
+    The timers are Toplevel windows of one Tk root and share one scheduler
+    (a single after() for the earliest deadline), one BLE event loop thread
+    (each timer keeps its own device group) and one audio output stream.
+    The host quits when the last timer window is closed.
+    """
+
+    def __init__(self, root, toml, clock=None):
+        self.root = root
+        self.toml = toml
+        self.clock = clock if clock is not None else clock_module.MonotonicClock()
+        self.scheduler = scheduler.SharedScheduler(root, clock=self.clock)
+        self.apps = []
+        self._engine = None
+
+        ttk.Style(root).theme_use("default")
+        # one BLE event loop, started only if some timer has devices
+        self.ble_loop = None
+        if any(conf.get("ble_names") for conf in toml.get("ble", {}).values()):
+            from . import ble_control
+
+            self.ble_loop = ble_control.BleLoop()
+
+    def audio_player(self):
+        """AudioPlayer on the shared cue engine (opened on first use)"""
+        from . import sound
+
+        if self._engine is None:
+            self._engine = sound.CueEngine(clock=self.clock)
+        return sound.AudioPlayer(engine=self._engine)
+
+    def open_timer(
+        self, file_path, fg_color, start_index=0, hmmss="hmmss", time_table=None
+    ):
+        offset = 40 * len(self.apps)
+        window = tk.Toplevel(self.root)
+        style_prefix = f"{fg_color}."
+        app_timer.configure_window(
+            window, fg_color, style_prefix, geometry=f"900x420+{offset}+{offset}"
+        )
+        toml_dict = app_timer.timer_config(self.toml, fg_color)
+        print(f"TOML config ({fg_color}): {toml_dict}")
+        app = app_timer.App(
+            window,
+            file_path,
+            start_index,
+            hmmss == "hmmss",
+            sound_file_name=app_timer.COLOR_AND_SOUND[fg_color],
+            toml_dict=toml_dict,
+            time_table=time_table,
+            host=self,
+            style_prefix=style_prefix,
+        )
+        window.title(f"Timer ({fg_color})")
+        self.apps.append(app)
+        return app
+
+    def timer_closed(self, app):
+        if app in self.apps:
+            self.apps.remove(app)
+        if len(self.apps) == 0:
+            self.close()
+            self.root.quit()
+
+    def close(self):
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+        if self.ble_loop is not None:
+            self.ble_loop.stop()
+
+
+def main(timers, start_index=0, hmmss="hmmss", toml=None):
+    """timers: [(fg_color, file_path), ...]"""
+    root = tk.Tk()
+    root.withdraw()
+    if toml is None:
+        toml = app_timer.load_config()
+    host = TimerHost(root, toml)
+    for fg_color, file_path in timers:
+        host.open_timer(file_path, fg_color, start_index, hmmss)
+    root.mainloop()
+    root.destroy()
@@ -1,18 +1,25 @@
 import os
 from datetime import datetime
 
-from . import events_json, time_format
+from . import clock as clock_module
+from . import events_json, log_writer, time_format
 
 
 class TimerLog:
-    def __init__(self, csv_file_path):
+    def __init__(self, csv_file_path, flush_interval_sec=1.0, max_buffer_lines=100):
         tar_dir = os.path.dirname(csv_file_path)
         tar_name = os.path.basename(csv_file_path).split(".")[0]
         today = datetime.now().strftime("%Y-%m-%d")
         self.file_path = os.path.join(tar_dir, f"log_{today}_{tar_name}.csv")
+        header = None
         if os.path.exists(self.file_path) is False:
-            with open(self.file_path, "w") as f:
-                f.write("datetime,displaytime,message\n")
+            header = "datetime,displaytime,message\n"
+        self.writer = log_writer.BufferedLogWriter(
+            self.file_path,
+            header=header,
+            flush_interval_sec=flush_interval_sec,
+            max_buffer_lines=max_buffer_lines,
+        )
 
     def add_log(self, display_time, message):
         dt_str = time_format.timedelta_to_str(display_time)
@@ -36,26 +43,35 @@ class TimerLog:
         print("close")
         dt_str = time_format.timedelta_to_str(display_time)
         self._write_log(dt_str, "close")
+        self.writer.close()
 
     def end_log(self, display_time):
         print("end")
         dt_str = time_format.timedelta_to_str(display_time)
         self._write_log(dt_str, "end")
+        self.writer.flush(sync=True)
 
     def _write_log(self, display_time, message):
         now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        with open(self.file_path, "a") as f:
-            f.write(f"{now_str},{display_time},{message}\n")
+        self.writer.write(f"{now_str},{display_time},{message}\n")
 
 
 class BIDSLog:
     CONTROL_LOGS = [
+        "video_record_start_scheduled",
         "video_record_start",
         "task_skip",
         "session_end",
     ]
 
-    def __init__(self, csv_file_path):
+    def __init__(
+        self, csv_file_path, clock=None, flush_interval_sec=1.0, max_buffer_lines=100
+    ):
+        # onsets and durations are measured with the (monotonic) clock
+        self.clock = clock if clock is not None else clock_module.MonotonicClock()
+        # events are buffered and written by a background thread
+        self.flush_interval_sec = flush_interval_sec
+        self.max_buffer_lines = max_buffer_lines
         # BIDS events.tsv format
         tar_dir = os.path.dirname(csv_file_path)
         tar_name = os.path.basename(csv_file_path).split(".")[0]
@@ -67,58 +83,91 @@ class BIDSLog:
 
         # scans.tsv file
         self.scans_path = os.path.join(self.output_dir, f"{tar_name}_scans.tsv")
+        header = None
         if os.path.exists(self.scans_path) is False:
-            with open(self.scans_path, "w") as f:
-                f.write("filename\tacq_time\n")
+            header = "filename\tacq_time\n"
+        self.scans_writer = self._open_writer(self.scans_path, header=header)
+        self.events_writer = None
 
         self.task_name = None
-        self.task_start_dt = None
+        self.task_start_ns = None
+
+    def _open_writer(self, path, mode="a", header=None):
+        return log_writer.BufferedLogWriter(
+            path,
+            mode=mode,
+            header=header,
+            flush_interval_sec=self.flush_interval_sec,
+            max_buffer_lines=self.max_buffer_lines,
+        )
 
     def _write_log(self, onset, duration, trial_type):
-        with open(self.file_path, "a") as f:
-            f.write(f"{onset:<.1f}\t{duration:<.1f}\t{trial_type}\n")
+        self.events_writer.write(f"{onset:<.1f}\t{duration:<.1f}\t{trial_type}\n")
 
     def make_events_json(self):
         json_path = self.events_path + "events.json"
         events_json.make_events_json(json_path)
 
     def _write_scans_log(self, filename, acq_time):
-        with open(self.scans_path, "a") as f:
-            f.write(f"{filename}\t{acq_time}\n")
+        self.scans_writer.write(f"{filename}\t{acq_time}\n")
+
+    def flush(self, sync=False, wait=False):
+        """Write buffered events now; with sync, also fsync (stage boundaries)"""
+        if self.events_writer is not None:
+            self.events_writer.flush(sync=sync, wait=wait)
+        self.scans_writer.flush(sync=sync, wait=wait)
+
+    def close(self):
+        if self.events_writer is not None:
+            self.events_writer.close()
+        self.scans_writer.close()
+
+    def _elapsed_sec(self, since_ns):
+        return (self.clock.now_ns() - since_ns) / 1e9
+
+    def _acq_time(self):
+        return self.clock.wall_now().strftime("%Y-%m-%dT%H:%M:%S")
 
-    def mark_start_time(self, start_time):
-        self.session_start_time = start_time
+    def mark_start_time(self):
+        self.session_start_ns = self.clock.now_ns()
 
         # events.tsv file
         for i in range(100):
             if os.path.exists(self.events_path + f"{i:0>2}_events.tsv") is False:
                 self.file_path = self.events_path + f"{i:0>2}_events.tsv"
                 break
-        with open(self.file_path, "w") as f:
-            f.write("onset\tduration\ttrial_type\n")
+        if self.events_writer is not None:
+            self.events_writer.close()
+        self.events_writer = self._open_writer(
+            self.file_path, mode="w", header="onset\tduration\ttrial_type\n"
+        )
 
-        with open(self.scans_path, "a") as f:
-            f.write(
-                f"{os.path.basename(self.file_path)}\t{datetime.now().strftime('%Y-%m-%dT%H:%M:%S')}\n"
-            )
+        self._write_scans_log(os.path.basename(self.file_path), self._acq_time())
+        self.scans_writer.flush()
 
-    def add_control_log(self, trial_type):
+    def add_control_log(self, trial_type, at_ns=None):
+        """at_ns: clock time of the event if it is not now (e.g. predicted start)"""
         if trial_type not in self.CONTROL_LOGS:
             raise ValueError(f"Invalid control log type: {trial_type}")
-        onset = (datetime.now() - self.session_start_time).total_seconds()
+        if at_ns is None:
+            onset = self._elapsed_sec(self.session_start_ns)
+        else:
+            onset = (at_ns - self.session_start_ns) / 1e9
         duration = 0.0
         self._write_log(onset, duration, trial_type)
         # for MP4 file in Cameras
         if trial_type == "video_record_start":
-            self._write_scans_log(
-                "Unknown", datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-            )
+            self._write_scans_log("Unknown", self._acq_time())
+        if trial_type == "session_end":
+            self.flush(sync=True)
 
     def set_task_log(self, task_name: str):
-        self.task_start_time = datetime.now()
+        self.task_start_ns = self.clock.now_ns()
         self.task_name = task_name
 
     def add_task_log(self):
-        onset = (self.task_start_time - self.session_start_time).total_seconds()
-        duration = (datetime.now() - self.task_start_time).total_seconds()
+        onset = (self.task_start_ns - self.session_start_ns) / 1e9
+        duration = self._elapsed_sec(self.task_start_ns)
         self._write_log(onset, duration, self.task_name)
+        # stage boundary
+        self.events_writer.flush(sync=True)
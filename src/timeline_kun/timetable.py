@@ -0,0 +1,312 @@
+import datetime
+from array import array
+
+
+class StringTable:
+    """
+    String column that stores each distinct value only once.
+    Rows hold an index (code) into the table of values.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.codes = array("I")
+        self._index = {}
+
+    def _code(self, value):
+        code = self._index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._index[value] = code
+        return code
+
+    def append(self, value):
+        self.codes.append(self._code(value))
+
+    def insert(self, index, value):
+        self.codes.insert(index, self._code(value))
+
+    def pop(self, index):
+        return self.values[self.codes.pop(index)]
+
+    def unique(self):
+        """Values referenced by at least one row"""
+        return [self.values[code] for code in sorted(set(self.codes))]
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def __setitem__(self, index, value):
+        self.codes[index] = self._code(value)
+
+    def __len__(self):
+        return len(self.codes)
+
+
+class Timetable:
+    """
+    Columnar timetable.
+    start/end/duration are stored as integer seconds, title/member/fixed and the
+    raw time strings of the CSV are interned, has_error is a bitmap.
+    Rows are accessed through lightweight Row views.
+    """
+
+    def __init__(self):
+        self.start = array("i")
+        self.end = array("i")
+        self.duration = array("i")
+        self.title = StringTable()
+        self.member = StringTable()
+        self.fixed = StringTable()
+        self.start_sec = StringTable()
+        self.end_sec = StringTable()
+        self.duration_sec = StringTable()
+        self.instruction = []
+        self._error_bits = bytearray()
+
+    def append(
+        self,
+        title,
+        start,
+        end,
+        member="",
+        instruction="",
+        fixed="",
+        start_sec="",
+        end_sec="",
+        duration_sec="",
+        has_error=False,
+    ):
+        self.insert(
+            len(self),
+            title,
+            start,
+            end,
+            member,
+            instruction,
+            fixed,
+            start_sec,
+            end_sec,
+            duration_sec,
+            has_error,
+        )
+
+    def insert(
+        self,
+        index,
+        title,
+        start,
+        end,
+        member="",
+        instruction="",
+        fixed="",
+        start_sec="",
+        end_sec="",
+        duration_sec="",
+        has_error=False,
+    ):
+        n = len(self)
+        if index < 0:
+            index = max(n + index, 0)
+        index = min(index, n)
+
+        self.start.insert(index, start)
+        self.end.insert(index, end)
+        self.duration.insert(index, end - start)
+        self.title.insert(index, title)
+        self.member.insert(index, member)
+        self.fixed.insert(index, fixed)
+        self.start_sec.insert(index, start_sec)
+        self.end_sec.insert(index, end_sec)
+        self.duration_sec.insert(index, duration_sec)
+        self.instruction.insert(index, instruction)
+
+        if n % 8 == 0:
+            self._error_bits.append(0)
+        # shift the error bits after index by one
+        for i in range(n, index, -1):
+            self.set_error(i, self.has_error(i - 1))
+        self.set_error(index, has_error)
+
+    def remove(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if index < 0 or index >= n:
+            raise IndexError("Timetable index out of range")
+
+        for column in (
+            self.start,
+            self.end,
+            self.duration,
+            self.title,
+            self.member,
+            self.fixed,
+            self.start_sec,
+            self.end_sec,
+            self.duration_sec,
+            self.instruction,
+        ):
+            column.pop(index)
+
+        # shift the error bits after index back by one
+        for i in range(index, n - 1):
+            self.set_error(i, self.has_error(i + 1))
+        self.set_error(n - 1, False)
+        if (n - 1) % 8 == 0:
+            self._error_bits.pop()
+
+    def set_times(self, index, start, end):
+        self.start[index] = start
+        self.end[index] = end
+        self.duration[index] = end - start
+
+    def set_fields(self, index, **fields):
+        """Replace the string columns of one row (title, member, start_sec, ...)"""
+        for name, value in fields.items():
+            if name == "instruction":
+                self.instruction[index] = value
+            elif name in _STRING_COLUMNS:
+                getattr(self, name)[index] = value
+            else:
+                raise KeyError(name)
+
+    def copy(self):
+        table = Timetable()
+        table.start = array("i", self.start)
+        table.end = array("i", self.end)
+        table.duration = array("i", self.duration)
+        for name in _STRING_COLUMNS:
+            src = getattr(self, name)
+            dst = getattr(table, name)
+            dst.values = list(src.values)
+            dst.codes = array("I", src.codes)
+            dst._index = dict(src._index)
+        table.instruction = list(self.instruction)
+        table._error_bits = bytearray(self._error_bits)
+        return table
+
+    def to_columns(self):
+        """All columns as plain lists and strings (JSON serializable)"""
+        columns = {
+            "start": self.start.tolist(),
+            "end": self.end.tolist(),
+            "duration": self.duration.tolist(),
+            "instruction": list(self.instruction),
+            "error_bits": self._error_bits.hex(),
+        }
+        for name in _STRING_COLUMNS:
+            src = getattr(self, name)
+            columns[name] = {"values": list(src.values), "codes": src.codes.tolist()}
+        return columns
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Inverse of to_columns(). Raises ValueError/TypeError/KeyError on bad data."""
+        table = cls()
+        table.start = array("i", columns["start"])
+        table.end = array("i", columns["end"])
+        table.duration = array("i", columns["duration"])
+        n = len(table.start)
+        table.instruction = [str(value) for value in columns["instruction"]]
+        table._error_bits = bytearray.fromhex(columns["error_bits"])
+        for name in _STRING_COLUMNS:
+            dst = getattr(table, name)
+            dst.values = [str(value) for value in columns[name]["values"]]
+            dst.codes = array("I", columns[name]["codes"])
+            dst._index = {value: code for code, value in enumerate(dst.values)}
+            if len(dst.codes) != n or any(c >= len(dst.values) for c in dst.codes):
+                raise ValueError(f"Broken column: {name}")
+        if (
+            len(table.end) != n
+            or len(table.duration) != n
+            or len(table.instruction) != n
+            or len(table._error_bits) != (n + 7) // 8
+        ):
+            raise ValueError("Columns of different lengths")
+        return table
+
+    def has_error(self, index):
+        return bool(self._error_bits[index >> 3] & (1 << (index & 7)))
+
+    def set_error(self, index, has_error=True):
+        if has_error:
+            self._error_bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self._error_bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def has_any_error(self):
+        return any(self._error_bits)
+
+    def get_titles(self):
+        return self.title.unique()
+
+    def __len__(self):
+        return len(self.start)
+
+    def __getitem__(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if index < 0 or index >= n:
+            raise IndexError("Timetable index out of range")
+        return Row(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Row(self, i)
+
+
+_STRING_COLUMNS = ("title", "member", "fixed", "start_sec", "end_sec", "duration_sec")
+
+
+def _td(seconds):
+    return datetime.timedelta(seconds=seconds)
+
+
+# Row keys -> getter. "start"/"end" and "start_dt"/"end_dt" are aliases.
+_ROW_GETTERS = {
+    "title": lambda t, i: t.title[i],
+    "member": lambda t, i: t.member[i],
+    "fixed": lambda t, i: t.fixed[i],
+    "instruction": lambda t, i: t.instruction[i],
+    "start": lambda t, i: _td(t.start[i]),
+    "end": lambda t, i: _td(t.end[i]),
+    "start_dt": lambda t, i: _td(t.start[i]),
+    "end_dt": lambda t, i: _td(t.end[i]),
+    "duration": lambda t, i: _td(t.duration[i]),
+    "start_sec": lambda t, i: t.start_sec[i],
+    "end_sec": lambda t, i: t.end_sec[i],
+    "duration_sec": lambda t, i: t.duration_sec[i],
+    "has_error": lambda t, i: t.has_error(i),
+}
+
+
+class Row:
+    """Read-only, dict-like view of one row of a Timetable"""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    @property
+    def index(self):
+        return self._index
+
+    def __getitem__(self, key):
+        return _ROW_GETTERS[key](self._table, self._index)
+
+    def get(self, key, default=None):
+        getter = _ROW_GETTERS.get(key)
+        if getter is None:
+            return default
+        return getter(self._table, self._index)
+
+    def keys(self):
+        return _ROW_GETTERS.keys()
+
+    def as_dict(self):
+        return {key: self[key] for key in _ROW_GETTERS}
@@ -1,5 +1,9 @@
+import atexit
+import csv
+import io
 import os
 import shutil
+import threading
 
 
 def check_file_locked(file_path):
@@ -17,3 +21,93 @@ def move_to_backup_folder(file_path):
     backup_file = os.path.join(backup_dir, os.path.basename(file_path))
     if os.path.exists(file_path):
         shutil.move(file_path, backup_file)
+
+
+def write_csv(file_path, header, rows, encoding="utf-8", backup=True):
+    # encode first: a character the encoding cannot hold (e.g. an emoji in a
+    # Shift_JIS file) must fail before the original file is moved to backup
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for values in rows:
+        writer.writerow([str(v) for v in values])
+    data = buf.getvalue().encode(encoding)
+
+    if backup:
+        move_to_backup_folder(file_path)
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+
+class AsyncCsvWriter:
+    """
+    Writes timeline CSV files on a background thread.
+    submit() only hands over a snapshot of the rows; if several snapshots of
+    the same file are submitted before the thread gets to them, only the
+    latest one is written. flush() waits until everything is on disk.
+    A failed write is kept in last_error (see pop_error()) and the thread
+    goes on with the next file.
+    """
+
+    def __init__(self, backup=True):
+        self.backup = backup
+        self.last_error = None
+        self._cond = threading.Condition()
+        # file_path -> (header, rows, encoding), in submit order
+        self._pending = {}
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="csv", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, file_path, header, rows, encoding="utf-8"):
+        with self._cond:
+            if self._closed:
+                raise ValueError("CSV writer already closed")
+            self._pending.pop(file_path, None)
+            self._pending[file_path] = (header, rows, encoding)
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until all submitted files are written. False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._busy, timeout
+            )
+
+    def pop_error(self):
+        """Error of the last failed write (None if it succeeded), reported once"""
+        with self._cond:
+            error, self.last_error = self.last_error, None
+        return error
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                file_path = next(iter(self._pending))
+                header, rows, encoding = self._pending.pop(file_path)
+                self._busy = True
+            try:
+                write_csv(file_path, header, rows, encoding, self.backup)
+                self.last_error = None
+            except Exception as e:
+                # keep the thread alive, or flush() would never return
+                print(f"Failed to write {file_path}: {e}")
+                self.last_error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
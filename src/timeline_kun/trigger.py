@@ -1,23 +1,48 @@
 import threading
-import time
 
-from . import ble_control
+from . import clock as clock_module
+
+# longer than a whole discovery: scanning (10 s) and then a connect (20 s),
+# see ble_control.BleManager
+CONNECT_TIMEOUT_SEC = 35
+
+
+def _run_now(func):
+    func()
 
 
 class Trigger:
-    def __init__(self, offset_sec: int = 5) -> None:
+    def __init__(
+        self, offset_sec: int = 5, clock=None, dispatch=None, ble_loop=None
+    ) -> None:
+        self.clock = clock if clock is not None else clock_module.MonotonicClock()
+        # BLE results arrive on the BLE thread; dispatch(func) runs func on the
+        # caller's thread (e.g. Tk's after_idle). Default: run in place.
+        self.dispatch = dispatch if dispatch is not None else _run_now
+        self._status_pending = False
         self.triggered_in = False
         self.offset_sec = offset_sec
         self.keyword = "(recording)"
-        self.ble_thread = ble_control.BleThread()
+        # the BLE thread (and asyncio/bleak) is only loaded when BLE is used
+        self._ble_thread = None
+        # shared BLE event loop of the multi-timer host (None: own thread)
+        self.ble_loop = ble_loop
         self.target_device_names = []
         self.connection_status = "Idle"
         self.delay_sec = 1
 
+    @property
+    def ble_thread(self):
+        if self._ble_thread is None:
+            from . import ble_control
+
+            self._ble_thread = ble_control.BleThread(ble_loop=self.ble_loop)
+        return self._ble_thread
+
     def ble_connect(self) -> None:
         self.ble_thread.start()
         command, ok_count, msg = self.ble_thread.execute_command(
-            "connect", None, timeout=30
+            "connect", None, timeout=CONNECT_TIMEOUT_SEC
         )
         if ok_count == len(self.target_device_names):
             self.connection_status = "Connected"
@@ -37,18 +62,50 @@ class Trigger:
     def set_delay_sec(self, delay_sec):
         self.delay_sec = delay_sec
 
-    def trigger_in(self, title):
+    def set_dispatcher(self, dispatch):
+        self.dispatch = dispatch
+
+    def _submit(self, command, on_result, data=None):
+        """Send command without blocking; on_result(result) runs via dispatch"""
+        return self.ble_thread.submit(
+            command, data, lambda result: self.dispatch(lambda: on_result(result))
+        )
+
+    def trigger_in(self, title, on_started=None, target_ns=None):
+        """
+        Start recording if title has the keyword. Returns True if the command
+        was sent. With target_ns (clock time), the cameras are scheduled to
+        start at that instant, compensating their BLE latency.
+        on_started(start_ns) is called (via dispatch) once it succeeded, with
+        the estimated start time of the cameras.
+        """
         if self.keyword in title and self.triggered_in is False:
             self.triggered_in = True
-            command, success, msg = self.ble_thread.execute_command(
-                "record_start", None, timeout=3
-            )
-            if success:
-                self.connection_status = "Recording"
-                return True
-            self.connection_status = "Failed to start"
+            now_ns = self.clock.now_ns()
+            if target_ns is None:
+                target_ns = now_ns
+            delay_sec = max(0.0, (target_ns - now_ns) / 1e9)
+
+            def on_result(result):
+                command, success, msg = result
+                if success:
+                    self.connection_status = "Recording"
+                    if on_started is not None:
+                        on_started(self._estimated_start_ns(target_ns))
+                else:
+                    self.connection_status = "Failed to start"
+
+            self._submit("record_start", on_result, {"delay_sec": delay_sec})
+            return True
         return False
 
+    def _estimated_start_ns(self, target_ns):
+        # mean start of the cameras relative to the target
+        report = self.ble_thread.get_report("record_start")
+        if report is None:
+            return target_ns
+        return target_ns + int(report.mean_sec * 1e9)
+
     def trigger_out(self, title):
         if self.keyword not in title and self.triggered_in is True:
             print("trigger out")
@@ -58,10 +115,11 @@ class Trigger:
         return False
 
     def _delayed_stop(self):
-        time.sleep(self.delay_sec)
-        command, success, msg = self.ble_thread.execute_command(
-            "record_stop", None, timeout=5
-        )
+        self.clock.sleep(self.delay_sec)
+        self._submit("record_stop", self._on_stop_result)
+
+    def _on_stop_result(self, result):
+        command, success, msg = result
         if success:
             self.connection_status = "Connected"
         else:
@@ -77,7 +135,18 @@ class Trigger:
         return self.connection_status
 
     def update_status(self):
-        cmd, alive_cnt, msg = self.ble_thread.execute_command("status", None, timeout=3)
+        """
+        Request the keep-alive status and return the last known one at once.
+        At most one status request is in flight.
+        """
+        if not self._status_pending:
+            self._status_pending = True
+            self._submit("status", self._on_status_result)
+        return self.connection_status
+
+    def _on_status_result(self, result):
+        self._status_pending = False
+        cmd, alive_cnt, msg = result
         if cmd != "status":
             return self.connection_status
         try:
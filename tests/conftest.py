@@ -0,0 +1,23 @@
+import pytest
+
+from timeline_kun import parse_cache
+
+
+@pytest.fixture(autouse=True)
+def user_cache_dir(tmp_path_factory, monkeypatch):
+    """
+    Point the per-user cache directory (parse cache, BLE addresses) at a fresh
+    temporary directory, so tests neither write to nor read from the real one.
+    Environment variables cover the subprocesses started by some tests.
+    """
+    base = tmp_path_factory.mktemp("user_cache")
+    base.chmod(0o700)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(base))
+    monkeypatch.setenv("LOCALAPPDATA", str(base))
+    monkeypatch.setenv("HOME", str(base))
+    cache_dir = parse_cache.user_cache_dir()
+    monkeypatch.setattr(parse_cache, "DEFAULT_CACHE_DIR", cache_dir)
+    monkeypatch.setattr(
+        parse_cache, "_default_cache", parse_cache.ParseCache(cache_dir=cache_dir)
+    )
+    return cache_dir
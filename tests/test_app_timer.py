@@ -79,3 +79,54 @@ def test_valid_minimal_args_do_not_launch_gui(monkeypatch):
     assert hasattr(ns, "file_path")
     assert ns.file_path == "dummy.csv"
     assert created["tk"] is False
+
+
+def test_several_timers_can_be_given():
+    ns = parse_args(["--timer", "orange", "a.csv", "--timer", "cyan", "b.csv"])
+    assert ns.timer == [["orange", "a.csv"], ["cyan", "b.csv"]]
+    assert ns.file_path is None
+
+
+def test_update_clock_is_rescheduled_after_an_error():
+    from types import SimpleNamespace
+
+    from timeline_kun import app_timer
+
+    scheduled = []
+
+    def failing_update():
+        raise OSError("log write failed")
+
+    app = SimpleNamespace(
+        RETRY_SEC=app_timer.App.RETRY_SEC,
+        _update_clock=failing_update,
+        _next_deadline_ns=lambda: 1_000,
+        scheduler=SimpleNamespace(
+            schedule_in=lambda sec: scheduled.append(("in", sec)),
+            schedule_at=lambda ns: scheduled.append(("at", ns)),
+        ),
+    )
+    with pytest.raises(OSError):
+        app_timer.App.update_clock(app)
+    assert scheduled == [("in", app_timer.App.RETRY_SEC)]
+
+    app._update_clock = lambda: None
+    app_timer.App.update_clock(app)
+    assert scheduled[-1] == ("at", 1_000)
+
+
+def test_timer_runs_without_audio_if_it_cannot_be_opened(capsys):
+    from types import SimpleNamespace
+
+    from timeline_kun import app_timer
+
+    def audio_player():
+        raise OSError("Error opening output stream")
+
+    app = SimpleNamespace(_ap=None, host=SimpleNamespace(audio_player=audio_player))
+    app_timer.App._open_audio(app)
+    assert isinstance(app._ap, app_timer.NullAudioPlayer)
+    app._ap.play_sound("countdown3_orange.wav", play_time=0)
+    # reported once: the null player is kept
+    app_timer.App._open_audio(app)
+    assert capsys.readouterr().out.count("Audio is not available") == 1
@@ -0,0 +1,225 @@
+"""
+Throughput and memory benchmarks of the parser, loader, time parsing and SVG
+export on generated timelines (see timeline_generator.py).
+
+Results are compared with benchmark_baselines.json. Throughput is divided by
+the time of a fixed pure-Python workload, so that baselines recorded on one
+machine hold on another; memory is the tracemalloc peak per row.
+
+Environment variables:
+    TIMELINE_KUN_BENCH_MAX_ROWS   largest size to run (default 10000, up to 1000000)
+    TIMELINE_KUN_BENCH_UPDATE     1: record the results as the new baselines
+    TIMELINE_KUN_BENCH_SPEED_TOL  allowed throughput loss (default 0.5)
+    TIMELINE_KUN_BENCH_MEMORY_TOL allowed memory growth (default 0.3)
+"""
+
+import datetime
+import functools
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+import timeline_generator
+
+from timeline_kun import csv_to_timetable, file_loader, svg_writer, time_format
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "benchmark_baselines.json")
+MAX_ROWS = int(os.environ.get("TIMELINE_KUN_BENCH_MAX_ROWS", 10_000))
+UPDATE = os.environ.get("TIMELINE_KUN_BENCH_UPDATE", "") == "1"
+SPEED_TOL = float(os.environ.get("TIMELINE_KUN_BENCH_SPEED_TOL", 0.5))
+MEMORY_TOL = float(os.environ.get("TIMELINE_KUN_BENCH_MEMORY_TOL", 0.3))
+
+SIZES = [10**k for k in range(2, 7)]
+ENCODINGS = ["utf-8", "shift_jis", "euc_jp"]
+
+
+def _sizes():
+    return [
+        pytest.param(
+            n,
+            marks=pytest.mark.skipif(
+                n > MAX_ROWS, reason="set TIMELINE_KUN_BENCH_MAX_ROWS to run"
+            ),
+        )
+        for n in SIZES
+    ]
+
+
+def _load_baselines():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+BASELINES = _load_baselines()
+
+
+def _timed(func):
+    t0 = time.perf_counter()
+    func()
+    return time.perf_counter() - t0
+
+
+def calibration_sec():
+    """
+    Best time of a fixed pure-Python workload (string/int work, like parsing).
+    Measured next to every benchmark, so that load on the machine cancels out.
+    """
+
+    def work():
+        total = 0
+        for i in range(200_000):
+            total += int(str(i)) % 7
+        return total
+
+    return min(_timed(work) for _ in range(3))
+
+
+@functools.lru_cache(maxsize=None)
+def csv_str(n_rows):
+    return timeline_generator.generate_csv_str(n_rows, seed=n_rows)
+
+
+def measure(func, n_rows):
+    """Throughput (rows per calibration unit) and tracemalloc peak per row"""
+    # small sizes run in milliseconds: take the best of more runs
+    repeat = 1 if n_rows > 10_000 else max(3, 10_000 // n_rows)
+    unit_sec = calibration_sec()
+    best_sec = min(_timed(func) for _ in range(repeat))
+    unit_sec = min(unit_sec, calibration_sec())
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "rows_per_unit": n_rows / best_sec * unit_sec,
+        "bytes_per_row": peak / n_rows,
+    }
+
+
+def check(name, n_rows, result):
+    key = str(n_rows)
+    print(
+        f"\n{name}[{key}]: {result['rows_per_unit']:.0f} rows/unit, "
+        f"{result['bytes_per_row']:.0f} B/row"
+    )
+    if UPDATE:
+        BASELINES.setdefault(name, {})[key] = {
+            "rows_per_unit": round(result["rows_per_unit"], 1),
+            "bytes_per_row": round(result["bytes_per_row"], 1),
+        }
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(BASELINES, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return
+    base = BASELINES.get(name, {}).get(key)
+    if base is None:
+        pytest.skip(f"no baseline for {name}[{key}]")
+    assert result["rows_per_unit"] >= base["rows_per_unit"] * (1 - SPEED_TOL), (
+        f"{name}[{key}] throughput regressed: "
+        f"{result['rows_per_unit']:.0f} < baseline {base['rows_per_unit']:.0f}"
+    )
+    # (+1 B/row: some benchmarks allocate next to nothing per row)
+    max_bytes = base["bytes_per_row"] * (1 + MEMORY_TOL) + 1
+    assert result["bytes_per_row"] <= max_bytes, (
+        f"{name}[{key}] memory regressed: "
+        f"{result['bytes_per_row']:.0f} > baseline {base['bytes_per_row']:.0f} B/row"
+    )
+
+
+def test_generator_is_seeded_and_valid():
+    assert csv_str(100) == timeline_generator.generate_csv_str(100, seed=100)
+    assert csv_str(100) != timeline_generator.generate_csv_str(100, seed=1)
+    time_table = csv_to_timetable.TimeTable()
+    assert time_table.load_csv_str(csv_str(1000)) == ""
+    rows = time_table.get_timetable()
+    assert len(rows) == 1000
+    assert set(rows.fixed.unique()) == {"start", "duration"}
+    assert any(rows.end_sec[i] != "" for i in range(len(rows)))
+
+
+@pytest.mark.parametrize("n_rows", _sizes())
+def test_parse_csv_str(n_rows):
+    src = csv_str(n_rows)
+
+    def run():
+        time_table = csv_to_timetable.TimeTable()
+        time_table.load_csv_str(src)
+        assert len(time_table.get_timetable()) == n_rows
+
+    check("load_csv_str", n_rows, measure(run, n_rows))
+
+
+@pytest.mark.parametrize("n_rows", _sizes())
+def test_str_to_seconds(n_rows):
+    _, rows = timeline_generator.generate_rows(n_rows, seed=n_rows)
+    # start, duration and end of every row (empty ones included)
+    time_strs = [value for row in rows for value in row[2:5]]
+
+    def run():
+        # a cold memo, as for the first file loaded
+        time_format.str_to_seconds.cache_clear()
+        for value in time_strs:
+            time_format.str_to_seconds(value)
+
+    check("str_to_seconds", n_rows, measure(run, n_rows))
+
+
+@pytest.mark.parametrize("n_rows", _sizes())
+def test_strs_to_seconds(n_rows):
+    _, rows = timeline_generator.generate_rows(n_rows, seed=n_rows)
+    columns = [[row[i] for row in rows] for i in (2, 3, 4)]
+
+    def run():
+        time_format.str_to_seconds.cache_clear()
+        for column in columns:
+            time_format.strs_to_seconds(column)
+
+    check("strs_to_seconds", n_rows, measure(run, n_rows))
+
+
+@pytest.mark.parametrize("n_rows", _sizes())
+def test_countdown_strings(n_rows):
+    # ten 100 ms ticks per second, both formats, as the timer labels do
+    ticks = [datetime.timedelta(milliseconds=100 * i) for i in range(n_rows)]
+
+    def run():
+        for td in ticks:
+            time_format.timedelta_to_str(td, True)
+            time_format.timedelta_to_str(td, False)
+
+    check("timedelta_to_str", n_rows, measure(run, n_rows))
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("n_rows", _sizes())
+def test_load_file_for_timer(tmp_path, n_rows, encoding):
+    csv_path = str(tmp_path / f"timeline_{encoding}.csv")
+    with open(csv_path, "w", encoding=encoding, newline="") as f:
+        f.write(csv_str(n_rows))
+    fallback = "euc_jp" if encoding == "euc_jp" else "utf-8-sig"
+
+    def run():
+        fl = file_loader.FileLoader(fallback_encoding=fallback, use_cache=False)
+        fl.load_file_for_timer(0, csv_path)
+        assert len(fl.get_stage_list()) >= n_rows
+
+    check(f"load_file_for_timer[{encoding}]", n_rows, measure(run, n_rows))
+
+
+@pytest.mark.parametrize("n_rows", _sizes())
+def test_save_as_svg(tmp_path, n_rows):
+    time_table = csv_to_timetable.TimeTable()
+    time_table.load_csv_str(csv_str(n_rows))
+    rows = time_table.get_timetable()
+    svg_path = str(tmp_path / "timeline.svg")
+
+    def run():
+        svg_writer.save_as_svg(rows, svg_path)
+
+    check("save_as_svg", n_rows, measure(run, n_rows))
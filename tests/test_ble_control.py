@@ -0,0 +1,430 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from timeline_kun import ble_control, trigger
+
+
+def _thread_with_handlers(**handlers):
+    """BleThread with extra command handlers (no BLE device needed)"""
+    ble_thread = ble_control.BleThread()
+    ble_thread._handlers.update(handlers)
+    ble_thread.start()
+    return ble_thread
+
+
+def _sleep_handler(name, sec):
+    async def handler(data):
+        await asyncio.sleep(sec)
+        return (name, 1, f"{name} {data}")
+
+    return handler
+
+
+def test_not_running_resolves_immediately():
+    ble_thread = ble_control.BleThread()
+    results = []
+    future = ble_thread.submit("status", callback=results.append)
+    assert future.done()
+    assert results == [("status", 0, "thread not running")]
+
+
+def test_each_request_gets_its_own_result():
+    ble_thread = _thread_with_handlers(
+        slow=_sleep_handler("slow", 0.2), fast=_sleep_handler("fast", 0)
+    )
+    try:
+        slow = ble_thread.submit("slow", "a")
+        fast = ble_thread.submit("fast", "b")
+        assert slow.request_id != fast.request_id
+        assert fast.result(timeout=5) == ("fast", 1, "fast b")
+        assert slow.result(timeout=5) == ("slow", 1, "slow a")
+        assert ble_thread.execute_command("status", timeout=5) == (
+            "status",
+            0,
+            "0/0 idle",
+        )
+    finally:
+        ble_thread.stop()
+
+
+def test_timed_out_result_is_not_delivered_to_the_next_caller():
+    ble_thread = _thread_with_handlers(slow=_sleep_handler("slow", 0.3))
+    try:
+        assert ble_thread.execute_command("slow", timeout=0.05) == (
+            "slow",
+            0,
+            "timeout",
+        )
+        cmd, _, _ = ble_thread.execute_command("status", timeout=5)
+        assert cmd == "status"
+    finally:
+        ble_thread.stop()
+
+
+def test_stop_resolves_pending_requests():
+    ble_thread = _thread_with_handlers(slow=_sleep_handler("slow", 0.1))
+    first = ble_thread.submit("slow")
+    second = ble_thread.submit("slow")
+    ble_thread.stop()
+    # answered or dropped, but nobody waits forever
+    assert first.result(timeout=5)[0] == "slow"
+    assert second.result(timeout=5)[0] == "slow"
+
+
+def test_threads_share_one_event_loop():
+    ble_loop = ble_control.BleLoop()
+    threads = []
+    for name in ("orange", "cyan"):
+        ble_thread = ble_control.BleThread(ble_loop=ble_loop)
+        ble_thread._handlers["who"] = _sleep_handler(name, 0.05)
+        ble_thread.start()
+        threads.append(ble_thread)
+    try:
+        assert threads[0].thread is threads[1].thread is ble_loop.thread
+        orange = threads[0].submit("who", 1)
+        cyan = threads[1].submit("who", 2)
+        assert orange.result(timeout=5) == ("orange", 1, "orange 1")
+        assert cyan.result(timeout=5) == ("cyan", 1, "cyan 2")
+        # each thread has its own device group
+        assert threads[0].manager is not threads[1].manager
+
+        # stopping one timer's thread leaves the loop to the other
+        threads[0].stop()
+        assert threads[0].submit("who").result(timeout=5)[2] == "thread not running"
+        assert threads[1].execute_command("who", 3, timeout=5) == ("cyan", 1, "cyan 3")
+    finally:
+        threads[1].stop()
+        ble_loop.stop()
+    assert not ble_loop.thread.is_alive()
+
+
+def test_trigger_in_does_not_wait_for_the_cameras():
+    started = threading.Event()
+    dispatched = []
+    device = trigger.Trigger(dispatch=dispatched.append)
+    device.ble_thread._handlers["record_start"] = _sleep_handler("record_start", 0.2)
+    device.ble_thread.start()
+    try:
+        assert (
+            device.trigger_in(
+                "TASK (recording)", on_started=lambda start_ns: started.set()
+            )
+            is True
+        )
+        # returns before the command is done
+        assert not started.is_set()
+        assert device.trigger_in("TASK (recording)") is False
+
+        device.ble_thread.execute_command("status", timeout=5)
+        # the result is handed to the dispatcher (the Tk thread in the app)
+        for func in dispatched:
+            func()
+        assert started.is_set()
+        assert device.get_status() == "Recording"
+    finally:
+        device.ble_thread.stop()
+
+
+class FakeSession:
+    """Stands in for DeviceSession: acknowledges after delay_sec"""
+
+    def __init__(self, address, delay_sec, ok=True):
+        self.address = address
+        self.delay_sec = delay_sec
+        self.ok = ok
+        self.last_alive = False
+        self.one_way_latency_sec = 0.0
+
+    async def write_command(self, uuid, payload):
+        await asyncio.sleep(self.delay_sec)
+        return self.ok
+
+    async def keep_alive_roundtrip(self, timeout=3.0):
+        self.last_alive = await self.write_command(None, None)
+        return self.last_alive
+
+    async def ensure_connected(self):
+        return False
+
+
+def test_start_recording_fans_out_concurrently():
+    manager = ble_control.BleManager(["cam"], command_timeout_sec=1.0)
+    manager.sessions = [FakeSession(f"cam{i}", 0.1) for i in range(6)]
+
+    loop = asyncio.new_event_loop()
+    try:
+        t0 = loop.time()
+        ok = loop.run_until_complete(manager.start_recording_all())
+        elapsed = loop.time() - t0
+    finally:
+        loop.close()
+
+    assert ok == 6
+    assert manager.is_recording
+    # six devices of 100 ms each, in parallel
+    assert elapsed < 0.4
+    report = manager.reports["record_start"]
+    assert report.ok_count == 6
+    assert report.spread_sec < 0.1
+    assert "6/6 ok" in report.summary()
+
+
+def test_fan_out_times_out_per_device():
+    manager = ble_control.BleManager(
+        ["cam"], command_timeout_sec=0.2, connect_timeout_sec=0.0
+    )
+    manager.sessions = [
+        FakeSession("fast", 0.0),
+        FakeSession("hung", 10.0),
+        FakeSession("failed", 0.0, ok=False),
+    ]
+
+    loop = asyncio.new_event_loop()
+    try:
+        ok = loop.run_until_complete(manager.stop_recording_all())
+        alive = loop.run_until_complete(manager.send_keep_alive_all())
+    finally:
+        loop.close()
+
+    assert ok == 1
+    report = manager.reports["record_stop"]
+    assert report.results["fast"][0] is True
+    assert report.results["hung"] == (False, report.results["hung"][1])
+    assert 0.2 <= report.results["hung"][1] < 1.0
+    assert report.results["failed"][0] is False
+    assert report.spread_sec == 0.0
+    assert alive == 1
+
+
+def test_commands_are_dispatched_without_polling_delay():
+    ble_thread = _thread_with_handlers()
+    try:
+        ble_thread.execute_command("status", timeout=5)
+        t0 = time.perf_counter()
+        for _ in range(20):
+            ble_thread.execute_command("status", timeout=5)
+        # a 50 ms polling loop would take about 0.5 s on average
+        assert time.perf_counter() - t0 < 0.2
+    finally:
+        ble_thread.stop()
+    assert ble_thread.submit("status").result(timeout=1)[1] == 0
+
+
+class FakeDevice:
+    def __init__(self, name, address):
+        self.name = name
+        self.address = address
+        self.local_name = name
+
+
+class FakeScanner:
+    """Advertises (delay_sec, name, address) through the detection callback"""
+
+    adverts = []
+
+    def __init__(self, detection_callback):
+        self.callback = detection_callback
+        self.handles = []
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for delay_sec, name, address in self.adverts:
+            device = FakeDevice(name, address)
+            self.handles.append(
+                loop.call_later(delay_sec, self.callback, device, device)
+            )
+
+    async def stop(self):
+        for handle in self.handles:
+            handle.cancel()
+
+
+class FakeConnectSession(FakeSession):
+    bad_addresses = set()
+    # addresses that never answer (the connect runs into its timeout)
+    silent_addresses = set()
+
+    def __init__(self, address):
+        super().__init__(address, 0.0)
+        self.disconnected = False
+
+    async def connect_and_listen(self):
+        await asyncio.sleep(0.01)
+        if self.address in self.silent_addresses:
+            await asyncio.sleep(60)
+        if self.address in self.bad_addresses:
+            raise OSError("not reachable")
+        return True
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+def _connect(
+    tmp_path, adverts, scan_timeout_sec=5.0, cached=None, bad=(), silent=(), **kwargs
+):
+    FakeScanner.adverts = adverts
+    FakeConnectSession.bad_addresses = set(bad)
+    FakeConnectSession.silent_addresses = set(silent)
+    cache = ble_control.AddressCache(str(tmp_path / "ble_addresses.json"))
+    for name, address in (cached or {}).items():
+        cache.set(name, address)
+    manager = ble_control.BleManager(
+        ["cam1", "cam2"],
+        scan_timeout_sec=scan_timeout_sec,
+        address_cache=cache,
+        session_factory=FakeConnectSession,
+        scanner_factory=FakeScanner,
+        **kwargs,
+    )
+    loop = asyncio.new_event_loop()
+    try:
+        t0 = loop.time()
+        ok = loop.run_until_complete(manager.discover_and_connect())
+        elapsed = loop.time() - t0
+        manager.stop_keep_alive_loop()
+        loop.run_until_complete(asyncio.sleep(0))
+    finally:
+        loop.close()
+    return manager, ok, elapsed
+
+
+def test_discovery_finishes_when_all_cameras_are_found(tmp_path):
+    manager, ok, elapsed = _connect(
+        tmp_path, [(0.01, "cam1", "AA"), (0.02, "cam2", "BB"), (0.0, "other", "CC")]
+    )
+    assert ok == 2
+    assert elapsed < 1.0
+    assert sorted(s.address for s in manager.sessions) == ["AA", "BB"]
+    report = manager.reports["connect"]
+    assert set(report.results) == {"AA", "BB"}
+    # the addresses are remembered for the next time
+    cache = ble_control.AddressCache(str(tmp_path / "ble_addresses.json"))
+    assert cache.get("cam1") == "AA"
+    assert cache.get("cam2") == "BB"
+
+
+def test_cached_address_is_connected_without_advertisement(tmp_path):
+    manager, ok, _ = _connect(tmp_path, [(0.01, "cam2", "BB")], cached={"cam1": "AA"})
+    assert ok == 2
+    assert sorted(s.address for s in manager.sessions) == ["AA", "BB"]
+
+
+def test_stale_cached_address_falls_back_to_scanning(tmp_path):
+    manager, ok, _ = _connect(
+        tmp_path,
+        [(0.05, "cam1", "A2"), (0.01, "cam2", "BB")],
+        cached={"cam1": "OLD"},
+        bad={"OLD"},
+    )
+    assert ok == 2
+    assert sorted(s.address for s in manager.sessions) == ["A2", "BB"]
+    assert manager.reports["connect"].results["OLD"][0] is False
+    cache = ble_control.AddressCache(str(tmp_path / "ble_addresses.json"))
+    assert cache.get("cam1") == "A2"
+
+
+def test_scanned_address_is_raced_against_a_silent_cached_one(tmp_path):
+    manager, ok, elapsed = _connect(
+        tmp_path,
+        [(0.05, "cam1", "A2"), (0.01, "cam2", "BB")],
+        cached={"cam1": "OLD"},
+        silent={"OLD"},
+        cached_connect_timeout_sec=0.5,
+    )
+    assert ok == 2
+    assert sorted(s.address for s in manager.sessions) == ["A2", "BB"]
+    results = manager.reports["connect"].results
+    # connected while the cached address was still being tried
+    assert results["A2"] == (True, pytest.approx(0.06, abs=0.1))
+    assert results["OLD"][0] is False
+    # bounded by the short timeout of cached connects
+    assert elapsed < 1.0
+
+
+def test_missing_camera_stops_at_scan_timeout(tmp_path):
+    manager, ok, elapsed = _connect(
+        tmp_path, [(0.01, "cam1", "AA")], scan_timeout_sec=0.2
+    )
+    assert ok == 1
+    assert 0.2 <= elapsed < 1.0
+
+
+def test_address_caches_merge_on_save(tmp_path):
+    path = str(tmp_path / "ble_addresses.json")
+    first = ble_control.AddressCache(path)
+    second = ble_control.AddressCache(path)
+    first.set("cam1", "AA")
+    first.save()
+    second.set("cam2", "BB")
+    second.save()
+    cache = ble_control.AddressCache(path)
+    assert cache.get("cam1") == "AA"
+    assert cache.get("cam2") == "BB"
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_address_cache_ignores_a_shared_directory(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    path = shared / "ble_addresses.json"
+    path.write_text('{"cam1": "PLANTED"}', encoding="utf-8")
+    shared.chmod(0o777)
+    cache = ble_control.AddressCache(str(path))
+    assert cache.get("cam1") is None
+    cache.set("cam1", "AA")
+    cache.save()
+    assert "PLANTED" in path.read_text(encoding="utf-8")
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+def test_address_cache_replaces_a_symlink_instead_of_following_it(tmp_path):
+    target = tmp_path / "target.txt"
+    target.write_text("keep", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir(mode=0o700)
+    path = cache_dir / "ble_addresses.json"
+    os.symlink(target, path)
+    cache = ble_control.AddressCache(str(path))
+    cache.set("cam1", "AA")
+    cache.save()
+    assert target.read_text(encoding="utf-8") == "keep"
+    assert not path.is_symlink()
+    assert ble_control.AddressCache(str(path)).get("cam1") == "AA"
+
+
+def test_keep_alive_rtt_is_smoothed():
+    session = ble_control.DeviceSession("AA:BB:CC:DD:EE:FF")
+    assert session.one_way_latency_sec == 0.0
+    session.add_rtt_sample(0.1)
+    assert session.rtt_sec == 0.1
+    session.add_rtt_sample(0.2)
+    assert abs(session.rtt_sec - 0.13) < 1e-9
+    assert abs(session.one_way_latency_sec - 0.065) < 1e-9
+
+
+def test_record_start_is_sent_ahead_by_latency():
+    # a camera with 200 ms one-way latency and one with none
+    slow = FakeSession("slow", 0.4)
+    slow.one_way_latency_sec = 0.2
+    fast = FakeSession("fast", 0.0)
+    manager = ble_control.BleManager(["cam"])
+    manager.sessions = [slow, fast]
+
+    loop = asyncio.new_event_loop()
+    try:
+        target = loop.time() + 0.3
+        ok = loop.run_until_complete(manager.start_recording_at(target))
+    finally:
+        loop.close()
+
+    assert ok == 2
+    report = manager.reports["record_start"]
+    # both cameras are estimated to start at the target
+    for address in ("slow", "fast"):
+        assert 0.0 <= report.results[address][1] < 0.05
+    assert report.spread_sec < 0.05
@@ -0,0 +1,55 @@
+import datetime
+import threading
+
+from timeline_kun import clock, timer_log
+
+
+def test_fake_clock_advances_only_when_told():
+    fake_clock = clock.FakeClock(start_wall=datetime.datetime(2024, 1, 1, 9, 0, 0))
+    assert fake_clock.now_ns() == 0
+    fake_clock.advance(1.5)
+    assert fake_clock.now_ns() == 1_500_000_000
+    assert fake_clock.wall_now() == datetime.datetime(2024, 1, 1, 9, 0, 1, 500000)
+
+
+def test_fake_clock_sleep_wakes_on_advance():
+    fake_clock = clock.FakeClock()
+    woke = threading.Event()
+
+    def sleeper():
+        fake_clock.sleep(2.0)
+        woke.set()
+
+    t = threading.Thread(target=sleeper, daemon=True)
+    t.start()
+    fake_clock.advance(1.0)
+    assert not woke.wait(0.05)
+    fake_clock.advance(1.0)
+    assert woke.wait(1.0)
+
+
+def test_fake_clock_runs_at_speed():
+    fake_clock = clock.FakeClock(speed=1000)
+    fake_clock.sleep(5.0)  # about 5 ms of real time
+    assert fake_clock.now_ns() >= 5_000_000_000
+
+
+def test_bids_log_onsets_follow_the_clock(tmp_path):
+    fake_clock = clock.FakeClock()
+    log = timer_log.BIDSLog(str(tmp_path / "protocol.csv"), clock=fake_clock)
+    log.mark_start_time()
+    log.set_task_log("TASK A")
+    fake_clock.advance(60)
+    log.add_task_log()
+    log.set_task_log("TASK B")
+    fake_clock.advance(2.5)
+    log.add_control_log("task_skip")
+    log.close()
+
+    with open(log.file_path) as f:
+        lines = f.read().splitlines()
+    assert lines == [
+        "onset\tduration\ttrial_type",
+        "0.0\t60.0\tTASK A",
+        "62.5\t0.0\ttask_skip",
+    ]
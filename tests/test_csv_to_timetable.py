@@ -0,0 +1,44 @@
+import datetime
+
+import pytest
+
+from timeline_kun.csv_to_timetable import TimeTable
+
+HEADER = "title,member,start,duration,fixed,instruction\n"
+
+
+def test_iter_csv_str_yields_rows_incrementally():
+    csv_str = HEADER + "A,M,,0:01:00,duration,\nB,M,,0:02:00,duration,\n"
+    rows = TimeTable().iter_csv_str(csv_str)
+    first = next(rows)
+    assert first["title"] == "A"
+    assert first["end"] == datetime.timedelta(seconds=60)
+    second = next(rows)
+    assert second["start"] == datetime.timedelta(seconds=60)
+    with pytest.raises(StopIteration):
+        next(rows)
+
+
+def test_fixed_start_without_duration_uses_next_start():
+    csv_str = HEADER + "A,M,0:00:10,,start,\n\nB,M,0:01:00,0:00:30,start,\n"
+    time_table = TimeTable()
+    warn_msg = time_table.load_csv_str(csv_str)
+    assert warn_msg == ""
+    assert time_table.get_timetable()[0]["end"] == datetime.timedelta(seconds=60)
+
+
+def test_start_earlier_warning_takes_precedence():
+    csv_str = (
+        HEADER
+        + "A,M,,0:01:00,duration,\n"
+        + "B,M,0:00:30,0:01:00,start,\n"
+        + "C,M,0:00:10,0:00:10,start,\n"
+    )
+    time_table = TimeTable()
+    warn_msg = time_table.load_csv_str(csv_str)
+    assert warn_msg == "[line 3] Start time is earlier than the previous line"
+    assert [r["has_error"] for r in time_table.get_timetable()] == [
+        False,
+        True,
+        True,
+    ]
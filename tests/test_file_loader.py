@@ -4,6 +4,7 @@ import os
 
 import pytest
 
+from timeline_kun import file_loader
 from timeline_kun.file_loader import FileLoader
 
 # test_file_loader.pyと同じディレクトリにあるfixturesフォルダを探す
@@ -145,3 +146,77 @@ def test_load_file_for_encoding_detection(
         assert fl.get_encoding() == expected_encoding
         assert warn_msg == expected_warn_msg
         assert time_table is not None
+
+
+@pytest.mark.parametrize("mmap_threshold", [0, 1 << 30])
+@pytest.mark.parametrize(
+    "filename, fallback_encoding, expected_encoding",
+    [
+        ("valid__encoding__utf8.csv", "utf-8-sig", "utf-8"),
+        ("valid__encoding__utf8_bom.csv", "utf-8-sig", "utf-8"),
+        ("valid__encoding__shift_jis.csv", "utf-8-sig", "cp932"),
+        ("valid__encoding__euc_jp.csv", "euc_jp", "euc_jp"),
+    ],
+)
+def test_detect_and_decode_reads_buffer_once(
+    filename, fallback_encoding, expected_encoding, mmap_threshold
+):
+    file_path = _fixture_path(filename)
+    with file_loader.FileBuffer(file_path, mmap_threshold=mmap_threshold) as buf:
+        text, detection = file_loader.detect_and_decode(
+            buf, ["utf-8", fallback_encoding, "cp932"]
+        )
+    assert detection.encoding == expected_encoding
+    assert detection.used_mmap is (mmap_threshold == 0)
+    assert detection.has_bom is (filename == "valid__encoding__utf8_bom.csv")
+    assert detection.size == os.path.getsize(file_path)
+    assert "\r" not in text
+    assert text.lstrip("\ufeff").startswith("title")
+
+
+def test_encoding_detection_is_exposed():
+    fl = FileLoader(fallback_encoding="cp932", use_cache=False)
+    fl.load_file_for_preview(_fixture_path("valid__encoding__shift_jis.csv"))
+    detection = fl.get_encoding_detection()
+    assert detection.encoding == "cp932"
+    assert detection.detect_sec >= 0
+    assert "cp932" in detection.summary()
+
+
+def test_load_file_for_timer_inserts_intermissions():
+    fl = FileLoader(intermission_desc="Break", use_cache=False)
+    fl.load_file_for_timer(1, _fixture_path("valid__recording__example_1.csv"))
+    stages = fl.get_stage_list()
+    assert [s["title"] for s in stages] == [
+        "TASK B",
+        "TASK C",
+        "TASK D",
+        "TASK E",
+        "Break",
+        "TASK F",
+    ]
+    assert stages[0]["start_dt"].total_seconds() == 0
+    for prev, cur in zip(stages, list(stages)[1:]):
+        assert prev["end_dt"] == cur["start_dt"]
+
+
+def test_load_timetable_for_timer_matches_the_file():
+    csv_path = _fixture_path("valid__recording__example_1.csv")
+    from_file = FileLoader(intermission_desc="Break", use_cache=False)
+    from_file.load_file_for_timer(1, csv_path)
+
+    _, parsed = FileLoader(use_cache=False).load_file_for_preview(csv_path)
+    handed_over = FileLoader(intermission_desc="Break", use_cache=False)
+    handed_over.load_timetable_for_timer(1, parsed.get_timetable(), "utf-8")
+    assert handed_over.get_encoding() == "utf-8"
+    assert [s.as_dict() for s in handed_over.get_stage_list()] == [
+        s.as_dict() for s in from_file.get_stage_list()
+    ]
+
+
+def test_default_cache_stays_in_the_test_cache_dir(user_cache_dir):
+    # conftest.py points the per-user cache at a temporary directory
+    fl = FileLoader()
+    fl.load_file_for_preview(_fixture_path("valid__encoding__utf8.csv"))
+    assert fl.cache.cache_dir == user_cache_dir
+    assert any(name.endswith(".json") for name in os.listdir(user_cache_dir))
@@ -0,0 +1,58 @@
+from array import array
+
+from timeline_kun import gui_canvas
+
+
+def _index(stages):
+    starts = array("i", [s for s, _ in stages])
+    ends = array("i", [e for _, e in stages])
+    return gui_canvas.StageIndex(starts, ends)
+
+
+def test_only_stages_in_the_view_are_planned():
+    # 100000 one-minute stages
+    index = _index([(i * 60, i * 60 + 60) for i in range(100000)])
+    assert index.visible_range(6000, 6600) == (100, 111)
+    plan = index.plan(6000, 6600, scale=1.0)
+    assert plan == [("stage", i) for i in range(100, 111)]
+
+
+def test_sub_pixel_stages_are_merged():
+    # 1 s stages at 0.1 px/s; merged bars close after AGGREGATE_PX
+    index = _index([(i, i + 1) for i in range(1000)])
+    plan = index.plan(0, 1000, scale=0.1)
+    assert all(item[0] == "group" for item in plan)
+    assert plan[0][1] == 0
+    assert plan[-1][2] == 999
+    # every stage is covered once, in order
+    covered = [i for _, first, last, _, _ in plan for i in range(first, last + 1)]
+    assert covered == list(range(1000))
+    assert len(plan) <= 1000 * 0.1 / gui_canvas.AGGREGATE_PX + 1
+
+
+def test_long_stages_split_the_merged_bars():
+    stages = [(0, 1), (1, 2), (2, 100), (100, 101), (101, 102)]
+    plan = _index(stages).plan(0, 102, scale=1.0)
+    assert plan == [
+        ("group", 0, 1, 0, 2),
+        ("stage", 2),
+        ("group", 3, 4, 100, 102),
+    ]
+
+
+def test_lone_short_stage_is_drawn_alone():
+    stages = [(0, 60), (60, 60), (60, 120)]
+    assert _index(stages).plan(0, 120, scale=1.0) == [
+        ("stage", 0),
+        ("stage", 1),
+        ("stage", 2),
+    ]
+
+
+def test_start_going_backwards_is_still_found():
+    # the third stage starts before the second one (a warning in the CSV)
+    stages = [(0, 60), (100, 200), (50, 70), (200, 300)]
+    index = _index(stages)
+    lo, hi = index.visible_range(55, 65)
+    assert lo <= 2 < hi
+    assert ("stage", 2) in index.plan(55, 65, scale=1.0)
@@ -0,0 +1,139 @@
+import tkinter as tk
+
+import pytest
+
+from timeline_kun import gui_tree
+
+COLUMNS = [
+    {"name": name, "width": 80}
+    for name in ("title", "member", "start", "end", "duration", "fixed", "instruction")
+]
+
+
+def test_row_window_keeps_a_buffer_around_the_view():
+    window = gui_tree.RowWindow(visible=10, buffer=5)
+    assert window.set_count(10000)
+    assert (window.start, window.size) == (0, 20)
+
+    # inside the buffer: the items are only scrolled
+    assert window.scroll_to(8) is False
+    assert window.position(8) == 8
+    # past the buffer: the window moves and the items are reused
+    assert window.scroll_to(500) is True
+    assert window.start == 495
+    assert window.position(500) == 5
+    assert window.position(100) is None
+
+
+def test_row_window_is_clamped_to_the_rows():
+    window = gui_tree.RowWindow(visible=10, buffer=5)
+    window.set_count(12)
+    assert window.size == 12
+    window.scroll_to(100)
+    assert (window.top, window.start) == (2, 0)
+
+    window.set_count(1000)
+    window.scroll_to(995)
+    assert window.top == 990
+    assert window.start + window.size == 1000
+
+
+def test_row_window_see_scrolls_as_little_as_possible():
+    window = gui_tree.RowWindow(visible=10, buffer=5)
+    window.set_count(1000)
+    window.scroll_to(100)
+    assert window.see(105) is False
+    assert window.top == 100
+    window.see(112)
+    assert window.top == 103
+    window.see(50)
+    assert window.top == 50
+    assert window.position(50) is not None
+
+
+def _stages(n):
+    return [
+        {
+            "title": f"task{i}",
+            "member": "",
+            "start_sec": str(i * 60),
+            "end_sec": str(i * 60 + 60),
+            "duration_sec": "60",
+            "fixed": "duration",
+            "instruction": "",
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def tree():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    root.withdraw()
+    widget = gui_tree.Tree(root, COLUMNS)
+    widget.pack()
+    yield widget
+    root.destroy()
+
+
+def _select(tree, pos):
+    tree.tree.selection_set(tree.tree.get_children()[pos])
+    tree._on_select(None)
+
+
+def _selected_title(tree):
+    return tree.tree.item(tree.tree.selection()[0], "values")[0]
+
+
+def test_select_maps_the_item_to_its_row(tree):
+    tree.set_stages(_stages(2000))
+    assert tree.virtual
+    tree._scroll_to(1000)
+    _select(tree, 25)
+    assert tree.get_selected_index() == tree.window.start + 25
+    assert _selected_title(tree) == f"task{tree.get_selected_index()}"
+
+
+@pytest.mark.parametrize("count", [10, 2000])
+def test_insert_and_remove_shift_the_selection(tree, count):
+    stages = _stages(count)
+    tree.set_stages(stages)
+    _select(tree, 5)
+    stages.insert(2, dict(stages[0], title="new"))
+    tree.row_inserted(2)
+    assert tree.get_selected_index() == 6
+    assert _selected_title(tree) == "task5"
+    del stages[0]
+    tree.row_removed(0)
+    assert tree.get_selected_index() == 5
+    assert _selected_title(tree) == "task5"
+    del stages[5]
+    tree.row_removed(5)
+    assert tree.get_selected_index() == -1
+    assert tree.tree.selection() == ()
+
+
+def test_crossing_the_threshold_keeps_the_selection(tree):
+    stages = _stages(gui_tree.VIRTUAL_THRESHOLD)
+    tree.set_stages(stages)
+    assert not tree.virtual
+    _select(tree, 400)
+    stages.insert(0, dict(stages[0], title="new"))
+    tree.row_inserted(0)
+    assert tree.virtual
+    assert tree.get_selected_index() == 401
+    assert tree.window.top <= 401 < tree.window.top + tree.window.visible
+    assert _selected_title(tree) == "task400"
+
+
+def test_tree_yview_follows_in_row_terms(tree):
+    tree.set_stages(_stages(2000))
+    tree._scroll_to(1000)
+    start, size = tree.window.start, tree.window.size
+    tree._on_tree_yview(str(30 / size), str(60 / size))
+    assert tree.window.top == start + 30
+    first, _ = tree.scrollbar.get()
+    assert first == pytest.approx((start + 30) / 2000)
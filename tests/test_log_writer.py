@@ -0,0 +1,104 @@
+import time
+
+from timeline_kun import clock, log_writer, timer_log
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_write_is_buffered_until_flush(tmp_path):
+    path = tmp_path / "events.tsv"
+    writer = log_writer.BufferedLogWriter(
+        str(path), mode="w", header="a\tb\n", flush_interval_sec=60
+    )
+    writer.write("1\t2\n")
+    assert _read(path) == "a\tb\n"
+
+    writer.flush(sync=True, wait=True)
+    assert _read(path) == "a\tb\n1\t2\n"
+    writer.close()
+
+
+def test_full_buffer_is_written_without_flush(tmp_path):
+    path = tmp_path / "events.tsv"
+    writer = log_writer.BufferedLogWriter(
+        str(path), flush_interval_sec=60, max_buffer_lines=3
+    )
+    for i in range(3):
+        writer.write(f"{i}\n")
+    # written by the background thread without any flush request
+    deadline = time.monotonic() + 5
+    while _read(path) != "0\n1\n2\n" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _read(path) == "0\n1\n2\n"
+    writer.close()
+
+
+def test_close_writes_everything_and_rejects_writes(tmp_path):
+    path = tmp_path / "events.tsv"
+    writer = log_writer.BufferedLogWriter(str(path), flush_interval_sec=60)
+    for i in range(1000):
+        writer.write(f"{i}\n")
+    writer.close()
+    writer.close()
+
+    assert _read(path).splitlines() == [str(i) for i in range(1000)]
+    assert writer.closed
+    try:
+        writer.write("late\n")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("write after close must fail")
+
+
+def test_close_all_flushes_open_writers(tmp_path):
+    path = tmp_path / "events.tsv"
+    writer = log_writer.BufferedLogWriter(str(path), flush_interval_sec=60)
+    writer.write("pending\n")
+    log_writer.close_all()
+    assert writer.closed
+    assert _read(path) == "pending\n"
+
+
+def test_bids_log_stage_boundary_is_written(tmp_path):
+    fake_clock = clock.FakeClock()
+    log = timer_log.BIDSLog(
+        str(tmp_path / "protocol.csv"), clock=fake_clock, flush_interval_sec=60
+    )
+    log.mark_start_time()
+    log.set_task_log("TASK A")
+    fake_clock.advance(10)
+    log.add_control_log("task_skip")
+    fake_clock.advance(5)
+    # a stage boundary writes (and fsyncs) the buffered events
+    log.add_task_log()
+    log.flush(wait=True)
+
+    assert _read(log.file_path).splitlines() == [
+        "onset\tduration\ttrial_type",
+        "10.0\t0.0\ttask_skip",
+        "0.0\t15.0\tTASK A",
+    ]
+    scans = _read(log.scans_path).splitlines()
+    assert scans[0] == "filename\tacq_time"
+    assert scans[1].startswith("protocol_00_events.tsv\t")
+    log.close()
+
+
+def test_bids_log_predicted_and_actual_start(tmp_path):
+    fake_clock = clock.FakeClock()
+    log = timer_log.BIDSLog(str(tmp_path / "protocol.csv"), clock=fake_clock)
+    log.mark_start_time()
+    fake_clock.advance(10)
+    log.add_control_log("video_record_start_scheduled", at_ns=12 * 10**9)
+    fake_clock.advance(2.5)
+    log.add_control_log("video_record_start", at_ns=12_050_000_000)
+    log.close()
+
+    assert _read(log.file_path).splitlines()[1:] == [
+        "12.0\t0.0\tvideo_record_start_scheduled",
+        "12.1\t0.0\tvideo_record_start",
+    ]
@@ -0,0 +1,128 @@
+import os
+
+import pytest
+
+from timeline_kun import csv_to_timetable
+from timeline_kun.file_loader import FileLoader
+from timeline_kun.parse_cache import ParseCache, ParsedTimeline
+
+CSV = "title,member,start,duration,fixed,instruction\nA,M,,0:01:00,duration,\n"
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _parsed(csv_str, warn_msg=""):
+    time_table = csv_to_timetable.TimeTable()
+    time_table.load_csv_str(csv_str)
+    time_table.warn_msg = warn_msg
+    return ParsedTimeline(time_table, "utf-8", warn_msg)
+
+
+def _loader(cache):
+    fl = FileLoader(use_cache=False)
+    fl.cache = cache
+    return fl
+
+
+def test_unchanged_file_is_served_from_memory(tmp_path, monkeypatch):
+    csv_path = tmp_path / "a.csv"
+    _write(csv_path, CSV)
+    cache = ParseCache(cache_dir=str(tmp_path / "cache"))
+
+    warn_msg, first = _loader(cache).load_file_for_preview(str(csv_path))
+    assert warn_msg == ""
+
+    def fail_read(*args, **kwargs):
+        raise AssertionError("file should not be decoded again")
+
+    monkeypatch.setattr(FileLoader, "_decode", fail_read)
+    fl = _loader(cache)
+    _, second = fl.load_file_for_preview(str(csv_path))
+    assert second is first
+    assert fl.get_encoding() == "utf-8"
+
+
+def test_disk_cache_is_shared_between_instances(tmp_path):
+    csv_path = tmp_path / "a.csv"
+    _write(csv_path, CSV)
+    cache_dir = str(tmp_path / "cache")
+    _loader(ParseCache(cache_dir=cache_dir)).load_file_for_preview(str(csv_path))
+
+    parsed = ParseCache(cache_dir=cache_dir).get(str(csv_path), "utf-8-sig")
+    assert parsed is not None
+    assert parsed.time_table.get_timetable()[0]["title"] == "A"
+    assert ParseCache(cache_dir=cache_dir).get(str(csv_path), "cp932") is None
+
+
+def test_changed_file_is_parsed_again(tmp_path):
+    csv_path = tmp_path / "a.csv"
+    _write(csv_path, CSV)
+    cache = ParseCache(cache_dir=None)
+    _loader(cache).load_file_for_preview(str(csv_path))
+
+    _write(csv_path, CSV.replace("A,M", "B,M"))
+    _, time_table = _loader(cache).load_file_for_preview(str(csv_path))
+    assert time_table.get_timetable()[0]["title"] == "B"
+
+
+def test_invalidate_and_lru_eviction(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = ParseCache(max_entries=2, cache_dir=str(cache_dir), max_disk_entries=2)
+    paths = []
+    for i in range(3):
+        csv_path = tmp_path / f"{i}.csv"
+        _write(csv_path, CSV + f"T{i},M,,0:01:00,duration,\n")
+        cache.put(str(csv_path), _parsed(CSV, str(i)))
+        paths.append(str(csv_path))
+    assert len(os.listdir(cache_dir)) == 2
+    assert ParseCache(cache_dir=str(cache_dir)).get(paths[2]).warn_msg == "2"
+    assert cache.get(paths[2]).warn_msg == "2"
+
+    cache.invalidate(paths[2])
+    assert cache.get(paths[2]) is None
+    cache.invalidate()
+    assert os.listdir(cache_dir) == []
+
+
+def test_disk_cache_keeps_the_whole_timetable(tmp_path):
+    csv_path = tmp_path / "a.csv"
+    csv_str = CSV + "B,被験者A,0:00:30,0:01:00,start,(recording)\n"
+    _write(csv_path, csv_str)
+    cache_dir = str(tmp_path / "cache")
+    _loader(ParseCache(cache_dir=cache_dir)).load_file_for_preview(str(csv_path))
+    (name,) = os.listdir(cache_dir)
+    assert name.endswith(".json")
+
+    parsed = ParseCache(cache_dir=cache_dir).get(str(csv_path), "utf-8-sig")
+    expected = csv_to_timetable.TimeTable()
+    warn_msg = expected.load_csv_str(csv_str)
+    assert parsed.warn_msg == warn_msg != ""
+    table = parsed.time_table.get_timetable()
+    assert [row.as_dict() for row in table] == [
+        row.as_dict() for row in expected.get_timetable()
+    ]
+    assert table.has_error(1)
+
+
+def test_broken_cache_file_is_ignored(tmp_path):
+    csv_path = tmp_path / "a.csv"
+    _write(csv_path, CSV)
+    cache_dir = tmp_path / "cache"
+    _loader(ParseCache(cache_dir=str(cache_dir))).load_file_for_preview(str(csv_path))
+    (cache_file,) = cache_dir.iterdir()
+    cache_file.write_text('{"version": 2, "table": {"start": [1]}}', encoding="utf-8")
+    assert ParseCache(cache_dir=str(cache_dir)).get(str(csv_path), "utf-8-sig") is None
+    assert list(cache_dir.iterdir()) == []
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_cache_dir_writable_by_others_is_not_used(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    cache_dir.chmod(0o777)
+    assert ParseCache(cache_dir=str(cache_dir)).cache_dir is None
+    cache_dir.chmod(0o700)
+    assert ParseCache(cache_dir=str(cache_dir)).cache_dir == str(cache_dir)
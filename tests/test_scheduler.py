@@ -0,0 +1,144 @@
+import pytest
+
+from timeline_kun import clock, scheduler
+
+
+class FakeWidget:
+    """Stands in for a Tk widget: after() callbacks are run by hand"""
+
+    def __init__(self):
+        self.pending = {}
+        self.delays = []
+        self._next_id = 0
+
+    def after(self, delay_ms, func):
+        self._next_id += 1
+        self.pending[self._next_id] = func
+        self.delays.append(delay_ms)
+        return self._next_id
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def run_pending(self):
+        pending, self.pending = self.pending, {}
+        for func in pending.values():
+            func()
+
+
+def test_fires_once_and_records_lateness():
+    fake_clock = clock.FakeClock()
+    widget = FakeWidget()
+    calls = []
+    sched = scheduler.DeadlineScheduler(
+        widget, lambda: calls.append(fake_clock.now_ns()), clock=fake_clock
+    )
+
+    sched.schedule_at(250_000_000)
+    assert widget.delays == [250]
+
+    # woken up too early: re-armed for the rest
+    fake_clock.set_ns(249_600_000)
+    widget.run_pending()
+    assert calls == []
+    assert widget.delays[-1] == 1
+
+    fake_clock.set_ns(251_000_000)
+    widget.run_pending()
+    assert calls == [251_000_000]
+    assert sched.drift.count == 1
+    assert sched.drift.max_ns == 1_000_000
+
+
+def test_schedule_replaces_pending_deadline():
+    widget = FakeWidget()
+    calls = []
+    sched = scheduler.DeadlineScheduler(
+        widget, lambda: calls.append(1), clock=clock.FakeClock()
+    )
+    sched.schedule_in(1.0)
+    sched.schedule_now()
+    assert len(widget.pending) == 1
+    widget.run_pending()
+    assert calls == [1]
+
+
+def test_shared_scheduler_arms_one_after_for_all_clients():
+    fake_clock = clock.FakeClock()
+    widget = FakeWidget()
+    shared = scheduler.SharedScheduler(widget, clock=fake_clock)
+    calls = []
+    a = shared.client(lambda: calls.append("a"))
+    b = shared.client(lambda: calls.append("b"))
+
+    a.schedule_at(300_000_000)
+    b.schedule_at(100_000_000)
+    assert len(widget.pending) == 1
+    assert widget.delays[-1] == 100
+
+    fake_clock.set_ns(100_500_000)
+    widget.run_pending()
+    assert calls == ["b"]
+    # re-armed for the remaining client only
+    assert len(widget.pending) == 1
+    assert widget.delays[-1] == 200
+
+    fake_clock.set_ns(300_000_000)
+    widget.run_pending()
+    assert calls == ["b", "a"]
+    assert widget.pending == {}
+    assert b.drift.max_ns == 500_000
+    assert shared.drift.count == 2
+
+
+def test_shared_scheduler_clients_reschedule_from_their_callback():
+    fake_clock = clock.FakeClock()
+    widget = FakeWidget()
+    shared = scheduler.SharedScheduler(widget, clock=fake_clock)
+    calls = []
+
+    def tick():
+        calls.append(fake_clock.now_ns())
+        a.schedule_in(1.0)
+
+    a = shared.client(tick)
+    b = shared.client(lambda: None)
+    a.schedule_now()
+    b.schedule_in(0.5)
+    widget.run_pending()
+    assert calls == [0]
+    assert len(widget.pending) == 1
+    assert widget.delays[-1] == 500
+
+    # a removed client is never called again
+    shared.remove(a)
+    fake_clock.set_ns(2_000_000_000)
+    widget.run_pending()
+    assert calls == [0]
+    assert widget.pending == {}
+
+
+def test_shared_scheduler_runs_all_clients_when_one_raises():
+    fake_clock = clock.FakeClock()
+    widget = FakeWidget()
+    shared = scheduler.SharedScheduler(widget, clock=fake_clock)
+    calls = []
+
+    def failing():
+        calls.append("a")
+        raise RuntimeError("label update failed")
+
+    def tick():
+        calls.append("b")
+        b.schedule_in(1.0)
+
+    a = shared.client(failing)
+    b = shared.client(tick)
+    a.schedule_now()
+    b.schedule_now()
+    with pytest.raises(RuntimeError):
+        widget.run_pending()
+    assert calls == ["a", "b"]
+    # the other client is still armed
+    assert len(widget.pending) == 1
+    assert widget.delays[-1] == 1000
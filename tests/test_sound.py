@@ -0,0 +1,114 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from timeline_kun import clock, sound
+
+
+def _engine(fake_clock=None):
+    return sound.CueEngine(backend="null", clock=fake_clock or clock.FakeClock())
+
+
+def test_all_cues_are_preloaded_as_float32():
+    engine = _engine()
+    assert set(engine.cues) == set(sound.CUE_FILES)
+    for data in engine.cues.values():
+        assert data.dtype == np.float32
+        assert data.ndim == 2
+    assert engine.stream.active
+
+
+def test_play_now_starts_in_the_next_block():
+    engine = _engine()
+    data = engine.cues["countdown3_orange.wav"]
+    assert not engine.stream.render().any()
+
+    engine.play("countdown3_orange.wav")
+    block = engine.stream.render(1024)
+    np.testing.assert_allclose(block, np.clip(data[:1024], -1, 1))
+
+
+def test_play_at_is_sample_accurate():
+    fake_clock = clock.FakeClock()
+    engine = _engine(fake_clock)
+    data = engine.cues["countdown3_cyan.wav"]
+    rate = engine.samplerate
+
+    # 10 ms from now
+    engine.play("countdown3_cyan.wav", at_ns=fake_clock.now_ns() + 10_000_000)
+    offset = round(0.01 * rate)
+    block = engine.stream.render(1024)
+    assert not block[:offset].any()
+    np.testing.assert_allclose(block[offset:], data[: 1024 - offset])
+
+    # the rest of the cue follows without a gap, then silence
+    remaining = len(data) - (1024 - offset)
+    rest = engine.stream.render(remaining + 256)
+    np.testing.assert_allclose(rest[:remaining], data[1024 - offset :])
+    assert not rest[remaining:].any()
+    assert engine._voices == []
+
+
+def test_cues_are_mixed_and_clipped():
+    engine = _engine()
+    engine.play("countdown3_orange.wav")
+    engine.play("countdown3_orange.wav")
+    data = engine.cues["countdown3_orange.wav"]
+    block = engine.stream.render(4096)
+    np.testing.assert_allclose(block, np.clip(2 * data[:4096], -1, 1), atol=1e-6)
+
+
+def test_resample_keeps_duration():
+    data = np.ones((4800, 2), dtype=np.float32)
+    out = sound._resample(data, 48000, 44100)
+    assert out.shape == (4410, 2)
+    assert out.dtype == np.float32
+
+
+def test_audio_player_wraps_the_engine():
+    ap = sound.AudioPlayer(backend="null")
+    data, samplerate = ap.load_audio("countdown3_lightgreen.wav")
+    assert samplerate == ap.engine.samplerate
+    ap.play_sound("countdown3_lightgreen.wav")
+    assert ap.engine.stream.render(len(data)).any()
+    ap.close()
+
+
+def test_players_can_share_one_engine():
+    engine = _engine()
+    orange = sound.AudioPlayer(engine=engine)
+    cyan = sound.AudioPlayer(engine=engine)
+    orange.play_sound("countdown3_orange.wav")
+    cyan.play_sound("countdown3_cyan.wav")
+    assert len(engine._pending) == 2
+    # closing one timer's player keeps the shared stream open
+    orange.close()
+    assert engine.stream.active
+    engine.close()
+
+
+def _sounddevice_without_device():
+    """sounddevice as it behaves when PortAudio finds no output device"""
+    sd = types.ModuleType("sounddevice")
+
+    class PortAudioError(Exception):
+        pass
+
+    def output_stream(**kwargs):
+        raise PortAudioError("Error querying device -1")
+
+    sd.PortAudioError = PortAudioError
+    sd.OutputStream = output_stream
+    return sd
+
+
+def test_auto_backend_falls_back_without_an_output_device(monkeypatch):
+    sd = _sounddevice_without_device()
+    monkeypatch.setitem(sys.modules, "sounddevice", sd)
+    ap = sound.AudioPlayer(backend="auto")
+    assert isinstance(ap.engine.stream, sound.NullOutputStream)
+    ap.close()
+    with pytest.raises(sd.PortAudioError):
+        sound.CueEngine(backend="sounddevice")
@@ -0,0 +1,103 @@
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# backends that must be loaded on first use, not when the apps start
+HEAVY_MODULES = ("bleak", "sounddevice", "soundfile", "numpy", "ttkthemes", "PIL")
+
+# generous budgets (ms); override on slow machines
+IMPORT_BUDGET_MS = float(os.environ.get("TIMELINE_KUN_IMPORT_BUDGET_MS", 1500))
+WINDOW_BUDGET_MS = float(os.environ.get("TIMELINE_KUN_WINDOW_BUDGET_MS", 5000))
+
+
+def _run_python(args, cwd=None):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in sys.path if p)
+    return subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=cwd,
+        timeout=60,
+    )
+
+
+def import_times(module):
+    """
+    Import module in a fresh interpreter with -X importtime.
+    Returns {module name: (self us, cumulative us)}.
+    """
+    result = _run_python(["-X", "importtime", "-c", f"import {module}"])
+    assert result.returncode == 0, result.stderr
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["timeline_kun.app_timer", "timeline_kun.app_previewer", "timeline_kun.cli"],
+)
+def test_heavy_backends_are_not_imported_at_startup(module):
+    times = import_times(module)
+    assert module in times
+    loaded = [name for name in times if name.split(".")[0] in HEAVY_MODULES]
+    assert loaded == []
+
+
+@pytest.mark.parametrize(
+    "module", ["timeline_kun.app_timer", "timeline_kun.app_previewer"]
+)
+def test_import_time_breakdown(module):
+    times = import_times(module)
+    total_ms = times[module][1] / 1000
+    # breakdown of the slowest imports (shown with pytest -s)
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    print(f"\n{module}: {total_ms:.1f} ms")
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {self_us / 1000:7.1f} ms self {cumulative_us / 1000:7.1f} ms  {name}")
+    assert total_ms < IMPORT_BUDGET_MS
+
+
+def test_time_to_first_timer_window(tmp_path):
+    csv_path = tmp_path / "timeline.csv"
+    shutil.copy(os.path.join(FIXTURES, "valid__recording__example_1.csv"), csv_path)
+    script = textwrap.dedent(f"""
+        import sys
+        import time
+
+        t0 = time.perf_counter()
+        import tkinter as tk
+
+        try:
+            root = tk.Tk()
+        except tk.TclError:
+            sys.exit(3)
+        from timeline_kun import app_timer
+
+        shown = []
+        root.bind("<Map>", lambda e: shown.append(time.perf_counter()))
+        app = app_timer.App(root, {str(csv_path)!r})
+        while not shown:
+            root.update()
+        print(f"WINDOW_MS {{(shown[0] - t0) * 1000:.1f}}")
+        app._on_closing()
+        """)
+    result = _run_python(["-c", script], cwd=tmp_path)
+    if result.returncode == 3:
+        pytest.skip("no display")
+    assert result.returncode == 0, result.stderr
+    window_ms = float(result.stdout.split("WINDOW_MS")[1].split()[0])
+    print(f"\ntime to first window: {window_ms:.1f} ms")
+    assert window_ms < WINDOW_BUDGET_MS
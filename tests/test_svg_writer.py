@@ -0,0 +1,118 @@
+import os
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from timeline_kun import cli, svg_writer, timetable
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def _table(durations, title="task"):
+    t = timetable.Timetable()
+    start = 0
+    for i, d in enumerate(durations):
+        t.append(f"{title}{i % 3}", start, start + d, fixed="duration")
+        start += d
+    return t
+
+
+def _render(renderer, page=0):
+    return ET.fromstring("".join(renderer.iter_page(page)))
+
+
+def test_single_page_fits_the_whole_timeline():
+    renderer = svg_writer.SvgRenderer(_table([60, 120, 30]), length_px=500)
+    assert renderer.page_count == 1
+    root = _render(renderer)
+    rects = root.findall(f"{SVG}rect")
+    assert len(rects) == 3
+    bottom = float(rects[-1].get("y")) + float(rects[-1].get("height"))
+    assert bottom == pytest.approx(520)
+    texts = [t.text for t in root.findall(f"{SVG}text")]
+    assert "task1 (2:00)" in texts
+    assert "3:30" in texts
+
+
+def test_pages_split_the_timeline(tmp_path):
+    # 100 stages of 60 s at 1 px/s -> 6000 px -> 6 pages of 1000 px
+    renderer = svg_writer.SvgRenderer(_table([60] * 100), length_px=1000, px_per_sec=1)
+    assert renderer.page_count == 6
+    paths = renderer.write(str(tmp_path / "out.svg"))
+    assert [os.path.basename(p) for p in paths] == [
+        f"out_p{i}.svg" for i in range(1, 7)
+    ]
+    n_rects = 0
+    for path in paths:
+        root = ET.parse(path).getroot()
+        n_rects += len(root.findall(f"{SVG}rect"))
+    # stages crossing a page boundary are drawn on both pages
+    assert n_rects >= 100
+
+
+def test_text_is_escaped_and_split_into_lines():
+    t = timetable.Timetable()
+    t.append("<a & b>", 0, 60, fixed="duration")
+    renderer = svg_writer.SvgRenderer(t, direction="horizontal")
+    root = _render(renderer)
+    label = root.find(f"{SVG}text")
+    spans = [span.text for span in label.findall(f"{SVG}tspan")]
+    assert spans == ["<a & b>", "1:00"]
+
+
+def test_sub_pixel_stages_are_aggregated():
+    renderer = svg_writer.SvgRenderer(_table([1] * 100000), length_px=1000)
+    root = _render(renderer)
+    rects = root.findall(f"{SVG}rect")
+    assert len(rects) < 1000
+    assert any(r.get("fill") == "#c8c8c8" for r in rects)
+
+
+def test_cli_export(tmp_path, capsys):
+    good = os.path.join(FIXTURES, "valid__recording__example_1.csv")
+    bad = os.path.join(FIXTURES, "invalid__fixed__unsupported_code.csv")
+    code = cli.export([good, bad, "--out_dir", str(tmp_path), "--px_per_sec", "2"])
+    assert code == 1
+    out = capsys.readouterr()
+    assert "invalid__fixed__unsupported_code.csv" in out.err
+    written = sorted(os.listdir(tmp_path))
+    assert len(written) > 0
+    assert all(name.startswith("valid__recording__example_1") for name in written)
+    for name in written:
+        ET.parse(tmp_path / name)
+
+
+def test_cli_export_continues_after_a_write_error(tmp_path, capsys, monkeypatch):
+    good = os.path.join(FIXTURES, "valid__recording__example_1.csv")
+    save_as_svg = svg_writer.save_as_svg
+    calls = []
+
+    def failing_first(time_table, filename, **kwargs):
+        calls.append(filename)
+        if len(calls) == 1:
+            raise PermissionError(13, "Permission denied", filename)
+        return save_as_svg(time_table, filename, **kwargs)
+
+    monkeypatch.setattr(svg_writer, "save_as_svg", failing_first)
+    code = cli.export([good, good, "--out_dir", str(tmp_path)])
+    assert code == 1
+    assert len(calls) == 2
+    assert "Permission denied" in capsys.readouterr().err
+    assert os.listdir(tmp_path) == ["valid__recording__example_1.svg"]
+
+
+def test_cli_export_rejects_an_unusable_out_dir(tmp_path, capsys):
+    good = os.path.join(FIXTURES, "valid__recording__example_1.csv")
+    not_a_dir = tmp_path / "file.txt"
+    not_a_dir.write_text("", encoding="utf-8")
+    assert cli.export([good, "--out_dir", str(not_a_dir)]) == 1
+    assert str(not_a_dir) in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("option", ["--length", "--px_per_sec"])
+def test_cli_export_rejects_non_positive_scale(tmp_path, capsys, option):
+    good = os.path.join(FIXTURES, "valid__recording__example_1.csv")
+    assert cli.export([good, "--out_dir", str(tmp_path), option, "0"]) == 2
+    assert "must be positive" in capsys.readouterr().err
+    assert os.listdir(tmp_path) == []
@@ -1,3 +1,5 @@
+import datetime
+
 import pytest
 
 from timeline_kun import time_format
@@ -35,3 +37,49 @@ def test_str_to_time_str(src: str, expected: str):
 )
 def test_str_to_seconds(src: str, expected: int):
     assert time_format.str_to_seconds(src) == expected
+
+
+@pytest.mark.parametrize(
+    "sec, hh_mm_ss, mm_ss",
+    [
+        (0, "0:00:00", "0:00"),
+        (59, "0:00:59", "0:59"),
+        (3599, "0:59:59", "59:59"),
+        (3600, "1:00:00", "60:00"),
+        (86399, "23:59:59", "1439:59"),
+    ],
+)
+def test_timedelta_to_str(sec, hh_mm_ss, mm_ss):
+    td = datetime.timedelta(seconds=sec, milliseconds=900)
+    assert time_format.timedelta_to_str(td) == hh_mm_ss
+    assert time_format.timedelta_to_str(td, hhmmss=False) == mm_ss
+    assert time_format.seconds_to_time_str(sec + 0.9) == hh_mm_ss
+
+
+def test_seconds_to_time_str_beyond_a_day():
+    assert time_format.seconds_to_time_str(100 * 3600 + 61) == "100:01:01"
+
+
+def test_batch_parsing_matches_single_values():
+    values = ["0:01:00", "", " 1:30 ", "0:01:00", "90", "", "1:00:00"]
+    assert time_format.strs_to_seconds(values) == [
+        time_format.str_to_seconds(v) for v in values
+    ]
+    assert time_format.strs_to_time_strs(values) == [
+        time_format.str_to_time_str(v) for v in values
+    ]
+    assert time_format.strs_to_seconds([]) == []
+
+
+def test_batch_parsing_raises_like_single_values():
+    with pytest.raises(ValueError):
+        time_format.strs_to_seconds(["0:01:00", "1:2:3:4"])
+    with pytest.raises(ValueError):
+        time_format.strs_to_seconds(["-5"])
+
+
+def test_memo_is_bounded():
+    for i in range(time_format.MEMO_SIZE + 10):
+        time_format.str_to_seconds(str(i))
+    info = time_format.str_to_seconds.cache_info()
+    assert info.currsize <= time_format.MEMO_SIZE
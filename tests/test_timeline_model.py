@@ -0,0 +1,197 @@
+import csv
+import io
+import random
+
+import pytest
+
+from timeline_kun import timetable_to_csv
+from timeline_kun.csv_to_timetable import TimeTable
+from timeline_kun.timeline_model import TimelineModel
+
+HEADER = "title,member,start,duration,fixed,instruction\n"
+
+
+def _parse(csv_str):
+    time_table = TimeTable()
+    warn_msg = time_table.load_csv_str(csv_str)
+    return time_table.get_timetable(), warn_msg
+
+
+def _model(csv_str):
+    return TimelineModel(_parse(csv_str)[0])
+
+
+def _to_csv_str(model):
+    header, rows = model.to_csv_rows()
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def _assert_same_as_reparse(model):
+    expected, warn_msg = _parse(_to_csv_str(model))
+    table = model.get_timetable()
+    assert list(table.start) == list(expected.start)
+    assert list(table.end) == list(expected.end)
+    assert [table.has_error(i) for i in range(len(table))] == [
+        expected.has_error(i) for i in range(len(expected))
+    ]
+    assert model.get_warn_msg() == warn_msg
+
+
+def _protocol(n, anchor_every=10):
+    lines = [HEADER]
+    for i in range(n):
+        if i % anchor_every == 0:
+            lines.append(f"T{i},M,{i * 60 + 30},0:00:20,start,\n")
+        else:
+            lines.append(f"T{i},M,,0:00:05,duration,\n")
+    return "".join(lines)
+
+
+def test_model_matches_parser():
+    csv_str = (
+        HEADER
+        + "A,M,,0:01:00,duration,\n"
+        + "B,M,0:00:30,0:01:00,start,\n"
+        + "C,M,0:00:10,0:00:10,start,\n"
+    )
+    model = _model(csv_str)
+    expected, warn_msg = _parse(csv_str)
+    assert model.get_warn_msg() == warn_msg
+    assert [r.as_dict() for r in model.get_timetable()] == [
+        r.as_dict() for r in expected
+    ]
+
+
+def test_edit_stops_at_the_next_fixed_start_row():
+    model = _model(_protocol(5000))
+    changed = model.edit_row(1001, ["T1001", "M", "", "", "0:00:07", "duration", ""])
+    # rows 1001..1009 move, row 1010 is anchored by its start
+    assert changed == list(range(1001, 1010))
+    assert model.get_timetable().end[1009] == 1009 * 60 - 9 * 60 + 30 + 20 + 9 * 5 + 2
+    _assert_same_as_reparse(model)
+
+
+def test_edit_shifts_the_following_rows():
+    csv_str = (
+        HEADER
+        + "A,M,,0:01:00,duration,\n"
+        + "B,M,,0:01:00,duration,\n"
+        + "C,M,,0:01:00,duration,\n"
+    )
+    model = _model(csv_str)
+    changed = model.edit_row(0, ["A", "M", "", "", "0:02:00", "duration", ""])
+    assert changed == [0, 1, 2]
+    assert list(model.get_timetable().end) == [120, 180, 240]
+
+
+def test_edit_of_start_updates_previous_end():
+    csv_str = HEADER + "A,M,0:00:10,,start,\nB,M,0:01:00,0:00:30,start,\n"
+    model = _model(csv_str)
+    changed = model.edit_row(1, ["B", "M", "0:02:00", "", "0:00:30", "start", ""])
+    assert changed == [0, 1]
+    assert model.get_timetable().end[0] == 120
+
+
+def test_insert_and_remove_match_reparse():
+    rng = random.Random(1)
+    model = _model(_protocol(200, anchor_every=7))
+    for _ in range(50):
+        index = rng.randrange(1, len(model))
+        if rng.random() < 0.5:
+            model.insert_row(index, ["New", "", "", "", "0:00:30", "duration", ""])
+        else:
+            model.remove_row(index)
+        _assert_same_as_reparse(model)
+    assert len(set(model.row_id(i) for i in range(len(model)))) == len(model)
+
+
+def test_warnings_follow_the_edits():
+    csv_str = (
+        HEADER
+        + "A,M,,0:01:00,duration,\n"
+        + "B,M,0:01:00,0:01:00,start,\n"
+        + "C,M,0:03:00,0:01:00,start,\n"
+    )
+    model = _model(csv_str)
+    assert model.get_warn_msg() == ""
+    model.edit_row(2, ["C", "M", "0:00:30", "", "0:01:00", "start", ""])
+    _assert_same_as_reparse(model)
+    assert model.get_warn_msg().startswith("[line 3] Start time is earlier")
+    model.remove_row(2)
+    assert model.get_warn_msg() == ""
+    assert not model.get_timetable().has_any_error()
+
+
+def test_edit_that_removes_the_duration_warns_on_the_next_row():
+    csv_str = (
+        HEADER
+        + "A,M,0:00:10,0:00:10,start,\n"
+        + "B,M,0:00:20,0:00:10,duration,\n"
+        + "C,M,,0:00:10,duration,\n"
+    )
+    model = _model(csv_str)
+    # same start/end (the next row's start), but no duration any more
+    changed = model.edit_row(0, ["A", "M", "0:00:10", "", "", "start", ""])
+    _assert_same_as_reparse(model)
+    assert 1 in changed
+    assert model.get_warn_msg() == "[line 2] No duration (or end) in the previous line"
+
+
+def test_invalid_edit_raises_like_the_parser():
+    model = _model(HEADER + "A,M,,0:01:00,duration,\n")
+    with pytest.raises(ValueError, match="Invalid fixed code"):
+        model.edit_row(0, ["A", "M", "", "", "0:01:00", "later", ""])
+
+
+def test_model_does_not_touch_the_parsed_timetable():
+    parsed, _ = _parse(HEADER + "A,M,,0:01:00,duration,\n")
+    model = TimelineModel(parsed)
+    model.remove_row(0)
+    assert len(parsed) == 1
+
+
+def test_async_writer_writes_the_latest_snapshot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "protocol.csv")
+    model = _model(_protocol(20))
+    writer = timetable_to_csv.AsyncCsvWriter()
+    try:
+        for i in range(10):
+            model.edit_row(1, [f"edit{i}", "M", "", "", "0:00:05", "duration", ""])
+            header, rows = model.to_csv_rows()
+            writer.submit(path, header, rows)
+        assert writer.flush(timeout=5)
+    finally:
+        writer.close()
+
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    assert content == _to_csv_str(model).replace("\r\n", "\n")
+    assert "edit9" in content
+    assert (tmp_path / "backup").is_dir()
+
+
+def test_async_writer_survives_a_failed_write(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "protocol.csv"
+    path.write_text("original", encoding="shift_jis")
+    writer = timetable_to_csv.AsyncCsvWriter()
+    try:
+        # not encodable in Shift_JIS
+        writer.submit(str(path), ["title"], [["\U0001f600"]], encoding="shift_jis")
+        assert writer.flush(timeout=5)
+        assert isinstance(writer.pop_error(), UnicodeEncodeError)
+        assert writer.pop_error() is None
+        # the original file was not moved to backup
+        assert path.read_text(encoding="shift_jis") == "original"
+
+        writer.submit(str(path), ["title"], [["課題"]], encoding="shift_jis")
+        assert writer.flush(timeout=5)
+        assert writer.pop_error() is None
+    finally:
+        writer.close()
+    assert path.read_text(encoding="shift_jis") == "title\n課題\n"
@@ -0,0 +1,193 @@
+import os
+
+from timeline_kun import clock, timer_engine
+from timeline_kun.file_loader import FileLoader
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(ROOT, "fixtures")
+SEC = timer_engine.SEC
+
+
+def _stage_list(filename, start_index=0):
+    fl = FileLoader(use_cache=False)
+    fl.load_file_for_timer(start_index, os.path.join(FIXTURE_DIR, filename))
+    return fl.get_stage_list()
+
+
+def _record_events(engine):
+    events = []
+    for name in timer_engine.EVENTS:
+        engine.subscribe(
+            name,
+            lambda name=name, **payload: events.append(
+                (name, engine.clock.now_ns(), payload)
+            ),
+        )
+    return events
+
+
+def test_simulate_example_1():
+    stage_list = _stage_list("valid__recording__example_1.csv")
+    fake_clock = clock.FakeClock()
+    engine = timer_engine.TimerEngine(stage_list, clock=fake_clock, enable_trigger=True)
+    events = _record_events(engine)
+
+    ticks = engine.simulate()
+
+    names = [e[0] for e in events]
+    assert names[0] == "session_start"
+    assert names.count("stage_change") == len(stage_list) - 1
+    assert names.count("sound_cue") == len(stage_list)
+    assert names.count("session_end") == 1
+    assert engine.is_running is False
+    # the session lasts as long as the timeline
+    end_ns = next(e[1] for e in events if e[0] == "session_end")
+    assert stage_list.end[-1] * SEC < end_ns <= (stage_list.end[-1] + 1) * SEC
+    # only the deadlines are visited, not every 100 ms
+    assert ticks < 10 * len(stage_list)
+
+    # the intermission before TASK F is logged as such
+    titles = [e[2]["log_title"] for e in events if e[0] == "stage_change"]
+    assert titles == ["TASK B", "TASK C", "TASK D", "TASK E", "Intermission", "TASK F"]
+
+
+def test_sound_cue_three_seconds_before_stage_end():
+    stage_list = _stage_list("valid__recording__example_1.csv")
+    engine = timer_engine.TimerEngine(stage_list, clock=clock.FakeClock())
+    events = _record_events(engine)
+    engine.simulate()
+
+    cues = [e[1] for e in events if e[0] == "sound_cue"]
+    for cue_ns, end in zip(cues, stage_list.end):
+        assert (end - 3) * SEC < cue_ns <= (end - 2) * SEC
+
+
+def test_trigger_in_and_out_follow_recording_stages():
+    stage_list = _stage_list("valid__recording__example_1.csv")
+    engine = timer_engine.TimerEngine(
+        stage_list, clock=clock.FakeClock(), enable_trigger=True, trigger_offset_sec=5
+    )
+    events = _record_events(engine)
+    engine.simulate()
+
+    triggers = [(e[0], e[1] // SEC) for e in events if e[0].startswith("trigger")]
+    # TASK A is recorded from the start, TASK B is not, C is recorded,
+    # D is not, E to F are recorded continuously (intermission included)
+    assert [t[0] for t in triggers] == [
+        "trigger_in",
+        "trigger_out",
+        "trigger_in",
+        "trigger_out",
+        "trigger_in",
+        "trigger_out",
+        "trigger_in",
+        "trigger_out",
+    ]
+    assert triggers[0][1] == 0
+    # recording of TASK C starts when less than 5 seconds remain
+    # (4 seconds before its start, as displayed)
+    assert triggers[2][1] == 190 - 4
+    # recording stops at the end of the session
+    assert triggers[-1][1] == 1800
+
+
+def test_trigger_disabled_emits_nothing():
+    stage_list = _stage_list("valid__recording__example_1.csv")
+    engine = timer_engine.TimerEngine(stage_list, clock=clock.FakeClock())
+    events = _record_events(engine)
+    engine.simulate()
+
+    assert not [e for e in events if e[0].startswith("trigger")]
+
+
+def test_skip_jumps_to_offset_before_stage_end():
+    stage_list = _stage_list("valid__recording__example_1.csv")
+    fake_clock = clock.FakeClock()
+    engine = timer_engine.TimerEngine(stage_list, clock=fake_clock)
+    events = _record_events(engine)
+
+    engine.start()
+    fake_clock.advance(10)
+    engine.tick()
+    engine.skip()
+    assert engine.next_deadline_ns() == fake_clock.now_ns()
+    engine.tick()
+
+    skips = [e[2]["skip_ns"] for e in events if e[0] == "skip"]
+    # TASK A ends at 3:00; 4 seconds are left after the skip
+    assert skips == [(180 + 1 - 10 - 4) * SEC]
+    engine.tick()
+    assert engine.remaining_ns == 4 * SEC
+    # skipped time is not shown in the count-up
+    assert engine.disp_time_ns == 10 * SEC
+
+    # no skip within the last seconds of a stage
+    engine.skip()
+    engine.tick()
+    assert len([e for e in events if e[0] == "skip"]) == 1
+
+
+def test_reset_stops_and_restarts_from_zero():
+    stage_list = _stage_list("valid__recording__example_1.csv")
+    fake_clock = clock.FakeClock()
+    engine = timer_engine.TimerEngine(stage_list, clock=fake_clock)
+
+    engine.start()
+    fake_clock.advance(200)
+    engine.tick()
+    assert engine.now_stage == 2
+    engine.reset()
+    assert engine.is_running is False
+    assert engine.next_deadline_ns() is None
+
+    fake_clock.advance(30)
+    engine.start()
+    engine.tick()
+    assert engine.now_stage == 0
+    assert engine.cnt_up_ns == 0
+
+
+def test_simulate_3hour_is_fast():
+    stage_list = _stage_list("valid__recording__example_3hour.csv")
+    engine = timer_engine.TimerEngine(
+        stage_list, clock=clock.FakeClock(), enable_trigger=True
+    )
+    events = _record_events(engine)
+
+    ticks = engine.simulate()
+
+    assert engine.clock.now_ns() > 3 * 3600 * SEC - 1
+    assert ticks < 10 * len(stage_list)
+    assert [e[0] for e in events].count("session_end") == 1
+
+
+def test_trigger_lead_emits_ahead_of_the_target():
+    stage_list = _stage_list("valid__recording__example_1.csv")
+    engine = timer_engine.TimerEngine(
+        stage_list,
+        clock=clock.FakeClock(),
+        enable_trigger=True,
+        trigger_offset_sec=5,
+        trigger_lead_sec=1.5,
+    )
+    events = _record_events(engine)
+    engine.simulate()
+
+    trigger_ins = [(e[1], e[2]["target_ns"]) for e in events if e[0] == "trigger_in"]
+    # first stage: at once
+    assert trigger_ins[0] == (0, 0)
+    # TASK C: the recording should start 4 seconds before its start,
+    # the event comes 1.5 seconds earlier
+    emitted_ns, target_ns = trigger_ins[1]
+    assert target_ns == (190 - 4) * SEC
+    assert target_ns - 1.5 * SEC < emitted_ns <= target_ns - 1.5 * SEC + 1
+
+
+def test_sound_cue_carries_its_exact_time():
+    stage_list = _stage_list("valid__recording__example_1.csv")
+    engine = timer_engine.TimerEngine(stage_list, clock=clock.FakeClock())
+    events = _record_events(engine)
+    engine.simulate()
+
+    cues = [e[2]["at_ns"] for e in events if e[0] == "sound_cue"]
+    assert cues == [(end - 3) * SEC for end in stage_list.end]
@@ -0,0 +1,85 @@
+import sys
+import textwrap
+import time
+from multiprocessing.connection import AuthenticationError, Client
+
+import pytest
+
+from timeline_kun import timer_handoff, timetable
+
+# stands in for the timer: waits for the request and writes what it received
+STANDBY_SCRIPT = textwrap.dedent("""
+    import sys
+
+    from timeline_kun import timer_handoff
+
+    out_path, _, address = sys.argv[1:]
+    request = timer_handoff.wait_for_request(address)
+    with open(out_path, "w", encoding="utf-8") as f:
+        if request is None:
+            f.write("none")
+        else:
+            titles = ",".join(row["title"] for row in request.time_table)
+            f.write(f"{request.fg_color} {request.start_index} {request.encoding} {titles}")
+    """)
+
+
+def _wait_until(predicate, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _handoff(out_path):
+    return timer_handoff.TimerHandoff(
+        [sys.executable, "-c", STANDBY_SCRIPT, str(out_path)]
+    )
+
+
+def test_send_without_standby_returns_false():
+    handoff = _handoff("unused")
+    assert handoff.send(None) is False
+
+
+def test_parsed_timeline_is_handed_to_the_standby_timer(tmp_path):
+    out_path = tmp_path / "received.txt"
+    handoff = _handoff(out_path)
+    handoff.start_standby()
+    try:
+        assert _wait_until(handoff.ready)
+        first = handoff._process
+
+        t = timetable.Timetable()
+        t.append("A", 0, 60)
+        t.append("B", 60, 90)
+        request = timer_handoff.TimerRequest("x.csv", "cyan", 1, "mmss", t, "cp932")
+        assert handoff.send(request) is True
+        assert first.wait(timeout=20) == 0
+        assert out_path.read_text(encoding="utf-8") == "cyan 1 cp932 A,B"
+
+        # the next standby timer is started right away
+        assert handoff._process is not None and handoff._process is not first
+        assert _wait_until(handoff.ready)
+    finally:
+        standby = handoff._process
+        handoff.close()
+    # closing the Previewer side releases the waiting timer
+    assert standby.wait(timeout=20) == 0
+    assert out_path.read_text(encoding="utf-8") == "none"
+
+
+def test_connection_with_a_wrong_key_is_rejected(tmp_path):
+    handoff = _handoff(tmp_path / "received.txt")
+    handoff.start_standby()
+    try:
+        with pytest.raises(AuthenticationError):
+            Client(handoff._listener.address, authkey=b"wrong")
+        # the real standby timer still gets through
+        assert _wait_until(handoff.ready)
+    finally:
+        standby = handoff._process
+        handoff.close()
+    standby.wait(timeout=20)
@@ -0,0 +1,71 @@
+import datetime
+import pickle
+
+import pytest
+
+from timeline_kun.timetable import Timetable
+
+
+def _make_table():
+    table = Timetable()
+    table.append("A", 0, 60, member="M1", fixed="duration", duration_sec="1:00")
+    table.append("B", 60, 90, member="M1", fixed="duration", duration_sec="0:30")
+    table.append("A", 100, 160, member="M2", fixed="start", start_sec="1:40")
+    return table
+
+
+def test_row_view_matches_legacy_keys():
+    table = _make_table()
+    row = table[1]
+    assert row["title"] == "B"
+    assert row["start"] == row["start_dt"] == datetime.timedelta(seconds=60)
+    assert row["end"] == row["end_dt"] == datetime.timedelta(seconds=90)
+    assert row["duration"] == datetime.timedelta(seconds=30)
+    assert row["duration_sec"] == "0:30"
+    assert row["has_error"] is False
+    assert table[-1]["start_sec"] == "1:40"
+    with pytest.raises(IndexError):
+        table[3]
+
+
+def test_strings_are_interned():
+    table = _make_table()
+    assert table.title.values == ["A", "B"]
+    assert table.get_titles() == ["A", "B"]
+    assert table.member.values == ["M1", "M2"]
+
+
+def test_insert_shifts_columns_and_error_bits():
+    table = Timetable()
+    for i in range(10):
+        table.append(f"T{i}", i * 10, i * 10 + 10, has_error=(i == 8))
+    table.insert(2, "Intermission", 25, 30)
+    assert len(table) == 11
+    assert table[2]["title"] == "Intermission"
+    assert table[3]["title"] == "T2"
+    assert [i for i in range(len(table)) if table.has_error(i)] == [9]
+    assert table.has_any_error()
+
+
+def test_pickle_roundtrip():
+    table = _make_table()
+    restored = pickle.loads(pickle.dumps(table))
+    assert [r.as_dict() for r in restored] == [r.as_dict() for r in table]
+
+
+def test_remove_shifts_columns_and_error_bits():
+    table = Timetable()
+    for i in range(9):
+        table.append(f"T{i}", i * 10, i * 10 + 10, has_error=(i in (3, 8)))
+    table.remove(1)
+    assert len(table) == 8
+    assert table[1]["title"] == "T2"
+    assert [i for i in range(len(table)) if table.has_error(i)] == [2, 7]
+    assert len(table._error_bits) == 1
+
+    copied = table.copy()
+    copied.set_fields(0, title="X", start_sec="0:00:05")
+    copied.set_times(0, 5, 10)
+    assert table[0]["title"] == "T0"
+    assert copied[0]["start_sec"] == "0:00:05"
+    assert copied[0]["duration"] == datetime.timedelta(seconds=5)
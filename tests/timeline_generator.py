@@ -0,0 +1,127 @@
+"""
+Seeded generator of large, realistic timeline CSVs (for benchmarks).
+
+Rows mix fixed=duration and fixed=start (with gaps before them), durations
+in H:MM:SS, M:SS and plain seconds, optional end columns, Japanese titles,
+quoted instructions and (recording) keywords. The same seed always gives the
+same file.
+
+    python tests/timeline_generator.py 100000 out.csv --encoding shift_jis
+"""
+
+import argparse
+import csv
+import io
+import random
+
+# all encodable in Shift_JIS and EUC-JP
+TITLES = [
+    "Rest",
+    "Task A",
+    "Task B",
+    "Calibration",
+    "課題",
+    "休憩",
+    "計測",
+    "説明",
+]
+MEMBERS = ["", "MEMBER1", "MEMBER2", "被験者A", "被験者B"]
+INSTRUCTIONS = [
+    "",
+    "",
+    "(recording)",
+    "Close your eyes",
+    "Press the button, then wait",
+    '"Ready" when the light is on',
+    "画面を見てください",
+]
+DURATIONS = [5, 10, 30, 60, 90, 120, 180, 300, 600]
+GAPS = [0, 0, 10, 30, 60]
+
+
+def _h_mm_ss(sec):
+    return f"{sec // 3600}:{sec // 60 % 60:02}:{sec % 60:02}"
+
+
+def _time_str(rng, sec):
+    """Same time in one of the formats the parser accepts"""
+    r = rng.random()
+    if r < 0.6 or sec >= 3600 * 100:
+        return _h_mm_ss(sec)
+    if r < 0.9:
+        return f"{sec // 60}:{sec % 60:02}"
+    return str(sec)
+
+
+def generate_rows(n_rows, seed=0, with_end=True):
+    """Header and rows (lists of str) of a valid timeline"""
+    rng = random.Random(seed)
+    header = ["title", "member", "start", "duration", "fixed", "instruction"]
+    if with_end:
+        header.insert(4, "end")
+
+    rows = []
+    current = 0
+    for i in range(n_rows):
+        duration = rng.choice(DURATIONS)
+        start_str = end_str = duration_str = ""
+        kind = rng.random()
+        if i == 0 or kind < 0.7:
+            fixed = "duration"
+            duration_str = _time_str(rng, duration)
+        else:
+            fixed = "start"
+            current += rng.choice(GAPS)
+            start_str = _time_str(rng, current)
+            if with_end and kind < 0.85:
+                end_str = _time_str(rng, current + duration)
+            else:
+                duration_str = _time_str(rng, duration)
+        current += duration
+
+        row = {
+            "title": rng.choice(TITLES),
+            "member": rng.choice(MEMBERS),
+            "start": start_str,
+            "duration": duration_str,
+            "end": end_str,
+            "fixed": fixed,
+            "instruction": rng.choice(INSTRUCTIONS),
+        }
+        rows.append([row[name] for name in header])
+    return header, rows
+
+
+def generate_csv_str(n_rows, seed=0, with_end=True):
+    header, rows = generate_rows(n_rows, seed, with_end)
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def write_csv(path, n_rows, seed=0, with_end=True, encoding="utf-8"):
+    with open(path, "w", encoding=encoding, newline="") as f:
+        f.write(generate_csv_str(n_rows, seed, with_end))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a large timeline CSV.")
+    parser.add_argument("n_rows", type=int)
+    parser.add_argument("out_path", type=str)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no_end", action="store_true", help="No end column.")
+    parser.add_argument(
+        "--encoding",
+        type=str,
+        default="utf-8",
+        choices=["utf-8", "utf-8-sig", "shift_jis", "euc_jp"],
+    )
+    args = parser.parse_args(argv)
+    write_csv(args.out_path, args.n_rows, args.seed, not args.no_end, args.encoding)
+
+
+if __name__ == "__main__":
+    main()